@@ -5,6 +5,7 @@ from django.urls import path
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.http import HttpResponse
+from django.utils.html import format_html
 import csv
 from io import TextIOWrapper, StringIO
 
@@ -21,6 +22,7 @@ from webapp.models import (
 )
 from webapp.models.vessel import Vessel, VesselImage, VesselAttribute
 from webapp.models.sailboat import SailboatImage
+from webapp.controllers.media_transforms import transform_url
 
 
 class CSVImportMixin:
@@ -258,17 +260,27 @@ class SailboatAttributeAdmin(CSVImportMixin, admin.ModelAdmin):
 
 @admin.register(Media)
 class MediaAdmin(admin.ModelAdmin):
-    list_display = ("file", "media_type", "url")
+    list_display = ("preview", "file", "media_type", "url")
     list_filter = ("media_type",)
     search_fields = ("file",)
-    readonly_fields = ("url",)
-    fields = ("file", "media_type", "url")
+    readonly_fields = ("preview", "url")
+    fields = ("preview", "file", "media_type", "url")
 
     def url(self, obj):
         return obj.url
 
     url.short_description = "URL"
 
+    def preview(self, obj):
+        if obj.media_type != "image" or obj.status != Media.Status.READY:
+            return ""
+        return format_html(
+            '<img src="{}" width="64" height="64" alt="" loading="lazy">',
+            transform_url(obj, 128, 128),
+        )
+
+    preview.short_description = "Preview"
+
 
 class VesselImageInline(admin.TabularInline):
     model = VesselImage
@@ -1,7 +1,29 @@
+from typing import Optional
 from ninja import NinjaAPI, File
 from ninja.files import UploadedFile
 from webapp.settings import APP_NAME
 from webapp.models import Media
+from webapp.controllers.sailboats import get_sailboat_ordering, get_sailboats
+from webapp.controllers.uploads import (
+    DirectUploadError,
+    complete_upload,
+    start_upload,
+)
+from webapp.controllers.vessels import get_vessel_listing
+from webapp.models.vessel import Vessel
+from webapp.pagination import KeysetPaginator
+from webapp.schemas.pagination import CursorPage
+from webapp.schemas.sailboats import SailboatListRequest, SailboatSummary
+from webapp.schemas.uploads import (
+    UploadCompleteRequest,
+    UploadError,
+    UploadedMedia,
+    UploadSession,
+    UploadStartRequest,
+)
+from webapp.schemas.vessels import VesselSummary
+
+API_PAGE_SIZE = 50
 
 api = NinjaAPI(
     title=f"{APP_NAME} API",
@@ -13,6 +35,66 @@ def add(request, a: int, b: int):
     return {"result": a + b}
 
 
+@api.get("/sailboats", response=CursorPage[SailboatSummary])
+def list_sailboats(request, cursor: Optional[str] = None):
+    """the sailboat catalog, filtered with the same query parameters as the
+    catalog page (search, make, designer, year_start, year_end, attr_*, order_by)"""
+    filter_request = SailboatListRequest.from_query_dict(request.GET)
+    page = KeysetPaginator(
+        get_sailboats(filter_request),
+        get_sailboat_ordering(filter_request),
+        per_page=API_PAGE_SIZE,
+        estimate_total=True,
+    ).get_page(cursor)
+    return CursorPage[SailboatSummary](
+        items=[
+            SailboatSummary(
+                id=sailboat.id,
+                make=sailboat.make.name,
+                name=sailboat.name,
+                manufactured_start_year=sailboat.manufactured_start_year,
+                manufactured_end_year=sailboat.manufactured_end_year,
+            )
+            for sailboat in page
+        ],
+        next_cursor=page.next_cursor,
+        previous_cursor=page.previous_cursor,
+        estimated_total=page.estimated_total,
+    )
+
+
+@api.get("/vessels", response=CursorPage[VesselSummary])
+def list_vessels(
+    request,
+    search: Optional[str] = None,
+    order_by: Optional[str] = None,
+    cursor: Optional[str] = None,
+):
+    """public vessels, searched and ordered like the vessel index"""
+    vessels, ordering = get_vessel_listing(
+        search, order_by, Vessel.objects.filter(is_public=True)
+    )
+    page = KeysetPaginator(
+        vessels, ordering, per_page=API_PAGE_SIZE, estimate_total=True
+    ).get_page(cursor)
+    return CursorPage[VesselSummary](
+        items=[
+            VesselSummary(
+                id=vessel.id,
+                name=vessel.name,
+                make=vessel.sailboat.make.name,
+                sailboat=vessel.sailboat.name,
+                year_built=vessel.year_built,
+                home_port=vessel.home_port,
+            )
+            for vessel in page
+        ],
+        next_cursor=page.next_cursor,
+        previous_cursor=page.previous_cursor,
+        estimated_total=page.estimated_total,
+    )
+
+
 @api.post("/upload-image")
 def upload_image(request, file: UploadedFile = File(...)):
     """Upload image for Milkdown editor and return URL"""
@@ -24,17 +106,46 @@ def upload_image(request, file: UploadedFile = File(...)):
         return {"error": "Only image files are allowed"}, 400
 
     try:
-        # Create Media object
-        media = Media(
-            uploaded_by=request.user,
-            original_filename=file.name,
-        )
-        media.save()
-
-        # Save the uploaded file
-        media.file.save(file.name, file, save=True)
+        # Store the upload, it is resized in the background
+        media = Media.from_upload(file, user=request.user)
 
         return {"success": True, "url": media.url, "id": media.id}
 
     except Exception as e:
         return {"error": str(e)}, 500
+
+
+def _uploaded_media(media: Media) -> UploadedMedia:
+    return UploadedMedia(
+        id=media.id, url=media.url, media_type=media.media_type, status=media.status
+    )
+
+
+@api.post("/uploads", response={200: UploadSession, 400: UploadError, 401: UploadError})
+def start_direct_upload(request, body: UploadStartRequest):
+    """start an upload straight to the bucket: PUT the file to the presigned
+    url(s), then POST the token to /uploads/complete. Answers 400 when the
+    media storage isn't a bucket, upload through the form instead"""
+    if not request.user.is_authenticated:
+        return 401, UploadError(error="Authentication required")
+    try:
+        return 200, start_upload(request.user, body)
+    except DirectUploadError as exc:
+        return 400, UploadError(error=str(exc))
+
+
+@api.post(
+    "/uploads/complete",
+    response={200: UploadedMedia, 400: UploadError, 401: UploadError},
+)
+def complete_direct_upload(request, body: UploadCompleteRequest):
+    """create the media for a finished direct upload, send its id with the
+    form it belongs to"""
+    if not request.user.is_authenticated:
+        return 401, UploadError(error="Authentication required")
+    try:
+        return 200, _uploaded_media(
+            complete_upload(request.user, body.token, body.parts)
+        )
+    except DirectUploadError as exc:
+        return 400, UploadError(error=str(exc))
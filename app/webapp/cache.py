@@ -0,0 +1,35 @@
+import time
+from django.core.cache import cache
+
+# cached data that is invalidated as a whole when the sailboat catalog changes
+CATALOG_CACHE = "catalog"
+# the attribute schema held in memory by every worker
+ATTRIBUTE_SCHEMA_CACHE = "attribute_schema"
+
+
+def _version_key(namespace: str) -> str:
+    return f"{namespace}:version"
+
+
+def get_cache_version(namespace: str) -> int:
+    """the current generation of a cache namespace. Build keys with it so that
+    bumping the version orphans everything cached before the change, there's
+    no need to find and delete the individual keys"""
+    key = _version_key(namespace)
+    if (version := cache.get(key)) is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(namespace: str):
+    """invalidate everything cached in a namespace. Versions are timestamps
+    rather than counters so an evicted version key can't be reissued"""
+    cache.set(_version_key(namespace), time.time_ns(), timeout=None)
+
+
+def versioned_key(namespace: str, *parts) -> str:
+    """a cache key scoped to the current version of the namespace"""
+    return ":".join(
+        str(part) for part in (namespace, get_cache_version(namespace), *parts)
+    )
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from webapp.cache import ATTRIBUTE_SCHEMA_CACHE, get_cache_version
+from webapp.models.attribute import Attribute
+
+# the fields of each attribute in the JSON payload used by the attribute editor
+ATTRIBUTE_JSON_FIELDS = (
+    "id",
+    "name",
+    "input_type",
+    "data_type",
+    "options",
+    "description",
+    "section__name",
+    "section__icon",
+    "accepts_contributions",
+)
+
+
+@dataclass(frozen=True)
+class AttributeSchema:
+    """every attribute (with its section) and the lookups the views need,
+    built once per schema version. The instances are shared between requests,
+    treat them as read only"""
+
+    version: int
+    attributes: Tuple[Attribute, ...]
+    by_id: Dict[int, Attribute]
+    by_name: Dict[str, Attribute]
+    by_form_field: Dict[str, Attribute]
+    json: bytes
+    etag: str
+
+    @property
+    def options_attributes(self) -> List[Attribute]:
+        return [
+            attribute
+            for attribute in self.attributes
+            if attribute.input_type == Attribute.InputType.OPTIONS
+        ]
+
+    @classmethod
+    def build(cls, version: int) -> "AttributeSchema":
+        attributes = tuple(
+            Attribute.objects.select_related("section").order_by("section_id", "name")
+        )
+        payload = json.dumps(
+            [
+                {
+                    "id": attribute.id,
+                    "name": attribute.name,
+                    "input_type": attribute.input_type,
+                    "data_type": attribute.data_type,
+                    "options": attribute.options,
+                    "description": attribute.description,
+                    "section__name": attribute.section.name,
+                    "section__icon": attribute.section.icon,
+                    "accepts_contributions": attribute.accepts_contributions,
+                }
+                for attribute in attributes
+            ],
+            separators=(",", ":"),
+        ).encode()
+        return cls(
+            version=version,
+            attributes=attributes,
+            by_id={attribute.id: attribute for attribute in attributes},
+            by_name={attribute.name.lower(): attribute for attribute in attributes},
+            by_form_field={
+                attribute.get_form_field_name(): attribute for attribute in attributes
+            },
+            json=payload,
+            etag=f'"{hashlib.sha256(payload).hexdigest()[:32]}"',
+        )
+
+
+class AttributeSchemaRegistry:
+    """holds the attribute schema in process memory. The schema version lives in
+    the shared cache, so a save in any worker invalidates every worker; each
+    worker checks the version at most every ATTRIBUTE_SCHEMA_CHECK_INTERVAL
+    seconds so the check isn't a cache round trip on every call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._schema: Optional[AttributeSchema] = None
+        self._checked_at = 0.0
+
+    def get(self) -> AttributeSchema:
+        schema = self._schema
+        interval = getattr(settings, "ATTRIBUTE_SCHEMA_CHECK_INTERVAL", 5)
+        if schema is not None and time.monotonic() - self._checked_at < interval:
+            return schema
+        version = get_cache_version(ATTRIBUTE_SCHEMA_CACHE)
+        if schema is None or schema.version != version:
+            with self._lock:
+                schema = self._schema
+                if schema is None or schema.version != version:
+                    schema = AttributeSchema.build(version)
+        self._schema, self._checked_at = schema, time.monotonic()
+        return schema
+
+    def invalidate(self):
+        """forget the local copy, other workers notice the bumped version"""
+        self._schema = None
+
+
+attribute_schema_registry = AttributeSchemaRegistry()
+
+
+def get_attribute_schema() -> AttributeSchema:
+    """the current attribute schema, see AttributeSchemaRegistry"""
+    return attribute_schema_registry.get()
@@ -0,0 +1,202 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Union
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from webapp.logging import get_logger
+from webapp.models.media import Media
+
+if TYPE_CHECKING:
+    from django.core.files.uploadedfile import UploadedFile
+    from webapp.models.user import User
+
+logger = get_logger(__name__)
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executor_lock = threading.Lock()
+
+
+def _get_executor(
+    name: str, workers: int, on_start: Optional[Callable] = None
+) -> ThreadPoolExecutor:
+    with _executor_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix=name
+            )
+            if on_start is not None:
+                _executors[name].submit(on_start)
+        return _executors[name]
+
+
+def get_media_executor() -> ThreadPoolExecutor:
+    """the per-process pool images are processed on, MEDIA_PROCESSING_WORKERS
+    threads wide. Pillow releases the GIL while decoding and resizing, so
+    threads keep the request workers free without forking.
+
+    The queue lives in the process, so a worker that is restarted or killed
+    drops it. Starting a pool queues the images left behind that way, see
+    `requeue_stale_media`"""
+    return _get_executor(
+        "media",
+        getattr(settings, "MEDIA_PROCESSING_WORKERS", 2),
+        on_start=_requeue_in_worker,
+    )
+
+
+def get_upload_executor() -> ThreadPoolExecutor:
+    """the per-process pool a request's uploads are hashed and written to
+    storage on, MEDIA_UPLOAD_WORKERS threads wide. Separate from processing
+    so a queue of images to resize doesn't hold up a form post"""
+    return _get_executor("media-upload", getattr(settings, "MEDIA_UPLOAD_WORKERS", 4))
+
+
+def store_uploads(
+    images: Iterable[Union["UploadedFile", Media]], user: Optional["User"] = None
+) -> List[Media]:
+    """`Media.from_upload` for many files at once, in the order given. The
+    uploads are hashed and written to storage concurrently, so storing ten
+    photos takes about as long as the slowest one, and their rows are created
+    in one insert. Already stored `Media` are passed through as is.
+
+    Files processed before are shared like `from_upload` does, raises
+    ValueError (before storing anything) for file types that aren't accepted"""
+    images = list(images)
+    uploads = [image for image in images if not isinstance(image, Media)]
+    if not uploads:
+        return images
+    names = [Media.new_file_name(upload.name or "") for upload in uploads]
+    pool = get_upload_executor()
+    digests = list(pool.map(Media.digest, uploads))
+    existing = {}
+    for media in Media.objects.filter(
+        sha256__in=set(digests), status=Media.Status.READY
+    ).order_by("-pk"):
+        existing[media.sha256] = media
+
+    storage = Media._meta.get_field("file").storage
+    to_store = [
+        (name, upload)
+        for name, upload, sha256 in zip(names, uploads, digests)
+        if sha256 not in existing
+    ]
+    stored = iter(pool.map(lambda item: storage.save(*item), to_store))
+
+    created = []
+    for upload, sha256 in zip(uploads, digests):
+        fields = {
+            "sha256": sha256,
+            "original_filename": os.path.basename(upload.name or "")[:255],
+            "uploaded_by": user,
+        }
+        if sha256 in existing:
+            created.append(Media.copy_of(existing[sha256], **fields))
+        else:
+            created.append(Media.for_stored_file(next(stored), **fields))
+    Media.objects.bulk_create(created)
+    for media in created:
+        if media.status == Media.Status.PENDING:
+            schedule_processing(media)
+
+    created = iter(created)
+    return [image if isinstance(image, Media) else next(created) for image in images]
+
+
+def schedule_processing(media: Media) -> None:
+    """process an image once the transaction that stored it commits. With
+    MEDIA_PROCESSING_ASYNC off (the tests) it is processed right away"""
+    if not getattr(settings, "MEDIA_PROCESSING_ASYNC", True):
+        process_media(media.pk)
+        media.refresh_from_db(
+            fields=["file", "status", "derivatives", *Media.DESCRIPTION_FIELDS]
+        )
+        return
+    media_id = media.pk
+    transaction.on_commit(
+        lambda: get_media_executor().submit(_process_in_worker, media_id)
+    )
+
+
+def _process_in_worker(media_id: int) -> None:
+    try:
+        process_media(media_id)
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception("Processing media %s failed", media_id)
+    finally:
+        # the worker thread's connections aren't closed by the request cycle
+        connections.close_all()
+
+
+def stale_media_filter(stale_after: timedelta) -> Q:
+    """images a dropped queue left behind: pending since before `stale_after`
+    ago, or claimed by a worker that long ago and never finished. Claims are
+    timed from `processing_started_at`, not the upload, so an image that
+    waited in the queue and is being processed now isn't counted"""
+    stale = timezone.now() - stale_after
+    return Q(media_type="image") & (
+        Q(status=Media.Status.PENDING, created_at__lt=stale)
+        | Q(status=Media.Status.PROCESSING, processing_started_at__lt=stale)
+        # claimed before claims were timed
+        | Q(status=Media.Status.PROCESSING, processing_started_at__isnull=True)
+    )
+
+
+def requeue_stale_media() -> List[int]:
+    """the images a dropped queue left behind (see `stale_media_filter`),
+    stale for MEDIA_PROCESSING_STALE_AFTER seconds. Stale claims are put back
+    to pending, so whichever pool gets to them first claims them again"""
+    stale_after = timedelta(
+        seconds=getattr(settings, "MEDIA_PROCESSING_STALE_AFTER", 10 * 60)
+    )
+    media_ids = list(
+        Media.objects.filter(stale_media_filter(stale_after))
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    # checked again in the update, a claim made since the select is left alone
+    Media.objects.filter(stale_media_filter(stale_after), pk__in=media_ids).filter(
+        status=Media.Status.PROCESSING
+    ).update(status=Media.Status.PENDING)
+    return media_ids
+
+
+def _requeue_in_worker() -> None:
+    try:
+        media_ids = requeue_stale_media()
+        if media_ids:
+            logger.info("Requeueing %s stale media", len(media_ids))
+        pool = get_media_executor()
+        for media_id in media_ids:
+            pool.submit(_process_in_worker, media_id)
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception("Requeueing stale media failed")
+    finally:
+        connections.close_all()
+
+
+def process_media(media_id: int, force: bool = False) -> bool:
+    """resize an image and build its derivatives, then mark it ready (or
+    failed). Only pending images are claimed unless `force`d, so an image is
+    processed once however many times it's scheduled"""
+    claimable = Media.objects.filter(pk=media_id, media_type="image")
+    if not force:
+        claimable = claimable.filter(status=Media.Status.PENDING)
+    if not claimable.update(
+        status=Media.Status.PROCESSING, processing_started_at=timezone.now()
+    ):
+        return False
+
+    media = Media.objects.get(pk=media_id)
+    try:
+        processed = media.process()
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception("Processing media %s failed", media_id)
+        processed = False
+    Media.objects.filter(pk=media_id).update(
+        status=Media.Status.READY if processed else Media.Status.FAILED
+    )
+    return processed
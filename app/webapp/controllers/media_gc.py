@@ -0,0 +1,183 @@
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, List, NamedTuple, Optional, Set
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from webapp.controllers.media_transforms import TRANSFORM_NAME
+from webapp.logging import get_logger
+from webapp.models.media import Media
+
+logger = get_logger(__name__)
+
+# S3 DeleteObjects takes at most this many keys per call
+MAX_DELETE_BATCH = 1000
+
+
+class StoredFile(NamedTuple):
+    # relative to the storage location, as in `Media.file`
+    name: str
+    modified: datetime
+
+
+@dataclass
+class CollectionResult:
+    scanned: int = 0
+    orphaned: int = 0
+    deleted: int = 0
+    failed: int = 0
+    # the last name handled, pass it as `start_after` to carry on from there
+    checkpoint: str = ""
+    complete: bool = False
+
+
+def is_live(name: str, live: Set[str], live_roots: Set[str]) -> bool:
+    """whether a stored name is in use: referred to by a row, or an on
+    demand transform of an original that is"""
+    if name in live:
+        return True
+    transform = TRANSFORM_NAME.match(name)
+    return bool(transform) and transform["root"] in live_roots
+
+
+def live_media_names() -> Set[str]:
+    """every stored name a `Media` row refers to, originals and derivatives.
+    Uploads of the same file share names, so this is a set"""
+    names = set()
+    for name, derivatives in Media.objects.values_list("file", "derivatives").iterator(
+        chunk_size=2000
+    ):
+        names.add(name)
+        for by_width in (derivatives or {}).values():
+            names.update(by_width.values())
+    return names
+
+
+def _bucket_prefix(storage) -> str:
+    # pylint: disable-next=protected-access
+    return storage._normalize_name("").lstrip("/")
+
+
+def list_stored_files(storage, start_after: str = "") -> Iterator[StoredFile]:
+    """every file in the media storage in name order, after `start_after`.
+    Buckets are listed a page at a time, so listing starts right away"""
+    if hasattr(storage, "bucket_name"):
+        prefix = _bucket_prefix(storage)
+        options = {"Bucket": storage.bucket_name, "Prefix": prefix}
+        if start_after:
+            options["StartAfter"] = prefix + start_after
+        paginator = storage.connection.meta.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(**options):
+            for stored in page.get("Contents", ()):
+                yield StoredFile(stored["Key"][len(prefix) :], stored["LastModified"])
+        return
+
+    def walk(path):
+        directories, files = storage.listdir(path)
+        for name in files:
+            yield f"{path}/{name}" if path else name
+        for directory in directories:
+            yield from walk(f"{path}/{directory}" if path else directory)
+
+    for name in sorted(walk("")):
+        if name > start_after:
+            yield StoredFile(name, storage.get_modified_time(name))
+
+
+def delete_stored_files(storage, names: List[str]) -> List[str]:
+    """delete files from the media storage, one DeleteObjects call per
+    MAX_DELETE_BATCH names on S3. Returns the names that couldn't be deleted"""
+    if not hasattr(storage, "bucket_name"):
+        for name in names:
+            storage.delete(name)
+        return []
+    prefix = _bucket_prefix(storage)
+    failed = []
+    client = storage.connection.meta.client
+    for start in range(0, len(names), MAX_DELETE_BATCH):
+        response = client.delete_objects(
+            Bucket=storage.bucket_name,
+            Delete={
+                "Objects": [
+                    {"Key": prefix + name}
+                    for name in names[start : start + MAX_DELETE_BATCH]
+                ],
+                "Quiet": True,
+            },
+        )
+        for error in response.get("Errors", ()):
+            logger.warning(
+                "Deleting %s failed: %s", error.get("Key"), error.get("Message")
+            )
+            failed.append(error["Key"][len(prefix) :])
+    return failed
+
+
+def collect_media_garbage(
+    storage=None,
+    dry_run: bool = False,
+    grace: timedelta = timedelta(hours=24),
+    batch_size: int = MAX_DELETE_BATCH,
+    max_deletes_per_second: Optional[float] = None,
+    max_deletes: Optional[int] = None,
+    start_after: str = "",
+    on_checkpoint: Optional[Callable[[str], None]] = None,
+) -> CollectionResult:
+    """delete stored files no `Media` refers to: the files of deleted rows
+    and replaced attachments, uploads that were never completed and the
+    transforms of originals that are gone.
+
+    Files modified after the job started less `grace` are kept, that covers
+    direct uploads not completed yet and derivatives not recorded yet, and
+    anything stored while the job runs. The names in use are read once up
+    front, a row created later either has a new file (kept by the grace
+    period) or shares the file of a row that was already there.
+
+    Orphans are deleted `batch_size` at a time, no faster than
+    `max_deletes_per_second`, and after each batch `on_checkpoint` is
+    called with the last name handled so an interrupted run can resume"""
+    storage = storage or default_storage
+    cutoff = timezone.now() - grace
+    batch_size = max(1, min(batch_size, MAX_DELETE_BATCH))
+    live = live_media_names()
+    live_roots = {os.path.splitext(name)[0] for name in live}
+    result = CollectionResult(checkpoint=start_after)
+    orphans: List[str] = []
+
+    def flush(last_name: str):
+        if orphans and not dry_run:
+            # the last word goes to the rows, in case one was created for an
+            # old file since the names were read
+            in_use = set(
+                Media.objects.filter(file__in=orphans).values_list("file", flat=True)
+            )
+            to_delete = [name for name in orphans if name not in in_use]
+            started = time.monotonic()
+            failed = delete_stored_files(storage, to_delete)
+            result.failed += len(failed)
+            result.deleted += len(to_delete) - len(failed)
+            if max_deletes_per_second:
+                pause = len(to_delete) / max_deletes_per_second
+                time.sleep(max(0.0, pause - (time.monotonic() - started)))
+        orphans.clear()
+        result.checkpoint = last_name
+        if on_checkpoint and not dry_run:
+            on_checkpoint(last_name)
+
+    last_name = start_after
+    for stored in list_stored_files(storage, start_after):
+        if stored.modified <= cutoff and not is_live(stored.name, live, live_roots):
+            if max_deletes is not None and result.orphaned >= max_deletes:
+                # stop before this one, resuming starts with it
+                flush(last_name)
+                return result
+            result.orphaned += 1
+            orphans.append(stored.name)
+        result.scanned += 1
+        last_name = stored.name
+        if len(orphans) >= batch_size:
+            flush(last_name)
+    flush(last_name)
+    result.complete = True
+    return result
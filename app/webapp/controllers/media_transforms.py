@@ -0,0 +1,262 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from typing import BinaryIO, Dict, Optional
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from webapp import imaging
+from webapp.models.media import Media
+
+TRANSFORM_SALT = "webapp.media.transform"
+
+# url extension -> (`imaging.DERIVATIVE_FORMATS` name, content type)
+TRANSFORM_FORMATS = {
+    "webp": ("webp", "image/webp"),
+    "jpg": ("jpeg", "image/jpeg"),
+}
+
+# transforms are stored next to their original, `<root>-t<w>x<h>-<fit>.<ext>`
+TRANSFORM_NAME = re.compile(
+    r"^(?P<root>.+)-t\d+x\d+-(?:%s)\.(?:%s)$"
+    % ("|".join(imaging.TRANSFORM_FITS), "|".join(TRANSFORM_FORMATS))
+)
+
+
+class TransformBusy(Exception):
+    """every transform slot of the process is taken, try again shortly"""
+
+
+def _transform_path(media_id: int, width: int, height: int, fit: str, extension: str):
+    return f"{media_id}/{width}x{height}/{fit}.{extension}"
+
+
+def transform_signature(
+    media_id: int, width: int, height: int, fit: str, extension: str
+) -> str:
+    return signing.Signer(salt=TRANSFORM_SALT).signature(
+        _transform_path(media_id, width, height, fit, extension)
+    )
+
+
+def transform_url(
+    media: Media, width: int, height: int, fit: str = "cover", extension: str = "webp"
+) -> str:
+    """the signed url of `media` transformed to `width`x`height`, only urls
+    minted here are served so the endpoint can't be made to render any size"""
+    signature = transform_signature(media.pk, width, height, fit, extension)
+    path = reverse("media_transform", args=[media.pk, width, height, fit, extension])
+    return f"{path}?s={signature}"
+
+
+def is_valid_transform(
+    media_id: int, width: int, height: int, fit: str, extension: str, signature: str
+) -> bool:
+    max_size = getattr(settings, "MEDIA_TRANSFORM_MAX_SIZE", 2048)
+    return (
+        fit in imaging.TRANSFORM_FITS
+        and extension in TRANSFORM_FORMATS
+        and 0 < width <= max_size
+        and 0 < height <= max_size
+        and constant_time_compare(
+            signature, transform_signature(media_id, width, height, fit, extension)
+        )
+    )
+
+
+def transform_storage_name(
+    media: Media, width: int, height: int, fit: str, extension: str
+) -> str:
+    """where a transform is kept in the bucket, by the original's name so
+    uploads sharing a file share its transforms too"""
+    root = os.path.splitext(media.file.name)[0]
+    return f"{root}-t{width}x{height}-{fit}.{extension}"
+
+
+class DiskLru:
+    """files on local disk up to `max_bytes` in total, the least recently
+    read are removed first. Reads touch the file's mtime, so the recency
+    survives restarts and is shared by the workers of a host. The size is
+    read from the directory on every put rather than counted, as the other
+    workers write to it too"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, data: bytes) -> str:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # written aside and renamed, a reader never sees half a file
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path), delete=False
+        ) as file:
+            file.write(data)
+        os.replace(file.name, path)
+        entries = list(self._entries())
+        if sum(size for _, size, _ in entries) > self.max_bytes:
+            self._evict(entries, keep=path)
+        return path
+
+    def _entries(self):
+        with os.scandir(self.directory) as directories:
+            for directory in directories:
+                if not directory.is_dir():
+                    continue
+                with os.scandir(directory.path) as files:
+                    for file in files:
+                        try:
+                            stat = file.stat()
+                        except FileNotFoundError:
+                            continue
+                        yield stat.st_mtime, stat.st_size, file.path
+
+    def _evict(self, entries, keep: str):
+        size = sum(size for _, size, _ in entries)
+        # down to 90% so a full cache isn't evicted from on every put
+        target = self.max_bytes * 0.9
+        for _, file_size, path in sorted(entries):
+            if size <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+
+
+_transform_cache: Optional[DiskLru] = None
+_transform_slots: Optional[threading.BoundedSemaphore] = None
+_rendering: Dict[str, threading.Lock] = {}
+_state_lock = threading.Lock()
+
+
+def get_transform_cache() -> DiskLru:
+    global _transform_cache  # pylint: disable=global-statement
+    with _state_lock:
+        if _transform_cache is None:
+            _transform_cache = DiskLru(
+                getattr(
+                    settings,
+                    "MEDIA_TRANSFORM_CACHE_DIR",
+                    os.path.join(tempfile.gettempdir(), "media-transforms"),
+                ),
+                getattr(settings, "MEDIA_TRANSFORM_CACHE_MAX_BYTES", 512 * 2**20),
+            )
+        return _transform_cache
+
+
+def _slots() -> threading.BoundedSemaphore:
+    global _transform_slots  # pylint: disable=global-statement
+    with _state_lock:
+        if _transform_slots is None:
+            _transform_slots = threading.BoundedSemaphore(
+                getattr(settings, "MEDIA_TRANSFORM_CONCURRENCY", 2)
+            )
+        return _transform_slots
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):  # pylint: disable=unused-argument
+    global _transform_cache, _transform_slots  # pylint: disable=global-statement
+    if setting.startswith("MEDIA_TRANSFORM_"):
+        with _state_lock:
+            _transform_cache = _transform_slots = None
+
+
+def _render_lock(name: str) -> threading.Lock:
+    with _state_lock:
+        return _rendering.setdefault(name, threading.Lock())
+
+
+def get_transform(
+    media: Media, width: int, height: int, fit: str, extension: str
+) -> str:
+    """the local path of `media` transformed, from the disk cache, else the
+    bucket, else rendered from the original (and then kept in both).
+
+    A transform is rendered once however many requests ask for it at the
+    same time, and at most MEDIA_TRANSFORM_CONCURRENCY are rendered at once
+    per process. Raises `TransformBusy` if no slot frees up within
+    MEDIA_TRANSFORM_WAIT seconds"""
+    name = transform_storage_name(media, width, height, fit, extension)
+    cache = get_transform_cache()
+    if path := cache.get(name):
+        return path
+
+    storage = media.file.storage
+    with _render_lock(name):
+        try:
+            if path := cache.get(name):
+                return path
+            if storage.exists(name):
+                with storage.open(name, "rb") as file:
+                    return cache.put(name, file.read())
+
+            if not _slots().acquire(
+                timeout=getattr(settings, "MEDIA_TRANSFORM_WAIT", 5)
+            ):
+                raise TransformBusy(name)
+            try:
+                data = _render(media, (width, height), fit, extension)
+            finally:
+                _slots().release()
+            storage.save(name, ContentFile(data))
+            return cache.put(name, data)
+        finally:
+            with _state_lock:
+                _rendering.pop(name, None)
+
+
+def open_transform(
+    media: Media, width: int, height: int, fit: str, extension: str
+) -> BinaryIO:
+    """`get_transform` opened for reading. Another worker of the host can
+    evict the file between finding and opening it, then it is fetched again,
+    and if that is gone too it is read from the bucket"""
+    for _ in range(2):
+        try:
+            return open(  # pylint: disable=consider-using-with
+                get_transform(media, width, height, fit, extension), "rb"
+            )
+        except FileNotFoundError:
+            continue
+    return media.file.storage.open(
+        transform_storage_name(media, width, height, fit, extension), "rb"
+    )
+
+
+def _render(media: Media, size, fit: str, extension: str) -> bytes:
+    max_size = None
+    if media.width and media.height:
+        max_size = imaging.transform_decode_size((media.width, media.height), size, fit)
+    with media.file.open("rb") as file:
+        decoded = imaging.decode(
+            file,
+            max_size=max_size,
+            max_pixels=getattr(settings, "MEDIA_IMAGE_MAX_PIXELS", None),
+        )
+    image = imaging.transform(decoded.image, size, fit)
+    format_name, _ = TRANSFORM_FORMATS[extension]
+    with imaging.encode(image, format_name) as encoded:
+        return encoded.read()
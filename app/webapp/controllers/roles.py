@@ -0,0 +1,157 @@
+from enum import IntEnum
+from typing import TYPE_CHECKING, Dict, Iterable, Union
+from django.db import transaction
+from guardian.shortcuts import assign_perm, remove_perm
+from webapp.models.vessel import (
+    Vessel,
+    VesselGroupObjectPermission,
+    VesselUserObjectPermission,
+)
+from webapp.models.vessel_membership import VesselMembership
+
+if TYPE_CHECKING:
+    from webapp.models.user import User
+
+
+class VesselRole(IntEnum):
+    """what a user may do on a vessel, each role includes the ones below it"""
+
+    NONE = 0
+    VIEWER = 1
+    CREW = 2
+    SKIPPER = 3
+    ADMIN = 4
+
+
+# the object permission that grants each role
+ROLE_PERMISSIONS = {
+    "can_view_vessel": VesselRole.VIEWER,
+    "can_crew_vessel": VesselRole.CREW,
+    "can_manage_vessel": VesselRole.SKIPPER,
+}
+
+# the roles a vessel's skippers hand out, by the name forms and requests use
+ROLE_NAMES = {
+    "viewer": VesselRole.VIEWER,
+    "crew": VesselRole.CREW,
+    "skipper": VesselRole.SKIPPER,
+}
+
+
+def sync_vessel_membership(vessel: Vessel, user: "User") -> VesselRole:
+    """bring the user's `VesselMembership` of the vessel in line with their
+    object permissions on it, returns the role they're left with"""
+    codenames = VesselUserObjectPermission.objects.filter(
+        user=user,
+        content_object=vessel,
+        permission__codename__in=ROLE_PERMISSIONS,
+    ).values_list("permission__codename", flat=True)
+    role = max(
+        (ROLE_PERMISSIONS[codename] for codename in codenames),
+        default=VesselRole.NONE,
+    )
+    if role:
+        VesselMembership.objects.update_or_create(
+            vessel=vessel, user=user, defaults={"role": role}
+        )
+    else:
+        VesselMembership.objects.filter(vessel=vessel, user=user).delete()
+    # roles the user instance already resolved are stale now
+    if "vessel_roles" in user.__dict__:
+        user.vessel_roles.clear()
+    return role
+
+
+@transaction.atomic
+def grant_vessel_role(vessel: Vessel, user: "User", role: VesselRole) -> VesselRole:
+    """give the user the permissions of `role` on the vessel, on top of any
+    they have"""
+    for codename, granted in ROLE_PERMISSIONS.items():
+        if granted <= role:
+            assign_perm(f"webapp.{codename}", user, vessel)
+    return sync_vessel_membership(vessel, user)
+
+
+@transaction.atomic
+def set_vessel_role(vessel: Vessel, user: "User", role: VesselRole) -> VesselRole:
+    """give the user exactly `role` on the vessel, `VesselRole.NONE` removes
+    them from it"""
+    for codename, granted in ROLE_PERMISSIONS.items():
+        if granted <= role:
+            assign_perm(f"webapp.{codename}", user, vessel)
+        else:
+            remove_perm(f"webapp.{codename}", user, vessel)
+    return sync_vessel_membership(vessel, user)
+
+
+@transaction.atomic
+def revoke_vessel_permission(vessel: Vessel, user: "User", codename: str) -> VesselRole:
+    """take one of the role permissions away, the membership drops to the
+    highest role left"""
+    remove_perm(f"webapp.{codename}", user, vessel)
+    return sync_vessel_membership(vessel, user)
+
+
+class VesselRoleResolver:
+    """a user's roles on vessels, from their (and their groups') object
+    permissions in one query per batch of vessels instead of a guardian
+    `has_perm` per check. Roles are remembered, and the resolver lives on
+    the user instance so for `request.user` it lasts for the request"""
+
+    def __init__(self, user: "User"):
+        self.user = user
+        self._roles: Dict[int, VesselRole] = {}
+
+    def clear(self):
+        """forget the resolved roles, after changing the user's permissions"""
+        self._roles.clear()
+
+    def _fixed_role(self):
+        """the role the user has on every vessel, if it doesn't depend on one"""
+        if not self.user.is_authenticated:
+            return VesselRole.NONE
+        if self.user.is_admin:
+            return VesselRole.ADMIN
+        if not self.user.is_active:
+            return VesselRole.NONE
+        if self.user.is_superuser:
+            return VesselRole.ADMIN
+        return None
+
+    def resolve(self, vessels: Iterable[Union[Vessel, int]]) -> Dict[int, VesselRole]:
+        """the user's role on each of the vessels (or vessel ids), by id"""
+        ids = [getattr(vessel, "pk", vessel) for vessel in vessels]
+        if (fixed := self._fixed_role()) is not None:
+            return {vessel_id: fixed for vessel_id in ids}
+        if missing := {vessel_id for vessel_id in ids if vessel_id not in self._roles}:
+            user_grants = VesselUserObjectPermission.objects.filter(
+                user=self.user,
+                content_object_id__in=missing,
+                permission__codename__in=ROLE_PERMISSIONS,
+            ).values_list("content_object_id", "permission__codename")
+            group_grants = VesselGroupObjectPermission.objects.filter(
+                group__user=self.user,
+                content_object_id__in=missing,
+                permission__codename__in=ROLE_PERMISSIONS,
+            ).values_list("content_object_id", "permission__codename")
+            roles = dict.fromkeys(missing, VesselRole.NONE)
+            for vessel_id, codename in user_grants.union(group_grants):
+                roles[vessel_id] = max(roles[vessel_id], ROLE_PERMISSIONS[codename])
+            self._roles.update(roles)
+        return {vessel_id: self._roles[vessel_id] for vessel_id in ids}
+
+    def role(self, vessel: Union[Vessel, int]) -> VesselRole:
+        return next(iter(self.resolve([vessel]).values()))
+
+    def can_manage(self, vessel: Vessel) -> bool:
+        return self.role(vessel) >= VesselRole.SKIPPER
+
+    def can_crew(self, vessel: Vessel) -> bool:
+        return self.role(vessel) >= VesselRole.CREW
+
+    def can_view(self, vessel: Vessel) -> bool:
+        """public vessels are seen by everyone, private ones by moderators and
+        anyone with a role on them"""
+        if vessel.is_public or (self.user.is_authenticated and self.user.is_moderator):
+            return True
+        return self.role(vessel) >= VesselRole.VIEWER
@@ -0,0 +1,359 @@
+import hashlib
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Q,
+    QuerySet,
+    prefetch_related_objects,
+)
+from webapp.cache import CATALOG_CACHE, bump_cache_version, versioned_key
+from webapp.controllers.attributes import get_attribute_schema
+from webapp.controllers.search import search
+from webapp.models.attribute import Attribute
+from webapp.models.designer import Designer
+from webapp.models.make import Make
+from webapp.models.sailboat import Sailboat, SailboatImage
+from webapp.models.sailboat_attribute import SailboatAttribute
+from webapp.schemas.sailboats import (
+    FacetCount,
+    SailboatFacets,
+    SailboatForm,
+    SailboatListRequest,
+    SailboatOrdering,
+)
+
+logger = logging.getLogger(__name__)
+
+FACET_CACHE_TIMEOUT = 60 * 60
+
+# every ordering ends on the primary key so pages are stable between requests
+SAILBOAT_ORDERINGS = {
+    SailboatOrdering.name: (F("name").asc(), F("pk").asc()),
+    SailboatOrdering.name_desc: (F("name").desc(), F("pk").desc()),
+    SailboatOrdering.year: (
+        F("manufactured_start_year").asc(nulls_last=True),
+        F("pk").asc(),
+    ),
+    SailboatOrdering.year_desc: (
+        F("manufactured_start_year").desc(nulls_last=True),
+        F("pk").desc(),
+    ),
+    SailboatOrdering.relevance: (
+        F("search_rank").desc(),
+        F("name").asc(),
+        F("pk").asc(),
+    ),
+}
+
+
+def get_attributes_by_form_field() -> Dict[str, Attribute]:
+    """maps the `attr_<snake_case_name>` form field names to their attributes"""
+    return get_attribute_schema().by_form_field
+
+
+def _attribute_value_candidates(attribute: Attribute, value: str) -> List:
+    """the JSON values a form value could have been stored as. Form posts store
+    strings, vessel contributions store the value cast to the attribute data type"""
+    candidates = [value]
+    try:
+        match attribute.data_type:
+            case Attribute.DataType.FLOAT:
+                candidates.append(float(value))
+            case Attribute.DataType.INTEGER:
+                candidates.append(int(value))
+    except ValueError:
+        pass
+    return candidates
+
+
+def _attribute_filter(attribute: Attribute, values: List[str]) -> Exists:
+    """sailboats with at least one of `values` recorded for `attribute`.
+    `values @> '[...]'` is answered by the jsonb_path_ops GIN index"""
+    matches = Q()
+    for value in values:
+        for candidate in _attribute_value_candidates(attribute, value):
+            matches |= Q(values__contains=[candidate])
+    return Exists(
+        SailboatAttribute.objects.filter(
+            matches, sailboat=OuterRef("pk"), attribute=attribute
+        )
+    )
+
+
+def get_sailboat_ordering(request: SailboatListRequest) -> tuple:
+    """the order_by expressions for a request, relevance needs a search"""
+    if request.order_by == SailboatOrdering.relevance and not request.search:
+        return SAILBOAT_ORDERINGS[SailboatOrdering.name]
+    return SAILBOAT_ORDERINGS[request.order_by]
+
+
+def get_sailboats(request: SailboatListRequest) -> QuerySet:
+    """compiles the catalog filters into a single sailboat query"""
+    sailboats = Sailboat.objects.select_related("make")
+
+    if request.search:
+        sailboats = search(sailboats, request.search)
+
+    if request.name:
+        sailboats = sailboats.filter(name__icontains=request.name)
+    if request.make:
+        sailboats = sailboats.filter(make__name=request.make)
+    if request.designer:
+        sailboats = sailboats.filter(
+            Exists(
+                Sailboat.designers.through.objects.filter(
+                    sailboat=OuterRef("pk"), designer__name=request.designer
+                )
+            )
+        )
+    # a model matches a year range if its production run overlaps it,
+    # a model without an end year is treated as a single year run
+    if request.year_start:
+        sailboats = sailboats.filter(
+            Q(manufactured_end_year__gte=request.year_start)
+            | Q(
+                manufactured_end_year__isnull=True,
+                manufactured_start_year__gte=request.year_start,
+            )
+        )
+    if request.year_end:
+        sailboats = sailboats.filter(manufactured_start_year__lte=request.year_end)
+
+    if request.attributes:
+        attributes = get_attributes_by_form_field()
+        for field_name, values in request.attributes.items():
+            if attribute := attributes.get(field_name):
+                sailboats = sailboats.filter(_attribute_filter(attribute, values))
+
+    return sailboats.order_by(*get_sailboat_ordering(request))
+
+
+def get_sailboat_cards(
+    sailboats: Iterable[Sailboat], attributes: Iterable[Attribute] = ()
+) -> List[Sailboat]:
+    """loads everything a catalog card shows for a page of sailboats in a
+    constant number of queries, no matter how many cards or attributes.
+
+    Each sailboat gets `card_attributes` ({attribute name: values}, in the
+    order of `attributes`, only those it has values for) and `card_image`
+    (its first image or None). Designers are prefetched."""
+    sailboats = list(sailboats)
+    attributes = list(attributes)
+    ids = [sailboat.pk for sailboat in sailboats]
+
+    values_by_sailboat: Dict[int, Dict[int, List]] = {}
+    if attributes and ids:
+        for sailboat_id, attribute_id, values in SailboatAttribute.objects.filter(
+            sailboat_id__in=ids, attribute__in=attributes
+        ).values_list("sailboat_id", "attribute_id", "values"):
+            values_by_sailboat.setdefault(sailboat_id, {})[attribute_id] = values
+
+    first_images = {}
+    for sailboat_image in (
+        SailboatImage.objects.filter(sailboat_id__in=ids)
+        .select_related("image")
+        .order_by("sailboat_id", "order")
+    ):
+        first_images.setdefault(sailboat_image.sailboat_id, sailboat_image.image)
+
+    prefetch_related_objects(
+        sailboats, Prefetch("designers", queryset=Designer.objects.order_by("name"))
+    )
+    for sailboat in sailboats:
+        values = values_by_sailboat.get(sailboat.pk, {})
+        sailboat.card_attributes = {
+            attribute.name: values[attribute.pk]
+            for attribute in attributes
+            if values.get(attribute.pk)
+        }
+        sailboat.card_image = first_images.get(sailboat.pk)
+    return sailboats
+
+
+def _facet_base(request: SailboatListRequest, **without) -> QuerySet:
+    """the sailboats matching `request` with the given filters cleared,
+    as a plain queryset to aggregate over"""
+    matching = get_sailboats(request.model_copy(update=without))
+    return Sailboat.objects.filter(pk__in=matching.order_by().values("pk"))
+
+
+def _year_facets(sailboats: QuerySet) -> List[FacetCount]:
+    """decades overlapping each model's production run, matching how the
+    year filters treat a run"""
+    decades: Counter = Counter()
+    for start, end in sailboats.filter(
+        manufactured_start_year__isnull=False
+    ).values_list("manufactured_start_year", "manufactured_end_year"):
+        for decade in range(start // 10 * 10, (end or start) // 10 * 10 + 1, 10):
+            decades[decade] += 1
+    return [
+        FacetCount(value=str(decade), label=f"{decade}s", count=count)
+        for decade, count in sorted(decades.items())
+    ]
+
+
+def _option_counts(sailboats: QuerySet, attributes: List[Attribute]) -> Dict:
+    counts: Dict[int, Counter] = {attribute.pk: Counter() for attribute in attributes}
+    for attribute_id, values in SailboatAttribute.objects.filter(
+        sailboat__in=sailboats, attribute__in=attributes
+    ).values_list("attribute_id", "values"):
+        counts[attribute_id].update({str(value) for value in values or []})
+    return counts
+
+
+def _compute_sailboat_facets(request: SailboatListRequest) -> SailboatFacets:
+    makes = (
+        _facet_base(request, make=None)
+        .values("make__name")
+        .annotate(count=Count("pk"))
+        .order_by("make__name")
+    )
+    designers = (
+        Sailboat.designers.through.objects.filter(
+            sailboat__in=_facet_base(request, designer=None)
+        )
+        .values("designer__name")
+        .annotate(count=Count("sailboat"))
+        .order_by("designer__name")
+    )
+
+    # attributes nobody is filtering on share one count over the full filter set,
+    # a filtered attribute is counted with its own filter removed
+    options = get_attribute_schema().options_attributes
+    unfiltered = [
+        attribute
+        for attribute in options
+        if attribute.get_form_field_name() not in request.attributes
+    ]
+    counts = _option_counts(_facet_base(request), unfiltered)
+    for attribute in options:
+        field_name = attribute.get_form_field_name()
+        if field_name in request.attributes:
+            others = {
+                key: value
+                for key, value in request.attributes.items()
+                if key != field_name
+            }
+            counts.update(
+                _option_counts(_facet_base(request, attributes=others), [attribute])
+            )
+
+    return SailboatFacets(
+        makes=[
+            FacetCount(
+                value=row["make__name"], label=row["make__name"], count=row["count"]
+            )
+            for row in makes
+        ],
+        designers=[
+            FacetCount(
+                value=row["designer__name"],
+                label=row["designer__name"],
+                count=row["count"],
+            )
+            for row in designers
+        ],
+        years=_year_facets(_facet_base(request, year_start=None, year_end=None)),
+        attributes={
+            attribute.get_form_field_name(): dict(counts[attribute.pk])
+            for attribute in options
+        },
+    )
+
+
+def get_sailboat_facets(request: SailboatListRequest) -> SailboatFacets:
+    """facet counts for the catalog filters, cached per filter set until the
+    catalog changes (see the receivers bumping CATALOG_CACHE)"""
+    filters = request.model_dump_json(exclude={"order_by"})
+    key = versioned_key(
+        CATALOG_CACHE, "facets", hashlib.sha256(filters.encode()).hexdigest()
+    )
+    if (cached := cache.get(key)) is not None:
+        return SailboatFacets.model_validate(cached)
+    facets = _compute_sailboat_facets(request)
+    cache.set(key, facets.model_dump(), FACET_CACHE_TIMEOUT)
+    return facets
+
+
+def _sync_designers(sailboat: Sailboat, names: List[str]) -> int:
+    """link exactly the named designers, creating missing ones, and
+    returns the number of links changed"""
+    current = {designer.name: designer for designer in sailboat.designers.all()}
+    wanted = set(names)
+    removed = [designer for name, designer in current.items() if name not in wanted]
+    added_names = wanted - current.keys()
+    if removed:
+        sailboat.designers.remove(*removed)
+    if added_names:
+        Designer.objects.bulk_create(
+            [Designer(name=name) for name in added_names], ignore_conflicts=True
+        )
+        sailboat.designers.add(*Designer.objects.filter(name__in=added_names))
+    return len(removed) + len(added_names)
+
+
+def _sync_attributes(sailboat: Sailboat, posted: Dict[str, List[str]]) -> int:
+    """diff the posted attribute values against the stored ones and write
+    only the differences, returns the number of rows changed"""
+    attributes = get_attribute_schema().by_form_field
+    current = {
+        sailboat_attribute.attribute_id: sailboat_attribute
+        for sailboat_attribute in SailboatAttribute.objects.filter(sailboat=sailboat)
+    }
+    to_create, to_update, to_delete = [], [], []
+    for field_name, values in posted.items():
+        if not (attribute := attributes.get(field_name)):
+            continue
+        existing = current.get(attribute.id)
+        if not values:
+            if existing:
+                to_delete.append(existing.pk)
+        elif existing is None:
+            to_create.append(
+                SailboatAttribute(sailboat=sailboat, attribute=attribute, values=values)
+            )
+        elif existing.values != values:
+            existing.values = values
+            to_update.append(existing)
+
+    if to_create:
+        SailboatAttribute.objects.bulk_create(to_create)
+    if to_update:
+        SailboatAttribute.objects.bulk_update(to_update, ["values"])
+    if to_delete:
+        SailboatAttribute.objects.filter(pk__in=to_delete).delete()
+    return len(to_create) + len(to_update) + len(to_delete)
+
+
+@transaction.atomic
+def save_sailboat(form: SailboatForm, sailboat: Optional[Sailboat] = None) -> Sailboat:
+    """create (or update `sailboat`) from the sailboat form, touching only the
+    designers and attribute values that changed, in one transaction"""
+    make, _ = Make.objects.get_or_create(name=form.make)
+    sailboat = sailboat or Sailboat()
+    sailboat.name = form.name
+    sailboat.make = make
+    sailboat.manufactured_start_year = form.manufactured_start_year
+    sailboat.manufactured_end_year = form.manufactured_end_year
+    sailboat.save()
+
+    designers_changed = _sync_designers(sailboat, form.designers)
+    attributes_changed = _sync_attributes(sailboat, form.attributes)
+    if attributes_changed:
+        # bulk writes skip the signals that invalidate the catalog caches
+        transaction.on_commit(lambda: bump_cache_version(CATALOG_CACHE))
+    logger.info(
+        "Saved sailboat %s: %d designer and %d attribute changes",
+        sailboat.pk,
+        designers_changed,
+        attributes_changed,
+    )
+    return sailboat
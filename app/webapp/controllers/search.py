@@ -0,0 +1,45 @@
+import re
+from typing import List
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import F, FloatField, Q, QuerySet, Value
+
+# letters and digits only, so user input can't inject tsquery syntax
+SEARCH_TERM = re.compile(r"[^\W_]+")
+
+
+def get_search_terms(text: str) -> List[str]:
+    """the lowercased words of a search"""
+    return SEARCH_TERM.findall((text or "").lower())
+
+
+def search(queryset: QuerySet, text: str) -> QuerySet:
+    """ranked search over the `search_document` of vessels or sailboats,
+    annotated with `search_rank` (higher is better).
+
+    On postgres every word is a prefix match against the GIN indexed
+    `search_vector` (so `cata 30` finds `catalina 30` as it is typed),
+    OR'd with a pg_trgm word similarity match on the document so typos like
+    `catalena` still find something. Both sides are index scans, so latency
+    doesn't grow with the table. Other databases fall back to matching every
+    word with icontains."""
+    terms = get_search_terms(text)
+    if not terms or connections[queryset.db].vendor != "postgresql":
+        for term in terms:
+            queryset = queryset.filter(search_document__icontains=term)
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    query = SearchQuery(
+        " & ".join(f"{term}:*" for term in terms), search_type="raw", config="simple"
+    )
+    phrase = " ".join(terms)
+    return queryset.filter(
+        Q(search_vector=query) | Q(search_document__trigram_word_similar=phrase)
+    ).annotate(
+        search_rank=SearchRank(F("search_vector"), query)
+        + TrigramWordSimilarity(phrase, "search_document")
+    )
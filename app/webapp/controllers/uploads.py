@@ -0,0 +1,225 @@
+import math
+import mimetypes
+import os
+from typing import Iterable, List, Optional
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from webapp.logging import get_logger
+from webapp.media_urls import presigning_client
+from webapp.models.media import Media
+from webapp.models.user import User
+from webapp.schemas.uploads import (
+    CompletedPart,
+    UploadPartUrl,
+    UploadSession,
+    UploadStartRequest,
+)
+
+logger = get_logger(__name__)
+
+UPLOAD_TOKEN_SALT = "webapp.uploads"
+
+# S3 parts other than the last must be at least 5MB
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class DirectUploadError(ValueError):
+    """an upload session that can't be started or completed, the message is
+    safe to show to the uploader"""
+
+
+def _upload_setting(name: str, default):
+    return getattr(settings, "DIRECT_UPLOADS", {}).get(name, default)
+
+
+def _s3_storage():
+    """the media storage if it is an S3 bucket browsers can upload to"""
+    if not hasattr(default_storage, "bucket_name"):
+        raise DirectUploadError("Direct uploads need S3 media storage")
+    return default_storage
+
+
+def _storage_key(storage, name: str) -> str:
+    return storage._normalize_name(name)  # pylint: disable=protected-access
+
+
+def _content_type(filename: str, sent: Optional[str]) -> str:
+    """the type the object is stored as, from its extension, so a `.jpg` on
+    the public media domain can't be served as html or svg"""
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    if sent and sent.split(";")[0].strip().lower() != content_type:
+        raise DirectUploadError(f"{filename} should be sent as {content_type}")
+    return content_type
+
+
+def upload_token(
+    user: User, name: str, filename: str, size: int, upload_id: Optional[str] = None
+) -> str:
+    """a signed record of an upload in progress, so completing it needs no
+    table and can't be pointed at someone else's object"""
+    return signing.dumps(
+        {
+            "user": user.pk,
+            "name": name,
+            "filename": filename,
+            "size": size,
+            "upload_id": upload_id,
+        },
+        salt=UPLOAD_TOKEN_SALT,
+        compress=True,
+    )
+
+
+def start_upload(user: User, request: UploadStartRequest) -> UploadSession:
+    """presign a PUT (or for files over DIRECT_UPLOADS["PART_SIZE"], a
+    multipart upload) of a new media file straight to the bucket"""
+    max_size = _upload_setting("MAX_SIZE", 100 * 1024 * 1024)
+    if request.size > max_size:
+        raise DirectUploadError(f"Files can be at most {max_size // 2**20}MB")
+    filename = os.path.basename(request.filename)[:255]
+    try:
+        name = Media.new_file_name(filename)
+    except ValueError as exc:
+        raise DirectUploadError(str(exc)) from exc
+
+    content_type = _content_type(filename, request.content_type)
+
+    storage = _s3_storage()
+    key = _storage_key(storage, name)
+    client = presigning_client(storage)
+    expires_in = _upload_setting("EXPIRES_IN", 60 * 60)
+    object_parameters = {"ContentType": content_type}
+    if cache_control := storage.object_parameters.get("CacheControl"):
+        object_parameters["CacheControl"] = cache_control
+
+    part_size = max(_upload_setting("PART_SIZE", 16 * 1024 * 1024), MIN_PART_SIZE)
+    if request.size <= part_size:
+        # the signed length makes the bucket refuse anything bigger
+        url = client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": storage.bucket_name,
+                "Key": key,
+                "ContentLength": request.size,
+                **object_parameters,
+            },
+            ExpiresIn=expires_in,
+        )
+        headers = {"Content-Type": content_type}
+        if "CacheControl" in object_parameters:
+            headers["Cache-Control"] = object_parameters["CacheControl"]
+        return UploadSession(
+            token=upload_token(user, name, filename, request.size),
+            url=url,
+            headers=headers,
+        )
+
+    upload_id = storage.connection.meta.client.create_multipart_upload(
+        Bucket=storage.bucket_name, Key=key, **object_parameters
+    )["UploadId"]
+    return UploadSession(
+        token=upload_token(user, name, filename, request.size, upload_id),
+        part_size=part_size,
+        parts=[
+            UploadPartUrl(
+                part_number=part_number,
+                url=client.generate_presigned_url(
+                    "upload_part",
+                    Params={
+                        "Bucket": storage.bucket_name,
+                        "Key": key,
+                        "UploadId": upload_id,
+                        "PartNumber": part_number,
+                    },
+                    ExpiresIn=expires_in,
+                ),
+            )
+            for part_number in range(1, math.ceil(request.size / part_size) + 1)
+        ],
+    )
+
+
+def _complete_multipart_upload(
+    name: str, upload_id: str, parts: Iterable[CompletedPart]
+):
+    """join the parts, or abort the upload when they don't add up. The media
+    GC only sees finished objects, so parts of an upload left open would stay
+    in the bucket"""
+    storage = _s3_storage()
+    client = storage.connection.meta.client
+    key = _storage_key(storage, name)
+    try:
+        client.complete_multipart_upload(
+            Bucket=storage.bucket_name,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"PartNumber": part.part_number, "ETag": part.etag}
+                    for part in sorted(parts, key=lambda part: part.part_number)
+                ]
+            },
+        )
+    except ClientError as exc:
+        logger.warning("Aborting multipart upload of %s: %s", name, exc)
+        try:
+            client.abort_multipart_upload(
+                Bucket=storage.bucket_name, Key=key, UploadId=upload_id
+            )
+        except ClientError:
+            logger.exception("Aborting multipart upload of %s failed", name)
+        raise DirectUploadError("The upload's parts don't match the file") from exc
+
+
+def complete_upload(
+    user: User, token: str, parts: Iterable[CompletedPart] = ()
+) -> Media:
+    """check the uploaded object is there and create its `Media`, which images
+    are then processed from like any other upload. Completing twice returns
+    the same `Media`"""
+    try:
+        upload = signing.loads(
+            token,
+            salt=UPLOAD_TOKEN_SALT,
+            max_age=_upload_setting("EXPIRES_IN", 60 * 60) * 2,
+        )
+    except signing.BadSignature as exc:
+        raise DirectUploadError("Invalid or expired upload") from exc
+    if upload["user"] != user.pk:
+        raise DirectUploadError("Invalid or expired upload")
+
+    name = upload["name"]
+    if existing := Media.objects.filter(file=name).first():
+        return existing
+
+    if upload["upload_id"]:
+        _complete_multipart_upload(name, upload["upload_id"], parts)
+    if not default_storage.exists(name):
+        raise DirectUploadError("The file hasn't been uploaded")
+    if default_storage.size(name) != upload["size"]:
+        default_storage.delete(name)
+        raise DirectUploadError("The uploaded file doesn't match its size")
+
+    media = Media.for_stored_file(
+        name, original_filename=upload["filename"], uploaded_by=user
+    )
+    media.save()
+    return media
+
+
+def get_uploaded_media(user: User, ids: Iterable) -> List[Media]:
+    """the direct uploads a form refers to by id, in the order given, ignoring
+    ids that aren't the user's uploads or that something already uses.
+    Attachments delete their media with them, so media shared between two
+    owners would go when either does"""
+    ids = [int(media_id) for media_id in ids if str(media_id).isdigit()]
+    by_id = Media.objects.filter(
+        pk__in=ids,
+        uploaded_by=user,
+        vesselimage__isnull=True,
+        sailboatimage__isnull=True,
+        logentryattachment__isnull=True,
+    ).in_bulk()
+    return [by_id[media_id] for media_id in dict.fromkeys(ids) if media_id in by_id]
@@ -0,0 +1,189 @@
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+from django.conf import settings
+from django.db.models import F, Prefetch, Q
+from webapp.models.attribute import Attribute, AttributeSection
+from webapp.models.designer import Designer
+from webapp.models.logbook import LogEntry, LogEntryAttachment, LogEntryLocation
+from webapp.models.media import Media
+from webapp.models.vessel import Vessel, VesselAttribute, VesselImage
+from webapp.models.vessel_note import NoteMessage, VesselNote
+from webapp.pagination import KeysetPage, KeysetPaginator
+
+if TYPE_CHECKING:
+    from webapp.models.user import User
+
+# newest first, the pk breaks ties between entries logged at the same time
+LOGBOOK_ORDERING = (F("log_timestamp").desc(), F("pk").desc())
+
+
+@dataclass(frozen=True)
+class AttributeValue:
+    attribute: Attribute
+    value: object
+
+    @property
+    def info(self) -> str:
+        return self.attribute.description
+
+
+@dataclass(frozen=True)
+class AttributeGroup:
+    section: AttributeSection
+    attributes: Tuple[AttributeValue, ...]
+
+
+@dataclass(frozen=True)
+class LogbookEntry:
+    """a log entry with everything its card shows, so rendering it runs no
+    queries"""
+
+    entry: LogEntry
+    locations: Tuple[LogEntryLocation, ...]
+    image_attachments: Tuple[LogEntryAttachment, ...]
+    other_attachments: Tuple[LogEntryAttachment, ...]
+    can_edit: bool
+
+
+@dataclass(frozen=True)
+class VesselDetail:
+    """everything the vessel detail page shows, loaded up front by
+    `load_vessel_detail`. Private vessels the user can't see only get the
+    vessel itself"""
+
+    vessel: Vessel
+    can_view: bool
+    can_manage: bool = False
+    can_crew: bool = False
+    images: Tuple[Media, ...] = ()
+    designers: Tuple[Designer, ...] = ()
+    attribute_groups: Tuple[AttributeGroup, ...] = ()
+    notes: Tuple[VesselNote, ...] = ()
+    user_note: Optional[VesselNote] = None
+    # the page of the logbook asked for, of `LogbookEntry`
+    logbook: Optional[KeysetPage] = None
+    logbook_count: int = 0
+
+    @property
+    def is_obfuscated(self) -> bool:
+        return not self.can_view
+
+    @property
+    def first_image(self) -> Optional[Media]:
+        return self.images[0] if self.images else None
+
+
+def _attribute_groups(vessel: Vessel) -> Tuple[AttributeGroup, ...]:
+    groups: Dict[int, list] = {}
+    sections: Dict[int, AttributeSection] = {}
+    for vessel_attribute in VesselAttribute.objects.filter(
+        vessel=vessel
+    ).select_related("attribute__section"):
+        section = vessel_attribute.attribute.section
+        sections.setdefault(section.pk, section)
+        groups.setdefault(section.pk, []).append(
+            AttributeValue(vessel_attribute.attribute, vessel_attribute.value)
+        )
+    return tuple(
+        AttributeGroup(sections[section_id], tuple(values))
+        for section_id, values in groups.items()
+    )
+
+
+def _notes(vessel: Vessel, user: "User") -> Tuple[VesselNote, ...]:
+    """the notes the user owns or that are shared with them"""
+    return tuple(
+        VesselNote.objects.filter(vessel=vessel)
+        .filter(Q(user=user) | Q(pk__in=user.shared_vessel_notes.values("pk")))
+        .select_related("user")
+        .prefetch_related(
+            "shared_with",
+            Prefetch("messages", queryset=NoteMessage.objects.select_related("user")),
+        )
+    )
+
+
+def _logbook_entry(entry: LogEntry, can_edit: bool) -> LogbookEntry:
+    attachments = entry.attachments.all()
+    return LogbookEntry(
+        entry=entry,
+        locations=tuple(entry.locations.all()),
+        image_attachments=tuple(a for a in attachments if a.attachment_type == "image"),
+        other_attachments=tuple(a for a in attachments if a.attachment_type != "image"),
+        can_edit=can_edit,
+    )
+
+
+def load_logbook_page(
+    vessel: Vessel, user: "User", cursor: Optional[str] = None
+) -> KeysetPage:
+    """a page of the vessel's logbook, newest first, as `LogbookEntry`. Three
+    queries however long the page: the entries with their authors, then
+    the locations and the attachments with their media"""
+    entries = (
+        LogEntry.objects.filter(vessel=vessel)
+        .select_related("author")
+        .prefetch_related(
+            "locations",
+            Prefetch(
+                "attachments",
+                queryset=LogEntryAttachment.objects.select_related("media"),
+            ),
+        )
+    )
+    page = KeysetPaginator(
+        entries,
+        LOGBOOK_ORDERING,
+        per_page=getattr(settings, "VESSEL_LOGBOOK_PAGE_SIZE", 20),
+    ).get_page(cursor)
+    # authors edit their own entries, skippers everyone's (`LogEntry.can_edit`)
+    can_manage = user.can_manage_vessel(vessel)
+    return replace(
+        page,
+        object_list=[
+            _logbook_entry(entry, can_manage or entry.author_id == user.pk)
+            for entry in page
+        ],
+    )
+
+
+def load_vessel_detail(
+    vessel: Vessel, user: "User", logbook_cursor: Optional[str] = None
+) -> VesselDetail:
+    """the vessel detail page for `user` in a fixed number of queries however
+    many images, notes and log entries the vessel has: one for the user's
+    role, then one each for the images, designers and attributes, three for
+    the notes, and the logbook's count and first page (or the page at
+    `logbook_cursor`), see `load_logbook_page`.
+
+    `vessel` should come with its sailboat and make selected"""
+    if not vessel.is_public and not (
+        user.is_authenticated and user.can_view_vessel(vessel)
+    ):
+        return VesselDetail(vessel=vessel, can_view=False)
+
+    detail = VesselDetail(
+        vessel=vessel,
+        can_view=True,
+        can_manage=user.is_authenticated and user.can_manage_vessel(vessel),
+        can_crew=user.is_authenticated and user.can_crew_vessel(vessel),
+        images=tuple(
+            vessel_image.image
+            for vessel_image in VesselImage.objects.filter(vessel=vessel)
+            .select_related("image")
+            .order_by("order")
+        ),
+        designers=tuple(vessel.sailboat.designers.all()),
+        attribute_groups=_attribute_groups(vessel),
+    )
+    if not user.is_authenticated:
+        return detail
+
+    notes = _notes(vessel, user)
+    return replace(
+        detail,
+        notes=notes,
+        user_note=next((note for note in notes if note.user_id == user.pk), None),
+        logbook=load_logbook_page(vessel, user, logbook_cursor),
+        logbook_count=LogEntry.objects.filter(vessel=vessel).count(),
+    )
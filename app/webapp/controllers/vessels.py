@@ -1,13 +1,173 @@
+from typing import Dict, Iterable, List, Optional, Tuple
 from webapp.schemas.vessels import VesselListRequest
 from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, QuerySet, Subquery
+from webapp.controllers.attributes import get_attribute_schema
+from webapp.controllers.search import search
+from webapp.models.attribute import Attribute
 from webapp.models.sailboat import Sailboat, Make
-from webapp.models.vessel import Vessel
-from webapp.schemas.vessels import VesselCreateRequest
+from webapp.models.vessel import Vessel, VesselAttribute
+from webapp.schemas.vessels import (
+    VesselCreateRequest,
+    VesselFilter,
+    VesselFilterOperator,
+)
 
+# columns on the vessel itself that can be filtered and sorted on directly,
+# anything else is looked up as an attribute by name
+VESSEL_FIELDS = {
+    "name": "name",
+    "year_built": "year_built",
+    "hull_identification_number": "hull_identification_number",
+    "hin": "hull_identification_number",
+    "uscg_number": "USCG_number",
+    "home_port": "home_port",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+}
 
-def get_vessels(request: VesselListRequest):
-    """finds <page_size> vessels, starting from <page>, that match the filters"""
-    raise NotImplementedError("Not implemented yet")
+# orderings for the vessel listings, each ends on the primary key
+# so cursors are stable; relevance needs a `search` annotation
+VESSEL_ORDERINGS = {
+    "name": (F("name").asc(), F("pk").asc()),
+    "-name": (F("name").desc(), F("pk").desc()),
+    "year_built": (F("year_built").asc(nulls_last=True), F("pk").asc()),
+    "-year_built": (F("year_built").desc(nulls_last=True), F("pk").desc()),
+    "created_at": (F("created_at").asc(), F("pk").asc()),
+    "-created_at": (F("created_at").desc(), F("pk").desc()),
+    "relevance": (F("search_rank").desc(), F("pk").asc()),
+}
+DEFAULT_VESSEL_ORDERING = "-created_at"
+
+# `ne` is compiled as the negation of `eq`
+OPERATOR_LOOKUPS = {
+    VesselFilterOperator.eq: "exact",
+    VesselFilterOperator.ne: "exact",
+    VesselFilterOperator.gt: "gt",
+    VesselFilterOperator.gte: "gte",
+    VesselFilterOperator.lt: "lt",
+    VesselFilterOperator.lte: "lte",
+}
+
+
+def _get_attributes_by_name(names: Iterable[str]) -> Dict[str, Attribute]:
+    """resolves attribute names case-insensitively from the attribute schema,
+    raises ValueError for names that aren't vessel fields or attributes"""
+    names = {name.lower() for name in names}
+    by_name = get_attribute_schema().by_name
+    attributes = {name: by_name[name] for name in names if name in by_name}
+    if unknown := names - attributes.keys():
+        raise ValueError(f"Unknown vessel attribute(s): {', '.join(sorted(unknown))}")
+    return attributes
+
+
+def _attribute_filter(attribute: Attribute, vessel_filter: VesselFilter) -> Q:
+    """vessels with a value for `attribute` matching the filter. The comparison
+    runs against the typed value column so it is answered by the
+    (attribute, value_*) index instead of casting every row"""
+    try:
+        value = VesselAttribute.cast_value(attribute, vessel_filter.value)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(
+            f"{vessel_filter.value!r} is not a valid {attribute.data_type} "
+            f"value for {attribute.name}"
+        ) from exc
+    field = VesselAttribute.typed_value_field(attribute)
+    lookup = OPERATOR_LOOKUPS[vessel_filter.operator]
+    matches = Exists(
+        VesselAttribute.objects.filter(
+            vessel=OuterRef("pk"),
+            attribute=attribute,
+            **{f"{field}__{lookup}": value},
+        )
+    )
+    if vessel_filter.operator == VesselFilterOperator.ne:
+        return ~matches
+    return Q(matches)
+
+
+def _field_filter(field: str, vessel_filter: VesselFilter) -> Q:
+    lookup = OPERATOR_LOOKUPS[vessel_filter.operator]
+    matches = Q(**{f"{field}__{lookup}": vessel_filter.value})
+    if vessel_filter.operator == VesselFilterOperator.ne:
+        return ~matches
+    return matches
+
+
+def get_vessel_listing(
+    search_query: Optional[str],
+    order_by: Optional[str],
+    vessels: Optional[QuerySet] = None,
+) -> Tuple[QuerySet, tuple]:
+    """the vessels for the vessel index and its ordering, for a keyset paginator.
+    Searches rank by relevance unless another ordering is asked for"""
+    vessels = (vessels if vessels is not None else Vessel.objects.all()).select_related(
+        "sailboat", "sailboat__make"
+    )
+    if search_query:
+        vessels = search(vessels, search_query)
+        order_by = order_by if order_by in VESSEL_ORDERINGS else "relevance"
+    elif order_by not in VESSEL_ORDERINGS or order_by == "relevance":
+        order_by = DEFAULT_VESSEL_ORDERING
+    return vessels, VESSEL_ORDERINGS[order_by]
+
+
+def get_vessels(
+    request: VesselListRequest, vessels: Optional[QuerySet] = None
+) -> List[Vessel]:
+    """finds <page_size> vessels, starting from <page>, that match the filters.
+    Every filter and ordering is compiled into a single query; `vessels` can
+    narrow the starting set (ie to what the user is allowed to see)"""
+    vessels = (vessels if vessels is not None else Vessel.objects.all()).select_related(
+        "sailboat", "sailboat__make"
+    )
+    orderings = [
+        (name[1:] if name.startswith("-") else name, name.startswith("-"))
+        for name in request.order_by
+    ]
+    attributes = _get_attributes_by_name(
+        [
+            f.attribute
+            for f in request.filters
+            if f.attribute.lower() not in VESSEL_FIELDS
+        ]
+        + [name for name, _ in orderings if name.lower() not in VESSEL_FIELDS]
+    )
+
+    for vessel_filter in request.filters:
+        name = vessel_filter.attribute.lower()
+        if field := VESSEL_FIELDS.get(name):
+            vessels = vessels.filter(_field_filter(field, vessel_filter))
+        else:
+            vessels = vessels.filter(_attribute_filter(attributes[name], vessel_filter))
+
+    order_by = []
+    for index, (name, descending) in enumerate(orderings):
+        if field := VESSEL_FIELDS.get(name.lower()):
+            expression = F(field)
+        else:
+            attribute = attributes[name.lower()]
+            alias = f"_order_{index}"
+            vessels = vessels.alias(
+                **{
+                    alias: Subquery(
+                        VesselAttribute.objects.filter(
+                            vessel=OuterRef("pk"), attribute=attribute
+                        ).values(VesselAttribute.typed_value_field(attribute))[:1]
+                    )
+                }
+            )
+            expression = F(alias)
+        order_by.append(
+            expression.desc(nulls_last=True)
+            if descending
+            else expression.asc(nulls_last=True)
+        )
+    # end on the primary key so pages are stable between requests
+    order_by.append(F("pk").asc())
+
+    offset = (request.page - 1) * request.page_size
+    return list(vessels.order_by(*order_by)[offset : offset + request.page_size])
 
 
 @transaction.atomic
@@ -34,14 +194,9 @@ def create_vessel(request: VesselCreateRequest) -> int:
     )
 
     # handle images and attributes
-    for image in request.images:
-        vessel.add_image(image)
-
-    for attribute in request.attributes:
-        vessel.create_or_update_attribute(attribute)
+    vessel.add_images(request.images, user=request.user)
 
-    for attribute_assignment in request.attributes:
-        vessel.create_or_update_attribute(attribute_assignment)
+    vessel.set_attributes(request.attributes, user=request.user)
 
     vessel.save()
     return vessel.id
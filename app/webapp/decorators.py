@@ -1,6 +1,7 @@
 from functools import wraps
 from django.shortcuts import redirect, get_object_or_404
 from django.contrib import messages
+from webapp.controllers.roles import ROLE_PERMISSIONS
 from webapp.models.vessel import Vessel
 
 
@@ -17,35 +18,40 @@ def admin_or_moderator_required(view_func):
     return _wrapped_view
 
 
-def vessel_permission_required(permission):
-    """
-    Decorator that checks if user has specified permission on vessel.
-    Expects vessel_id in URL kwargs or pk.
-    """
+def get_request_vessel(request, pk) -> Vessel:
+    """the vessel a `vessel_*_required` decorator already loaded for the
+    request, so the view doesn't load it again"""
+    vessel = getattr(request, "vessel", None)
+    if vessel is not None and vessel.pk == int(pk):
+        return vessel
+    return get_object_or_404(Vessel, pk=pk)
+
+
+def _vessel_access_required(allowed, login_message, denied_message, denied_redirect):
+    """load the vessel of the url (`vessel_id` or `pk`) once and let the view
+    run if `allowed(user, vessel)`. The vessel is passed on as
+    `request.vessel`, see `get_request_vessel`"""
 
     def decorator(view_func):
         @wraps(view_func)
         def _wrapped_view(request, *args, **kwargs):
             if not request.user.is_authenticated:
-                messages.error(request, "You must be logged in to access this vessel.")
+                messages.error(request, login_message)
                 return redirect("account_login")
 
-            # Get vessel ID from URL kwargs
             vessel_id = kwargs.get("vessel_id") or kwargs.get("pk")
             if not vessel_id:
                 messages.error(request, "Vessel not found.")
                 return redirect("vessels_index")
 
-            vessel = get_object_or_404(Vessel, pk=vessel_id)
-
-            # Check permission
-            if not request.user.has_perm(permission, vessel):
-                messages.error(
-                    request,
-                    "You don't have permission to perform this action on this vessel.",
-                )
-                return redirect("vessel_detail", pk=vessel.pk)
+            vessel = get_object_or_404(
+                Vessel.objects.select_related("sailboat__make"), pk=vessel_id
+            )
+            if not allowed(request.user, vessel):
+                messages.error(request, denied_message)
+                return redirect(*denied_redirect(vessel))
 
+            request.vessel = vessel
             return view_func(request, *args, **kwargs)
 
         return _wrapped_view
@@ -53,81 +59,49 @@ def vessel_permission_required(permission):
     return decorator
 
 
-def vessel_skipper_required(view_func):
-    """Decorator that requires skipper permissions on vessel"""
+def _to_vessel_detail(vessel):
+    return "vessel_detail", vessel.pk
 
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            messages.error(request, "You must be logged in to manage this vessel.")
-            return redirect("account_login")
-
-        vessel_id = kwargs.get("vessel_id") or kwargs.get("pk")
-        if not vessel_id:
-            messages.error(request, "Vessel not found.")
-            return redirect("vessels_index")
-
-        vessel = get_object_or_404(Vessel, pk=vessel_id)
 
-        if not request.user.can_manage_vessel(vessel):
-            messages.error(request, "Only vessel skippers can perform this action.")
-            return redirect("vessel_detail", pk=vessel.pk)
+def vessel_permission_required(permission):
+    """
+    Decorator that checks if user has specified permission on vessel.
+    Expects vessel_id in URL kwargs or pk.
+    """
+    required_role = ROLE_PERMISSIONS[permission.split(".")[-1]]
+    return _vessel_access_required(
+        lambda user, vessel: user.vessel_roles.role(vessel) >= required_role,
+        "You must be logged in to access this vessel.",
+        "You don't have permission to perform this action on this vessel.",
+        _to_vessel_detail,
+    )
 
-        return view_func(request, *args, **kwargs)
 
-    return _wrapped_view
+def vessel_skipper_required(view_func):
+    """Decorator that requires skipper permissions on vessel"""
+    return _vessel_access_required(
+        lambda user, vessel: user.can_manage_vessel(vessel),
+        "You must be logged in to manage this vessel.",
+        "Only vessel skippers can perform this action.",
+        _to_vessel_detail,
+    )(view_func)
 
 
 def vessel_crew_or_skipper_required(view_func):
     """Decorator that requires crew or skipper permissions on vessel"""
-
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            messages.error(request, "You must be logged in to add logs to this vessel.")
-            return redirect("account_login")
-
-        vessel_id = kwargs.get("vessel_id") or kwargs.get("pk")
-        if not vessel_id:
-            messages.error(request, "Vessel not found.")
-            return redirect("vessels_index")
-
-        vessel = get_object_or_404(Vessel, pk=vessel_id)
-
-        if not request.user.can_crew_vessel(vessel):
-            messages.error(request, "Only vessel crew and skippers can add logs.")
-            return redirect("vessel_detail", pk=vessel.pk)
-
-        return view_func(request, *args, **kwargs)
-
-    return _wrapped_view
+    return _vessel_access_required(
+        lambda user, vessel: user.can_crew_vessel(vessel),
+        "You must be logged in to add logs to this vessel.",
+        "Only vessel crew and skippers can add logs.",
+        _to_vessel_detail,
+    )(view_func)
 
 
 def vessel_viewer_required(view_func):
     """Decorator that requires any permission to view vessel details"""
-
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            messages.error(
-                request, "You must be logged in to view this private vessel."
-            )
-            return redirect("account_login")
-
-        vessel_id = kwargs.get("vessel_id") or kwargs.get("pk")
-        if not vessel_id:
-            messages.error(request, "Vessel not found.")
-            return redirect("vessels_index")
-
-        vessel = get_object_or_404(Vessel, pk=vessel_id)
-
-        if not request.user.can_view_vessel(vessel):
-            messages.error(
-                request,
-                "This vessel is private and you don't have permission to view it.",
-            )
-            return redirect("vessels_index")
-
-        return view_func(request, *args, **kwargs)
-
-    return _wrapped_view
+    return _vessel_access_required(
+        lambda user, vessel: user.can_view_vessel(vessel),
+        "You must be logged in to view this private vessel.",
+        "This vessel is private and you don't have permission to view it.",
+        lambda vessel: ("vessels_index",),
+    )(view_func)
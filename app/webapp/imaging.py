@@ -0,0 +1,185 @@
+import base64
+import math
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional, Tuple
+from PIL import Image as PilImage
+from PIL import ExifTags, ImageOps
+
+# widths of the resized copies kept for every image, for `srcset`. An image is
+# never scaled up, a narrower image gets the widths below it and its own width
+DERIVATIVE_WIDTHS = (160, 320, 640, 1024, 1600)
+
+# format name in `Media.derivatives` -> (Pillow format, file extension, save options)
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# encoded images up to this size are kept in memory, larger ones spill to disk
+SPOOL_MAX_SIZE = 1024 * 1024
+
+# widths tried for the inline placeholder, the first one that fits in
+# PLACEHOLDER_MAX_BYTES (as a data uri) is kept
+PLACEHOLDER_WIDTHS = (24, 16, 12, 8)
+PLACEHOLDER_MAX_BYTES = 1024
+
+# EXIF orientations that turn the stored image a quarter turn
+_ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+class DecodedImage(NamedTuple):
+    image: PilImage.Image
+    # the upright size of the stored image, before any reduced resolution decode
+    source_size: Tuple[int, int]
+
+
+def fit_size(size: Tuple[int, int], max_size: int) -> Tuple[int, int]:
+    """`size` scaled down (never up) to fit a `max_size` square"""
+    scale = min(1, max_size / max(size))
+    return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
+
+def decode(
+    file: BinaryIO, max_size: Optional[int] = None, max_pixels: Optional[int] = None
+) -> DecodedImage:
+    """decode an image upright (camera photos are often stored sideways with
+    an EXIF orientation), raises `PIL.UnidentifiedImageError` for non images.
+
+    With `max_size` the full size bitmap of a large photo is never held:
+    JPEGs are decoded by libjpeg at 1/2, 1/4 or 1/8 scale (whichever still
+    covers `max_size`), and other formats are box reduced right after
+    decoding. Those have to be decoded at full size, so anything over
+    `max_pixels` is refused with `DecompressionBombError`"""
+    image = PilImage.open(file)
+    source_size = image.size
+    if max_size and image.format == "JPEG":
+        image.draft("RGB", fit_size(source_size, max_size))
+    elif max_pixels and source_size[0] * source_size[1] > max_pixels:
+        raise PilImage.DecompressionBombError(
+            f"{source_size[0]}x{source_size[1]} is over {max_pixels} pixels"
+        )
+    if image.getexif().get(ExifTags.Base.Orientation) in _ROTATED_ORIENTATIONS:
+        source_size = source_size[::-1]
+    image = ImageOps.exif_transpose(image)
+    image.load()
+    if max_size:
+        target = fit_size(image.size, max_size)
+        factor = min(image.width // target[0], image.height // target[1])
+        if factor >= 2:
+            image = image.reduce(factor)
+    return DecodedImage(image, source_size)
+
+
+def open_image(file: BinaryIO) -> PilImage.Image:
+    """decode an image upright at full size, see `decode`"""
+    return decode(file).image
+
+
+# how `transform` fits an image into a box: cropped to fill it, or scaled to
+# fit inside it
+TRANSFORM_FITS = ("cover", "contain")
+
+
+def transform_decode_size(
+    source_size: Tuple[int, int], size: Tuple[int, int], fit: str
+) -> int:
+    """the longest side `source_size` has to be decoded at for `transform`"""
+    scales = (size[0] / source_size[0], size[1] / source_size[1])
+    scale = min(1, max(scales) if fit == "cover" else min(scales))
+    return max(1, math.ceil(max(source_size) * scale))
+
+
+def transform(image: PilImage.Image, size: Tuple[int, int], fit: str) -> PilImage.Image:
+    """`image` to `size` by `fit` (see TRANSFORM_FITS), never scaled up. A
+    cover crop of a smaller image keeps the aspect ratio of `size`"""
+    if fit == "cover":
+        scale = min(1, image.width / size[0], image.height / size[1])
+        box = (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+        return ImageOps.fit(image, box, PilImage.Resampling.LANCZOS)
+    contained = image.copy()
+    contained.thumbnail(size, PilImage.Resampling.LANCZOS)
+    return contained
+
+
+def derivative_widths(width: int) -> Tuple[int, ...]:
+    widths = tuple(size for size in DERIVATIVE_WIDTHS if size < width)
+    return widths + (min(width, DERIVATIVE_WIDTHS[-1]),)
+
+
+def encode(image: PilImage.Image, format_name: str) -> SpooledTemporaryFile:
+    """encode to one of `DERIVATIVE_FORMATS`"""
+    pil_format, _, options = DERIVATIVE_FORMATS[format_name]
+    return encode_as(image, pil_format, **options)
+
+
+def encode_as(
+    image: PilImage.Image, pil_format: str, **options
+) -> SpooledTemporaryFile:
+    """encode to a Pillow format into a rewound file that can be handed to
+    storage as is, without copying the encoded bytes around. JPEG has no
+    alpha channel so transparent images are flattened onto white"""
+    if pil_format == "JPEG" and image.mode != "RGB":
+        image = flatten(image)
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    # pylint: disable-next=consider-using-with
+    encoded = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    image.save(encoded, format=pil_format, **options)
+    encoded.seek(0)
+    return encoded
+
+
+def flatten(image: PilImage.Image) -> PilImage.Image:
+    """the image as RGB, with any transparency flattened onto white"""
+    if image.mode == "RGB":
+        return image
+    rgba = image.convert("RGBA")
+    flat = PilImage.new("RGB", rgba.size, (255, 255, 255))
+    flat.paste(rgba, mask=rgba.getchannel("A"))
+    return flat
+
+
+def dominant_color(image: PilImage.Image) -> str:
+    """the most common color of the image as `#rrggbb`, from a small median
+    cut palette so near identical shades count together"""
+    small = flatten(image)
+    if max(small.size) > 64:
+        small = small.resize(fit_size(small.size, 64), PilImage.Resampling.BOX)
+    palette_image = small.quantize(colors=8, method=PilImage.Quantize.MEDIANCUT)
+    _, index = max(palette_image.getcolors())
+    red, green, blue = palette_image.getpalette()[index * 3 : index * 3 + 3]
+    return f"#{red:02x}{green:02x}{blue:02x}"
+
+
+def placeholder(image: PilImage.Image) -> str:
+    """a blurry few pixel wide WebP of the image as a `data:` uri of at most
+    PLACEHOLDER_MAX_BYTES, for inlining in the page while the image loads.
+    Empty if not even the smallest width fits"""
+    for width in PLACEHOLDER_WIDTHS:
+        tiny = image.resize(fit_size(image.size, width), PilImage.Resampling.BOX)
+        with encode_as(tiny, "WEBP", quality=30, method=6) as encoded:
+            data = base64.b64encode(encoded.read()).decode("ascii")
+        uri = f"data:image/webp;base64,{data}"
+        if len(uri) <= PLACEHOLDER_MAX_BYTES:
+            return uri
+    return ""
+
+
+def generate_derivatives(
+    image: PilImage.Image,
+) -> Iterator[Tuple[str, int, str, SpooledTemporaryFile]]:
+    """yields `(format name, width, extension, encoded file)` for each width
+    of the ladder in each format, resizing from the previous (larger) size so
+    every step is a small downscale"""
+    source = image
+    for width in sorted(derivative_widths(image.width), reverse=True):
+        height = max(1, round(source.height * width / source.width))
+        if width != source.width:
+            source = source.resize((width, height), PilImage.Resampling.LANCZOS)
+        for format_name, (_, extension, _) in DERIVATIVE_FORMATS.items():
+            yield format_name, width, extension, encode(source, format_name)
+
+
+def srcset(urls: Dict[int, str]) -> str:
+    """`url 320w, url 640w` from urls by width"""
+    return ", ".join(f"{url} {width}w" for width, url in sorted(urls.items()))
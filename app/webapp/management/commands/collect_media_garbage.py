@@ -0,0 +1,86 @@
+from datetime import timedelta
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from webapp.controllers.media_gc import MAX_DELETE_BATCH, collect_media_garbage
+
+# where an interrupted run left off, for --resume
+CHECKPOINT_CACHE_KEY = "media_gc:checkpoint"
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete files in the media storage that no media refers to any more: "
+        "those of deleted log entries, attachments and vessels, replaced "
+        "attachments and direct uploads that were never completed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the orphaned files",
+        )
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help="Keep files modified this recently, they may not be recorded yet",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=MAX_DELETE_BATCH,
+            help=f"Files deleted per request, at most {MAX_DELETE_BATCH}",
+        )
+        parser.add_argument(
+            "--max-deletes-per-second",
+            type=float,
+            help="Pace the deletes to at most this many files a second",
+        )
+        parser.add_argument(
+            "--max-deletes",
+            type=int,
+            help="Stop after this many orphans, --resume carries on from there",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Start where the last interrupted run left off",
+        )
+        parser.add_argument(
+            "--start-after", default="", help="Start after this storage name"
+        )
+
+    def handle(self, *args, **options):
+        start_after = options["start_after"]
+        if options["resume"] and not start_after:
+            start_after = cache.get(CHECKPOINT_CACHE_KEY, "")
+            if start_after:
+                self.stdout.write(f"Resuming after {start_after}")
+
+        result = collect_media_garbage(
+            dry_run=options["dry_run"],
+            grace=timedelta(hours=options["grace_hours"]),
+            batch_size=options["batch_size"],
+            max_deletes_per_second=options["max_deletes_per_second"],
+            max_deletes=options["max_deletes"],
+            start_after=start_after,
+            on_checkpoint=lambda name: cache.set(
+                CHECKPOINT_CACHE_KEY, name, timeout=None
+            ),
+        )
+        if result.complete and not options["dry_run"]:
+            cache.delete(CHECKPOINT_CACHE_KEY)
+
+        if options["dry_run"]:
+            summary = f"Scanned {result.scanned} files, {result.orphaned} orphaned"
+        else:
+            summary = (
+                f"Scanned {result.scanned} files, deleted {result.deleted} of "
+                f"{result.orphaned} orphaned, {result.failed} failed"
+            )
+        self.stdout.write(summary)
+        if not result.complete:
+            self.stdout.write(
+                f"Stopped after {result.checkpoint}, run with --resume to continue"
+            )
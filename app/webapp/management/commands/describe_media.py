@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from webapp.models import Media
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill in the size, dominant color and inline placeholder of images "
+        "processed before they were recorded"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Describe every ready image again, not only undescribed ones",
+        )
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        images = Media.objects.filter(
+            media_type="image", status=Media.Status.READY
+        ).order_by("pk")
+        if not options["all"]:
+            images = images.filter(width__isnull=True)
+
+        described = unreadable = 0
+        batch = []
+        # uploads of the same file share it, so each file is decoded once
+        by_file = {}
+        for media in images.only("pk", "file").iterator(
+            chunk_size=options["batch_size"]
+        ):
+            if media.file.name not in by_file:
+                by_file[media.file.name] = (
+                    {field: getattr(media, field) for field in Media.DESCRIPTION_FIELDS}
+                    if media.describe_stored()
+                    else None
+                )
+            description = by_file[media.file.name]
+            if description is None:
+                unreadable += 1
+                continue
+            for field, value in description.items():
+                setattr(media, field, value)
+            batch.append(media)
+            described += 1
+            if len(batch) >= options["batch_size"]:
+                Media.objects.bulk_update(batch, Media.DESCRIPTION_FIELDS)
+                batch = []
+        if batch:
+            Media.objects.bulk_update(batch, Media.DESCRIPTION_FIELDS)
+        self.stdout.write(f"Described {described} images, {unreadable} unreadable")
@@ -0,0 +1,51 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from webapp.controllers.media import process_media, stale_media_filter
+from webapp.models import Media
+
+
+class Command(BaseCommand):
+    help = (
+        "Process images the background workers never finished (a restart drops "
+        "their queue) and build derivatives for images uploaded before them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Reprocess every image, not only the unfinished ones",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Also retry images that failed to process",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=10,
+            help="Minutes before a pending image counts as dropped",
+        )
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        images = Media.objects.filter(media_type="image").order_by("pk")
+        if not options["all"]:
+            unfinished = stale_media_filter(
+                timedelta(minutes=options["stale_after"])
+            ) | Q(status=Media.Status.READY, derivatives={})
+            if options["retry_failed"]:
+                unfinished |= Q(status=Media.Status.FAILED)
+            images = images.filter(unfinished)
+
+        processed = failed = 0
+        for media_id in images.values_list("pk", flat=True).iterator(
+            chunk_size=options["batch_size"]
+        ):
+            if process_media(media_id, force=True):
+                processed += 1
+            else:
+                failed += 1
+        self.stdout.write(f"Processed {processed} images, {failed} unreadable")
@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from webapp.markup import MARKDOWN_RENDERER_VERSION, render_many
+from webapp.models import LogEntry
+from webapp.models.vessel_note import NoteMessage
+
+RENDERED_MODELS = (LogEntry, NoteMessage)
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _rendered(batches, render, pool, window):
+    """(batch, html of each row) in order, at most `window` batches in the
+    pool at a time so a large table isn't read into memory up front"""
+    if pool is None:
+        for batch in batches:
+            yield batch, render([row.content for row in batch])
+        return
+    pending = deque()
+    for batch in batches:
+        pending.append((batch, pool.submit(render, [row.content for row in batch])))
+        if len(pending) >= window:
+            batch, future = pending.popleft()
+            yield batch, future.result()
+    while pending:
+        batch, future = pending.popleft()
+        yield batch, future.result()
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the markdown of log entries and note messages to html ahead of "
+        "time, for rows never rendered or rendered by an older renderer version"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Render every row again, not only out of date ones",
+        )
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Processes to render in, 1 renders in this one",
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        pool = None
+        if workers > 1:
+            # workers only need `webapp.markup`, and forking a process that may
+            # have threads running (the media pools) can deadlock the child
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        try:
+            for model in RENDERED_MODELS:
+                rendered, skipped = self.render_model(model, pool, workers, options)
+                self.stdout.write(
+                    f"Rendered {rendered} {model._meta.verbose_name_plural.lower()}"
+                    + (f", {skipped} changed while rendering" if skipped else "")
+                )
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def render_model(self, model, pool, workers, options):
+        rows = model.objects.order_by("pk").only("pk", "content")
+        if not options["all"]:
+            rows = rows.exclude(content_html_version=MARKDOWN_RENDERER_VERSION)
+        render = partial(render_many, messages=model.MARKDOWN_MESSAGES)
+        batches = _batches(
+            rows.iterator(chunk_size=options["batch_size"]), options["batch_size"]
+        )
+
+        rendered = skipped = 0
+        for batch, htmls in _rendered(batches, render, pool, window=2 * workers):
+            with transaction.atomic():
+                # rows saved since they were read were rendered by that save
+                current = dict(
+                    model.objects.select_for_update()
+                    .filter(pk__in=[row.pk for row in batch])
+                    .values_list("pk", "content")
+                )
+                unchanged = []
+                for row, html in zip(batch, htmls):
+                    if current.get(row.pk) != row.content:
+                        continue
+                    row.content_html = html
+                    row.content_html_version = MARKDOWN_RENDERER_VERSION
+                    unchanged.append(row)
+                model.objects.bulk_update(
+                    unchanged, ["content_html", "content_html_version"]
+                )
+            rendered += len(unchanged)
+            skipped += len(batch) - len(unchanged)
+        return rendered, skipped
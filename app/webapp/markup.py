@@ -0,0 +1,74 @@
+import html
+from typing import Iterable, List
+from urllib.parse import urlsplit
+import markdown
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+# stored html rendered by an older version is rendered again, bump it when
+# anything below changes the output
+MARKDOWN_RENDERER_VERSION = 2
+
+# links and images may point at these, or be relative
+SAFE_URL_SCHEMES = {"", "http", "https", "mailto"}
+
+
+def is_safe_url(url: str) -> bool:
+    # markdown keeps entities in attributes as typed and the browser decodes
+    # them, so `&#106;avascript:` is `javascript:` by the time it is followed
+    while (unescaped := html.unescape(url)) != url:
+        url = unescaped
+    # browsers ignore whitespace and control characters in the scheme
+    cleaned = "".join(char for char in url if char.isprintable() and not char.isspace())
+    try:
+        return urlsplit(cleaned).scheme.lower() in SAFE_URL_SCHEMES
+    except ValueError:
+        return False
+
+
+class _SafeUrls(Treeprocessor):
+    def run(self, root):
+        for element in root.iter():
+            for attribute in ("href", "src"):
+                url = element.get(attribute)
+                if url is not None and not is_safe_url(url):
+                    del element.attrib[attribute]
+
+
+class SanitizedMarkdown(Extension):
+    """html in the source is shown as text instead of passed through, and
+    links and images to `javascript:` and other schemes lose their url, so
+    the output is safe to put on a page as is"""
+
+    def extendMarkdown(self, md):
+        md.preprocessors.deregister("html_block")
+        md.inlinePatterns.deregister("html")
+        # after the inline patterns have made the links
+        md.treeprocessors.register(_SafeUrls(md), "safe_urls", 0)
+
+
+class _PlainBlocks(Extension):
+    """headings and rules stay as the text that was typed, for chat like
+    messages"""
+
+    def extendMarkdown(self, md):
+        for name in ("hashheader", "setextheader", "hr"):
+            md.parser.blockprocessors.deregister(name)
+
+
+def render_markdown(text: str, messages: bool = False) -> str:
+    """sanitized html for markdown `text`. `messages` renders the way note
+    messages are written, every newline a line break and no headings"""
+    if not text:
+        return ""
+    extensions = [SanitizedMarkdown()]
+    if messages:
+        extensions += [_PlainBlocks(), "nl2br"]
+    # a Markdown instance keeps state between conversions, so one per call
+    return markdown.Markdown(extensions=extensions).convert(text)
+
+
+def render_many(texts: Iterable[str], messages: bool = False) -> List[str]:
+    """`render_markdown` for a batch, what the bulk re-render sends to each
+    worker process"""
+    return [render_markdown(text, messages) for text in texts]
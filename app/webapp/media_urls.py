@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.encoding import filepath_to_uri
+
+# a key with nothing to quote, to find where the key goes in a storage url
+_PROBE = "media-url-probe"
+
+
+def client_url(url: str) -> str:
+    """the url as browsers reach it, the app may talk to the bucket on an
+    internal endpoint (minio in development)"""
+    if settings.AWS_S3_ENDPOINT_URL and settings.AWS_S3_CLIENT_ENDPOINT_URL:
+        url = url.replace(
+            settings.AWS_S3_ENDPOINT_URL, settings.AWS_S3_CLIENT_ENDPOINT_URL
+        )
+    return url
+
+
+def presigning_client(storage):
+    """an S3 client signing for the endpoint browsers reach the bucket on,
+    which in development isn't the one the app talks to. Signing makes no
+    requests"""
+    session = storage._create_session()  # pylint: disable=protected-access
+    return session.client(
+        "s3",
+        region_name=storage.region_name,
+        endpoint_url=settings.AWS_S3_CLIENT_ENDPOINT_URL or storage.endpoint_url,
+        config=storage.client_config,
+    )
+
+
+class MediaUrlResolver:
+    """turns storage names into browser facing urls without asking the storage
+    backend every time. Public urls are the storage's url prefix, worked out
+    once per process, plus the quoted name. Signed urls (private buckets, or
+    when asked for) are kept for half of MEDIA_SIGNED_URL_TTL so a render
+    never hands out a url about to expire, in a MEDIA_SIGNED_URL_CACHE_SIZE
+    entry LRU"""
+
+    def __init__(self, storage=None):
+        self._storage = storage
+        self._lock = threading.Lock()
+        self._prefix: Optional[str] = None
+        self._signed: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @property
+    def storage(self):
+        return self._storage or default_storage
+
+    def reset(self):
+        """forget the prefix and signed urls, after the storage settings change"""
+        with self._lock:
+            self._prefix = None
+            self._signed.clear()
+
+    @property
+    def signs_by_default(self) -> bool:
+        return bool(getattr(self.storage, "querystring_auth", False))
+
+    def _public_prefix(self) -> str:
+        if self._prefix is None:
+            url = client_url(self.storage.url(_PROBE))
+            # a storage that puts anything after the key gets asked every time
+            self._prefix = url[: -len(_PROBE)] if url.endswith(_PROBE) else ""
+        return self._prefix
+
+    def url(self, name: str, signed: Optional[bool] = None) -> str:
+        """the url of a stored file, signed if the storage signs by default"""
+        if not name:
+            return ""
+        if signed is None:
+            signed = self.signs_by_default
+        if signed:
+            return self._signed_url(name)
+        if prefix := self._public_prefix():
+            return prefix + filepath_to_uri(name)
+        return client_url(self.storage.url(name))
+
+    def urls(
+        self, names: Iterable[str], signed: Optional[bool] = None
+    ) -> Dict[str, str]:
+        """the urls of many stored files at once, by name"""
+        return {name: self.url(name, signed) for name in dict.fromkeys(names)}
+
+    def _signed_url(self, name: str) -> str:
+        now = time.monotonic()
+        with self._lock:
+            if (cached := self._signed.get(name)) and cached[1] > now:
+                self._signed.move_to_end(name)
+                return cached[0]
+        ttl = getattr(settings, "MEDIA_SIGNED_URL_TTL", 60 * 60)
+        url = self._sign(name, ttl)
+        with self._lock:
+            self._signed[name] = (url, now + ttl / 2)
+            self._signed.move_to_end(name)
+            while len(self._signed) > getattr(
+                settings, "MEDIA_SIGNED_URL_CACHE_SIZE", 10_000
+            ):
+                self._signed.popitem(last=False)
+        return url
+
+    def _sign(self, name: str, ttl: int) -> str:
+        storage = self.storage
+        if hasattr(storage, "bucket_name") and not storage.custom_domain:
+            # signed for the browser facing endpoint, rewriting the host of a
+            # signed url afterwards would break its signature
+            return presigning_client(storage).generate_presigned_url(
+                "get_object",
+                Params={
+                    "Bucket": storage.bucket_name,
+                    # pylint: disable-next=protected-access
+                    "Key": storage._normalize_name(name),
+                },
+                ExpiresIn=ttl,
+            )
+        if hasattr(storage, "querystring_expire"):
+            return client_url(storage.url(name, expire=ttl))
+        return client_url(storage.url(name))
+
+
+media_url_resolver = MediaUrlResolver()
+
+
+def resolve_media_urls(
+    media: Iterable, signed: Optional[bool] = None
+) -> Dict[int, str]:
+    """the urls of a gallery's worth of `Media` in one call, by id"""
+    media = list(media)
+    urls = media_url_resolver.urls((item.file.name for item in media), signed)
+    return {item.pk: urls[item.file.name] for item in media}
+
+
+@receiver(setting_changed)
+def _reset_on_storage_change(setting, **kwargs):
+    if setting in (
+        "STORAGES",
+        "MEDIA_URL",
+        "AWS_S3_ENDPOINT_URL",
+        "AWS_S3_CLIENT_ENDPOINT_URL",
+    ):
+        media_url_resolver.reset()
@@ -0,0 +1,153 @@
+import json
+import random
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack
+from typing import Dict, Optional
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+from webapp.logging import get_logger
+
+logger = get_logger(__name__)
+
+QUERY_BUDGET_DEFAULTS = {
+    # fraction of requests that are measured, the rest pay one random() call
+    "SAMPLE_RATE": 1.0,
+    # queries allowed per request, by url name, before a warning is logged
+    "DEFAULT": 50,
+    "ROUTES": {},
+    # the same statement this many times in one request is reported as an N+1
+    "DUPLICATE_THRESHOLD": 3,
+    "SERVER_TIMING": True,
+}
+
+# placeholder lists and literals vary between otherwise identical statements
+_IN_LIST = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def get_query_budget_settings() -> Dict:
+    return {**QUERY_BUDGET_DEFAULTS, **getattr(settings, "QUERY_BUDGET", {})}
+
+
+def fingerprint(sql: str) -> str:
+    """the statement with its literals and IN lists collapsed, so an N+1 loop
+    fetching a different row each time has a single fingerprint"""
+    return _LITERAL.sub("?", _IN_LIST.sub("(...)", sql))
+
+
+def query_origin() -> Optional[str]:
+    """the template and line rendering when the current query ran, or failing
+    that the innermost line of app code outside this module"""
+    frame = sys._getframe(1)  # pylint: disable=protected-access
+    code_line = None
+    while frame is not None:
+        node = frame.f_locals.get("self")
+        if isinstance(node, Node) and getattr(node, "token", None) is not None:
+            origin = getattr(node, "origin", None)
+            name = getattr(origin, "template_name", None) or getattr(
+                origin, "name", "<unknown>"
+            )
+            return f"{name}:{node.token.lineno}"
+        filename = frame.f_code.co_filename
+        if (
+            code_line is None
+            and "/webapp/" in filename
+            and "/site-packages/" not in filename
+            and filename != __file__
+        ):
+            code_line = f"{filename.rsplit('/webapp/', 1)[-1]}:{frame.f_lineno}"
+        frame = frame.f_back
+    return code_line
+
+
+class QueryRecorder:
+    """an `execute_wrapper` counting queries, their time, and repeated
+    statements. The origin is only looked up when a statement repeats"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.origins: Dict[str, Optional[str]] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            key = fingerprint(sql)
+            self.fingerprints[key] += 1
+            if self.fingerprints[key] == 2:
+                self.origins[key] = query_origin()
+
+    def duplicates(self, threshold: int):
+        return [
+            {"sql": sql[:200], "count": count, "origin": self.origins.get(sql)}
+            for sql, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+
+class QueryBudgetMiddleware:
+    """records the queries a sampled request runs: count, database time and
+    statements repeated often enough to be an N+1. They are sent back in a
+    `Server-Timing` header and logged as one JSON line, as a warning when the
+    route goes over its budget. Configured with the QUERY_BUDGET setting"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = get_query_budget_settings()
+        if random.random() >= config["SAMPLE_RATE"]:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        route = (match.view_name or match.route) if match else None
+        budget = config["ROUTES"].get(route, config["DEFAULT"])
+        duplicates = recorder.duplicates(config["DUPLICATE_THRESHOLD"])
+
+        if config["SERVER_TIMING"]:
+            timings = [
+                f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"',
+                f"app;dur={total * 1000:.1f}",
+            ]
+            if duplicates:
+                timings.append(f'dupes;desc="{len(duplicates)} repeated statements"')
+            if existing := response.get("Server-Timing"):
+                timings.insert(0, existing)
+            response["Server-Timing"] = ", ".join(timings)
+
+        over_budget = recorder.count > budget
+        summary = {
+            "method": request.method,
+            "path": request.path,
+            "route": route,
+            "status": response.status_code,
+            "queries": recorder.count,
+            "budget": budget,
+            "db_ms": round(recorder.duration * 1000, 1),
+            "total_ms": round(total * 1000, 1),
+            "duplicates": duplicates,
+        }
+        log = logger.warning if over_budget else logger.info
+        log(
+            "query budget %s: %s",
+            "exceeded" if over_budget else "ok",
+            json.dumps(summary, separators=(",", ":")),
+        )
+        return response
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:49
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """jsonb_path_ops GIN index so the catalog attribute filters
+    (`values @> '["fin keel"]'`) don't scan every sailboat attribute.
+    Kept out of the model Meta because the test database is sqlite."""
+
+    dependencies = [
+        ("webapp", "0020_logentry_logentryattachment_logentrylocation_and_more"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX IF NOT EXISTS webapp_sailboatattribute_values_gin "
+                'ON webapp_sailboatattribute USING gin ("values" jsonb_path_ops);'
+            ),
+            reverse_sql="DROP INDEX IF EXISTS webapp_sailboatattribute_values_gin;",
+        ),
+    ]
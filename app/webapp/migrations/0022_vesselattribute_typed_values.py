@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+def backfill_typed_values(apps, schema_editor):
+    _ = schema_editor
+    VesselAttribute = apps.get_model("webapp", "VesselAttribute")
+    to_update = []
+    for vessel_attribute in VesselAttribute.objects.select_related("attribute"):
+        try:
+            match vessel_attribute.attribute.data_type:
+                case "float":
+                    vessel_attribute.value_float = float(vessel_attribute.value)
+                case "integer":
+                    vessel_attribute.value_integer = int(float(vessel_attribute.value))
+                case _:
+                    continue
+        except ValueError:
+            continue
+        to_update.append(vessel_attribute)
+    VesselAttribute.objects.bulk_update(
+        to_update, ["value_float", "value_integer"], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("webapp", "0021_sailboatattribute_values_gin"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="vesselattribute",
+            name="value_float",
+            field=models.FloatField(
+                blank=True,
+                help_text="The value cast to a float, for FLOAT attributes",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="vesselattribute",
+            name="value_integer",
+            field=models.BigIntegerField(
+                blank=True,
+                help_text="The value cast to an integer, for INTEGER attributes",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vesselattribute",
+            index=models.Index(
+                fields=["attribute", "value"], name="webapp_vess_attribu_9326df_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vesselattribute",
+            index=models.Index(
+                fields=["attribute", "value_float"],
+                name="webapp_vess_attribu_8453c7_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vesselattribute",
+            index=models.Index(
+                fields=["attribute", "value_integer"],
+                name="webapp_vess_attribu_44d1d0_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_typed_values, migrations.RunPython.noop),
+    ]
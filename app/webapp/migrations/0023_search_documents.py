@@ -0,0 +1,115 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:53
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+SEARCH_TABLES = ["webapp_sailboat", "webapp_vessel"]
+
+
+def join_parts(*parts):
+    return " ".join(part for part in parts if part)
+
+
+def backfill_search_documents(apps, schema_editor):
+    """mirrors Sailboat/Vessel.build_search_document, the trigger
+    fills in the vectors as the documents are written"""
+    _ = schema_editor
+    Sailboat = apps.get_model("webapp", "Sailboat")
+    Vessel = apps.get_model("webapp", "Vessel")
+    sailboats = list(
+        Sailboat.objects.select_related("make").prefetch_related("designers")
+    )
+    for sailboat in sailboats:
+        sailboat.search_document = join_parts(
+            sailboat.make.name,
+            sailboat.name,
+            *[designer.name for designer in sailboat.designers.all()],
+        )
+    Sailboat.objects.bulk_update(sailboats, ["search_document"], batch_size=500)
+
+    documents = {sailboat.pk: sailboat.search_document for sailboat in sailboats}
+    vessels = list(Vessel.objects.all())
+    for vessel in vessels:
+        vessel.search_document = join_parts(
+            vessel.name,
+            vessel.hull_identification_number,
+            vessel.USCG_number,
+            vessel.home_port,
+            documents.get(vessel.sailboat_id),
+        )
+    Vessel.objects.bulk_update(vessels, ["search_document"], batch_size=500)
+
+
+def search_sql(table):
+    return migrations.RunSQL(
+        sql=[
+            f"CREATE TRIGGER {table}_search_vector_update "
+            f"BEFORE INSERT OR UPDATE OF search_document ON {table} "
+            "FOR EACH ROW EXECUTE FUNCTION tsvector_update_trigger("
+            "search_vector, 'pg_catalog.simple', search_document);",
+            f"CREATE INDEX IF NOT EXISTS {table}_search_vector_gin "
+            f"ON {table} USING gin (search_vector);",
+            f"CREATE INDEX IF NOT EXISTS {table}_search_document_trgm "
+            f"ON {table} USING gin (search_document gin_trgm_ops);",
+        ],
+        reverse_sql=[
+            f"DROP INDEX IF EXISTS {table}_search_document_trgm;",
+            f"DROP INDEX IF EXISTS {table}_search_vector_gin;",
+            f"DROP TRIGGER IF EXISTS {table}_search_vector_update ON {table};",
+        ],
+    )
+
+
+class Migration(migrations.Migration):
+    """search documents for vessels and sailboats. The tsvector is kept in sync
+    by a trigger so bulk updates don't need to know about it. The GIN indexes
+    are kept out of the model Meta because the test database is sqlite."""
+
+    dependencies = [
+        ("webapp", "0022_vesselattribute_typed_values"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sailboat",
+            name="search_document",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                help_text="Make, model and designers, kept current on save for search",
+            ),
+        ),
+        migrations.AddField(
+            model_name="sailboat",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False,
+                help_text="Maintained from the search document by a database trigger",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="vessel",
+            name="search_document",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                help_text="Name, HIN, USCG number, home port and sailboat, kept current on save for search",
+            ),
+        ),
+        migrations.AddField(
+            model_name="vessel",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False,
+                help_text="Maintained from the search document by a database trigger",
+                null=True,
+            ),
+        ),
+        TrigramExtension(),
+        *[search_sql(table) for table in SEARCH_TABLES],
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
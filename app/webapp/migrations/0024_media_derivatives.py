@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("webapp", "0023_search_documents"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="media",
+            name="derivatives",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Storage names of the resized copies of an image, by format and width",
+            ),
+        ),
+    ]
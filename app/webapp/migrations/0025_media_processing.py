@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("webapp", "0024_media_derivatives"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="media",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                default="ready",
+                help_text="Images are pending until resized and their derivatives are built",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="media",
+            name="original_filename",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="The name of the file as it was uploaded",
+                max_length=255,
+            ),
+        ),
+        migrations.AddField(
+            model_name="media",
+            name="uploaded_by",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The user who uploaded this file",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="uploaded_media",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="media",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="media",
+            index=models.Index(
+                fields=["status", "created_at"], name="webapp_medi_status_0dcf04_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("webapp", "0025_media_processing"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="media",
+            name="sha256",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                help_text="Digest of the uploaded bytes, uploads of the same file share storage",
+                max_length=64,
+            ),
+        ),
+    ]
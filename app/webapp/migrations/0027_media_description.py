@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("webapp", "0026_media_sha256"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="media",
+            name="width",
+            field=models.PositiveIntegerField(
+                blank=True, help_text="Width of the stored image in pixels", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="media",
+            name="height",
+            field=models.PositiveIntegerField(
+                blank=True, help_text="Height of the stored image in pixels", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="media",
+            name="dominant_color",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="The most common color of the image, as #rrggbb",
+                max_length=7,
+            ),
+        ),
+        migrations.AddField(
+            model_name="media",
+            name="placeholder",
+            field=models.TextField(
+                blank=True,
+                default="",
+                help_text="A tiny blurry copy of the image as a data uri, shown inline",
+            ),
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# the role each object permission grants, as in `webapp.controllers.roles`
+ROLE_PERMISSIONS = {
+    "can_view_vessel": 1,
+    "can_crew_vessel": 2,
+    "can_manage_vessel": 3,
+}
+
+
+def backfill_memberships(apps, schema_editor):
+    """a membership for every user with a role permission on a vessel, at
+    the highest role their permissions grant"""
+    VesselUserObjectPermission = apps.get_model("webapp", "VesselUserObjectPermission")
+    VesselMembership = apps.get_model("webapp", "VesselMembership")
+    roles = {}
+    for vessel_id, user_id, codename in (
+        VesselUserObjectPermission.objects.filter(
+            permission__codename__in=ROLE_PERMISSIONS
+        )
+        .values_list("content_object_id", "user_id", "permission__codename")
+        .iterator(chunk_size=2000)
+    ):
+        key = (vessel_id, user_id)
+        roles[key] = max(roles.get(key, 0), ROLE_PERMISSIONS[codename])
+    VesselMembership.objects.bulk_create(
+        [
+            VesselMembership(vessel_id=vessel_id, user_id=user_id, role=role)
+            for (vessel_id, user_id), role in roles.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("webapp", "0027_media_description"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VesselMembership",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "role",
+                    models.PositiveSmallIntegerField(
+                        choices=[(1, "Viewer"), (2, "Crew"), (3, "Skipper")],
+                        help_text="The highest role the user's permissions grant",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        help_text="The member",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="vessel_memberships",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "vessel",
+                    models.ForeignKey(
+                        help_text="The vessel the user has a role on",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="memberships",
+                        to="webapp.vessel",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "vessel membership",
+                "verbose_name_plural": "vessel memberships",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "role", "vessel"],
+                        name="webapp_vess_user_id_f8cb23_idx",
+                    ),
+                    models.Index(
+                        fields=["vessel", "role", "user"],
+                        name="webapp_vess_vessel__80a16c_idx",
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("vessel", "user"), name="unique_vessel_membership"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_memberships, migrations.RunPython.noop),
+    ]
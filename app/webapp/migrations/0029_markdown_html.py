@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("webapp", "0028_vesselmembership"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="logentry",
+            name="content_html",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                help_text="The content rendered to sanitized html",
+            ),
+        ),
+        migrations.AddField(
+            model_name="logentry",
+            name="content_html_version",
+            field=models.PositiveSmallIntegerField(
+                default=0,
+                editable=False,
+                help_text="The markdown renderer version content_html is from",
+            ),
+        ),
+        migrations.AddField(
+            model_name="notemessage",
+            name="content_html",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                help_text="The content rendered to sanitized html",
+            ),
+        ),
+        migrations.AddField(
+            model_name="notemessage",
+            name="content_html_version",
+            field=models.PositiveSmallIntegerField(
+                default=0,
+                editable=False,
+                help_text="The markdown renderer version content_html is from",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("webapp", "0029_markdown_html"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="media",
+            name="processing_started_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="When a worker last claimed the image for processing",
+                null=True,
+            ),
+        ),
+    ]
@@ -8,6 +8,7 @@ from .media import Media
 from .vessel import Vessel
 from .vessel_note import VesselNote
 from .vessel_access_request import VesselAccessRequest
+from .vessel_membership import VesselMembership
 from .moderation import Moderation
 from .logbook import LogEntry, LogEntryLocation, LogEntryAttachment
 
@@ -23,6 +24,7 @@ __all__ = [
     "Vessel",
     "VesselNote",
     "VesselAccessRequest",
+    "VesselMembership",
     "Moderation",
     "LogEntry",
     "LogEntryLocation",
@@ -1,7 +1,10 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 import re
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
+from webapp.cache import ATTRIBUTE_SCHEMA_CACHE, CATALOG_CACHE, bump_cache_version
 
 
 class AttributeSection(models.Model):
@@ -162,3 +165,18 @@ class Attribute(models.Model):
             raise ValidationError(
                 {"options": _("Options are required for OPTIONS type attributes")}
             )
+
+
+@receiver([post_save, post_delete], sender=AttributeSection)
+@receiver([post_save, post_delete], sender=Attribute)
+def invalidate_attribute_schema(sender, **kwargs):  # pylint: disable=unused-argument
+    """every worker rebuilds its attribute schema on its next version check,
+    facet counts depend on the attribute options too"""
+    # imported here, the controller imports this module
+    from webapp.controllers.attributes import (  # pylint: disable=import-outside-toplevel
+        attribute_schema_registry,
+    )
+
+    bump_cache_version(ATTRIBUTE_SCHEMA_CACHE)
+    bump_cache_version(CATALOG_CACHE)
+    attribute_schema_registry.invalidate()
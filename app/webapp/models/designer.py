@@ -17,6 +17,13 @@ class Designer(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the stored name, so a save can tell a rename from any other save
+        instance.loaded_name = instance.__dict__.get("name")
+        return instance
+
     def save(self, *args, **kwargs):
         # Convert name to lowercase for case-insensitive uniqueness
         self.name = self.name.lower()
@@ -5,11 +5,12 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 
 from .vessel import Vessel
 from .media import Media
+from .rendered_markdown import RenderedMarkdown
 
 User = get_user_model()
 
 
-class LogEntry(models.Model):
+class LogEntry(RenderedMarkdown):
     vessel = models.ForeignKey(
         Vessel,
         on_delete=models.CASCADE,
@@ -50,13 +51,15 @@ class LogEntry(models.Model):
 
     def can_edit(self, user):
         """Check if user can edit this log entry"""
-        if user == self.author:
+        if not user.is_authenticated:
+            return False
+        if user.pk == self.author_id:
             return True
-        return user.has_perm("can_manage_vessel", self.vessel)
+        return user.can_manage_vessel(self.vessel_id)
 
     def can_view(self, user):
         """Check if user can view this log entry"""
-        return user.has_perm("can_view_vessel", self.vessel)
+        return user.is_authenticated and user.can_view_vessel(self.vessel)
 
 
 class LogEntryLocation(models.Model):
@@ -23,6 +23,13 @@ class Make(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the stored name, so a save can tell a rename from any other save
+        instance.loaded_name = instance.__dict__.get("name")
+        return instance
+
     def save(self, *args, **kwargs):
         # Convert name to lowercase for case-insensitive uniqueness
         self.name = self.name.lower()
@@ -32,7 +39,6 @@ class Make(models.Model):
     def get_or_create_moderated(cls, name: str, user: "User"):
         """get or create a make, moderating it if it's new"""
         make, created = cls.objects.get_or_create(name=name)
-        make.save()
         if created:
             Moderation.moderation_for(
                 cls,
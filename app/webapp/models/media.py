@@ -1,11 +1,22 @@
+import hashlib
 import uuid
 import os
-from io import BytesIO
+from typing import TYPE_CHECKING, Optional
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 from PIL import Image as PilImage
+from PIL import UnidentifiedImageError
 from django.conf import settings
-from django.core.files.base import ContentFile
-from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from django.core.files import File
+from webapp import imaging
+from webapp.media_urls import media_url_resolver
+from webapp.logging import get_logger
+
+if TYPE_CHECKING:
+    from django.core.files.uploadedfile import UploadedFile
+    from webapp.models.user import User  # noqa: F401
+
+logger = get_logger(__name__)
 
 MEDIA_TYPE_CHOICES = [
     ("image", "Image"),
@@ -14,89 +25,310 @@ MEDIA_TYPE_CHOICES = [
     ("document", "Document"),
 ]
 
+# accepted upload extensions and the media type they are stored as
+MEDIA_TYPE_EXTENSIONS = {
+    "image": (".jpg", ".jpeg", ".png"),
+    "video": (".mp4", ".mov", ".webm"),
+    "audio": (".mp3", ".m4a", ".wav"),
+    "document": (".pdf", ".txt", ".csv", ".doc", ".docx", ".xls", ".xlsx"),
+}
+
 
 class Media(models.Model):
     """storing file-like media objects"""
 
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        PROCESSING = "processing", _("Processing")
+        READY = "ready", _("Ready")
+        FAILED = "failed", _("Failed")
+
+    # what `describe` fills in
+    DESCRIPTION_FIELDS = ["width", "height", "dominant_color", "placeholder"]
+
     file = models.FileField(null=False, blank=False)
     media_type = models.CharField(max_length=20, choices=MEDIA_TYPE_CHOICES)
+    derivatives = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text=_(
+            "Storage names of the resized copies of an image, by format and width"
+        ),
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.READY,
+        help_text=_("Images are pending until resized and their derivatives are built"),
+    )
+    original_filename = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        help_text=_("The name of the file as it was uploaded"),
+    )
+    uploaded_by = models.ForeignKey(
+        "User",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="uploaded_media",
+        help_text=_("The user who uploaded this file"),
+    )
+    sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        db_index=True,
+        help_text=_(
+            "Digest of the uploaded bytes, uploads of the same file share storage"
+        ),
+    )
+    width = models.PositiveIntegerField(
+        null=True, blank=True, help_text=_("Width of the stored image in pixels")
+    )
+    height = models.PositiveIntegerField(
+        null=True, blank=True, help_text=_("Height of the stored image in pixels")
+    )
+    dominant_color = models.CharField(
+        max_length=7,
+        blank=True,
+        default="",
+        help_text=_("The most common color of the image, as #rrggbb"),
+    )
+    placeholder = models.TextField(
+        blank=True,
+        default="",
+        help_text=_("A tiny blurry copy of the image as a data uri, shown inline"),
+    )
+    processing_started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("When a worker last claimed the image for processing"),
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    @classmethod
+    def media_type_for(cls, filename: str) -> str:
+        """the media type of an upload by its extension, raises ValueError"""
+        extension = os.path.splitext(filename)[1].lower()
+        for media_type, extensions in MEDIA_TYPE_EXTENSIONS.items():
+            if extension in extensions:
+                return media_type
+        raise ValueError("Invalid file type")
+
+    @classmethod
+    def new_file_name(cls, filename: str) -> str:
+        """a unique storage name for an upload, raises ValueError for file
+        types that aren't accepted"""
+        media_type = cls.media_type_for(filename)
+        extension = os.path.splitext(filename)[1].lower()
+        return f"{media_type}-{uuid.uuid4()}{extension}"
+
+    @staticmethod
+    def digest(upload: "UploadedFile") -> str:
+        """the sha256 of an upload, read in chunks and rewound"""
+        digest = hashlib.sha256()
+        for chunk in upload.chunks():
+            digest.update(chunk)
+        upload.seek(0)
+        return digest.hexdigest()
+
+    @classmethod
+    def from_upload(cls, upload: "UploadedFile", user: Optional["User"] = None):
+        """store an upload as is and return right away, images are resized
+        and get their derivatives in the background, see `process`.
+
+        A file that was uploaded and processed before isn't stored or processed
+        again, the new row points at the same original and derivatives"""
+        sha256 = cls.digest(upload)
+        original_filename = os.path.basename(upload.name or "")[:255]
+        if existing := cls.ready_with_digest(sha256):
+            media = cls.copy_of(
+                existing,
+                sha256=sha256,
+                original_filename=original_filename,
+                uploaded_by=user,
+            )
+            media.save()
+            return media
+        return cls.objects.create(
+            file=upload,
+            sha256=sha256,
+            original_filename=original_filename,
+            uploaded_by=user,
+        )
+
+    @classmethod
+    def ready_with_digest(cls, sha256: str) -> Optional["Media"]:
+        """the first processed upload of a file"""
+        return (
+            cls.objects.filter(sha256=sha256, status=cls.Status.READY)
+            .order_by("pk")
+            .first()
+        )
+
+    @classmethod
+    def copy_of(cls, existing: "Media", **fields) -> "Media":
+        """an unsaved row sharing the stored file and derivatives of a
+        processed upload of the same file"""
+        return cls(
+            file=existing.file.name,
+            media_type=existing.media_type,
+            derivatives=existing.derivatives,
+            width=existing.width,
+            height=existing.height,
+            dominant_color=existing.dominant_color,
+            placeholder=existing.placeholder,
+            status=cls.Status.READY,
+            **fields,
+        )
+
+    @classmethod
+    def for_stored_file(cls, name: str, **fields) -> "Media":
+        """an unsaved row for a new file already written to storage as `name`,
+        images are pending until processed"""
+        media_type = cls.media_type_for(name)
+        return cls(
+            file=name,
+            media_type=media_type,
+            status=cls.Status.PENDING if media_type == "image" else cls.Status.READY,
+            **fields,
+        )
+
+    @property
+    def is_processing(self) -> bool:
+        return self.status in (self.Status.PENDING, self.Status.PROCESSING)
 
     def save(self, *args, **kwargs):
-        if not self.id:
+        is_new = not self.id
+        if is_new:
             # Validate file exists
             if not self.file:
                 raise ValueError("File is required")
 
-            # Get file extension from the filename
-            file_extension = os.path.splitext(self.file.name)[1].lower()
-
-            if file_extension in [".jpg", ".jpeg", ".png"]:
-                filename = "image-" + str(uuid.uuid4()) + file_extension
-                self.file.name = filename
-                self.media_type = "image"  # Set media_type for images
-            else:
-                # error
-                raise ValueError("Invalid file type")
-
-            # Only resize if we have a valid file
-            resized_file = self.resize_uploaded_image(self.file, 1024, 1024)
-            if resized_file:
-                self.file = resized_file
+            self.media_type = self.media_type_for(self.file.name)
+            # a new upload, rather than a file already in storage
+            # pylint: disable=protected-access
+            if not self.file._committed:
+                self.file.name = self.new_file_name(self.file.name)
+                if self.media_type == "image":
+                    self.status = self.Status.PENDING
 
         super().save(*args, **kwargs)
+        if is_new and self.status == self.Status.PENDING:
+            # pylint: disable=import-outside-toplevel
+            from webapp.controllers.media import schedule_processing
 
-    @classmethod
-    def resize_uploaded_image(cls, image, max_width, max_height):
-        if not image:
-            return None
-
-        size = (max_width, max_height)
+            schedule_processing(self)
 
-        # Uploaded file is in memory
-        if isinstance(image, InMemoryUploadedFile):
-            try:
-                memory_image = BytesIO(image.read())
-                pil_image = PilImage.open(memory_image)
-                img_format = os.path.splitext(image.name)[1][1:].upper()
-                img_format = "JPEG" if img_format == "JPG" else img_format
+    def process(self) -> bool:
+        """decode the stored image once, at no more than about twice
+        MEDIA_IMAGE_MAX_SIZE, shrink the original to that size and build its
+        derivatives. Returns False if the file isn't a readable image"""
+        max_size = getattr(settings, "MEDIA_IMAGE_MAX_SIZE", 1600)
+        try:
+            with self.file.open("rb") as file:
+                if not self.sha256:
+                    # direct uploads to the bucket are hashed here instead
+                    self.sha256 = self.digest(file)
+                    super().save(update_fields=["sha256"])
+                decoded = imaging.decode(
+                    file,
+                    max_size=max_size,
+                    max_pixels=getattr(settings, "MEDIA_IMAGE_MAX_PIXELS", None),
+                )
+        except (OSError, UnidentifiedImageError, PilImage.DecompressionBombError):
+            logger.warning("Media %s is not a readable image", self.pk)
+            return False
 
-                if pil_image.width > max_width or pil_image.height > max_height:
-                    pil_image.thumbnail(size)
+        image = decoded.image
+        size = decoded.source_size
+        if max(size) > max_size:
+            image.thumbnail((max_size, max_size), PilImage.Resampling.LANCZOS)
+            size = image.size
+            pil_format = "PNG" if self.file.name.lower().endswith(".png") else "JPEG"
+            name = self.file.name
+            with imaging.encode_as(image, pil_format) as encoded:
+                self.file.storage.delete(name)
+                self.file.name = self.file.storage.save(name, File(encoded))
+            super().save(update_fields=["file"])
+        self.describe(image, size)
+        super().save(update_fields=self.DESCRIPTION_FIELDS)
+        self.build_derivatives(image)
+        return True
 
-                new_image = BytesIO()
-                pil_image.save(new_image, format=img_format)
+    def describe(self, image: PilImage.Image, size: tuple) -> None:
+        """record the size of the stored image (`image` itself may be a
+        reduced decode of it), its dominant color and inline placeholder, so
+        pages can lay it out before it loads. Doesn't save"""
+        self.width, self.height = size
+        self.dominant_color = imaging.dominant_color(image)
+        self.placeholder = imaging.placeholder(image)
 
-                new_image = ContentFile(new_image.getvalue())
-                return InMemoryUploadedFile(
-                    new_image, None, image.name, image.content_type, None, None
+    def describe_stored(self) -> bool:
+        """`describe` the stored image from a small decode of it, for images
+        processed before they were described. Returns False if unreadable"""
+        try:
+            with self.file.open("rb") as file:
+                decoded = imaging.decode(
+                    file,
+                    max_size=imaging.DERIVATIVE_WIDTHS[0],
+                    max_pixels=getattr(settings, "MEDIA_IMAGE_MAX_PIXELS", None),
                 )
-            except Exception:
-                # If there's any error, return the original image
-                image.seek(0)
-                return image
+        except (OSError, UnidentifiedImageError, PilImage.DecompressionBombError):
+            logger.warning("Media %s is not a readable image", self.pk)
+            return False
+        self.describe(decoded.image, decoded.source_size)
+        return True
 
-        # Uploaded file is in disk
-        elif isinstance(image, TemporaryUploadedFile):
+    def build_derivatives(self, image: Optional[PilImage.Image] = None) -> bool:
+        """store the `imaging.DERIVATIVE_WIDTHS` ladder of the image next to the
+        original in every `imaging.DERIVATIVE_FORMATS` format and record them.
+        Returns False (and keeps the original only) if it can't be decoded"""
+        if image is None:
             try:
-                path = image.temporary_file_path()
-                pil_image = PilImage.open(path)
+                with self.file.open("rb") as file:
+                    image = imaging.decode(
+                        file, max_size=imaging.DERIVATIVE_WIDTHS[-1]
+                    ).image
+            except (OSError, UnidentifiedImageError, PilImage.DecompressionBombError):
+                logger.warning("Media %s is not a readable image", self.pk)
+                return False
+
+        root = os.path.splitext(self.file.name)[0]
+        derivatives = {}
+        for format_name, width, extension, encoded in imaging.generate_derivatives(
+            image
+        ):
+            with encoded:
+                name = self.file.storage.save(
+                    f"{root}-{width}w.{extension}", File(encoded)
+                )
+            derivatives.setdefault(format_name, {})[str(width)] = name
+        self.derivatives = derivatives
+        super().save(update_fields=["derivatives"])
+        return True
 
-                if pil_image.width > max_width or pil_image.height > max_height:
-                    pil_image.thumbnail(size)
-                    pil_image.save(path)
-                    image.size = os.stat(path).st_size
-                return image
-            except Exception:
-                # If there's any error, return the original image
-                return image
+    def srcset(self, format_name: str) -> str:
+        """the `srcset` for one of the derivative formats, empty without any"""
+        names = self.derivatives.get(format_name) or {}
+        urls = media_url_resolver.urls(names.values())
+        return imaging.srcset({int(width): urls[name] for width, name in names.items()})
 
-        # Return the original image for any other case
-        return image
+    def public_url(self, name: str) -> str:
+        """the browser facing url of a file in the media storage, see
+        `webapp.media_urls.MediaUrlResolver`"""
+        return media_url_resolver.url(name)
 
     @property
     def url(self):
         if not self.file:
             return ""
-        return self.file.url.replace(
-            settings.AWS_S3_ENDPOINT_URL, settings.AWS_S3_CLIENT_ENDPOINT_URL
-        )
+        return self.public_url(self.file.name)
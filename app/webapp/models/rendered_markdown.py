@@ -0,0 +1,66 @@
+from django.db import models
+from django.utils.safestring import SafeString, mark_safe
+from django.utils.translation import gettext_lazy as _
+from webapp.markup import MARKDOWN_RENDERER_VERSION, render_markdown
+
+
+class RenderedMarkdown(models.Model):
+    """keeps the sanitized html of the markdown in `content` next to it, so
+    pages don't run the markdown pipeline for every entry they show. It is
+    rendered again on save when the content changed or the renderer has a new
+    version, `manage.py render_markdown` catches up rows that aren't saved"""
+
+    # render as note messages are written (see `webapp.markup.render_markdown`)
+    MARKDOWN_MESSAGES = False
+
+    content_html = models.TextField(
+        blank=True,
+        default="",
+        editable=False,
+        help_text=_("The content rendered to sanitized html"),
+    )
+    content_html_version = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        help_text=_("The markdown renderer version content_html is from"),
+    )
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # what the stored html was rendered from, to tell if a save changes it
+        instance._rendered_from = instance.__dict__.get("content")
+        return instance
+
+    @property
+    def is_rendered(self) -> bool:
+        return (
+            self.content_html_version == MARKDOWN_RENDERER_VERSION
+            and getattr(self, "_rendered_from", None) == self.content
+        )
+
+    def render_content(self):
+        self.content_html = render_markdown(self.content, self.MARKDOWN_MESSAGES)
+        self.content_html_version = MARKDOWN_RENDERER_VERSION
+        self._rendered_from = self.content
+
+    @property
+    def rendered_content(self) -> SafeString:
+        """the content as html, rendered now if the stored copy is out of date"""
+        if not self.is_rendered:
+            return mark_safe(render_markdown(self.content, self.MARKDOWN_MESSAGES))
+        return mark_safe(self.content_html)
+
+    def save(self, *args, **kwargs):
+        if not self.is_rendered:
+            self.render_content()
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {
+                    *kwargs["update_fields"],
+                    "content_html",
+                    "content_html_version",
+                }
+        super().save(*args, **kwargs)
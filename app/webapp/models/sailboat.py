@@ -1,10 +1,15 @@
-from typing import List, TYPE_CHECKING
+from typing import Iterable, List, Optional, TYPE_CHECKING, Union
 from guardian.shortcuts import assign_perm
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 from guardian.models import UserObjectPermissionBase
 from guardian.models import GroupObjectPermissionBase
+from webapp.cache import CATALOG_CACHE, bump_cache_version
 from webapp.models.make import Make
 from webapp.models.designer import Designer
 from webapp.models.sailboat_attribute import SailboatAttribute
@@ -12,6 +17,7 @@ from webapp.models.media import Media
 from webapp.models.moderation import Moderation
 
 if TYPE_CHECKING:
+    from django.core.files.uploadedfile import UploadedFile
     from webapp.models.user import User
 
 
@@ -86,6 +92,17 @@ class Sailboat(models.Model):
         related_name="created_sailboats",
         help_text=_("User who created this sailboat"),
     )
+    search_document = models.TextField(
+        blank=True,
+        default="",
+        editable=False,
+        help_text=_("Make, model and designers, kept current on save for search"),
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        help_text=_("Maintained from the search document by a database trigger"),
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -121,13 +138,95 @@ class Sailboat(models.Model):
             return True
         return False
 
+    @transaction.atomic
+    def add_images(
+        self,
+        images: Iterable[Union["UploadedFile", Media]],
+        user: Optional["User"] = None,
+    ) -> List[Media]:
+        """add uploaded files and/or already stored `Media` after the
+        sailboat's current images, see `Vessel.add_images`"""
+        # pylint: disable-next=import-outside-toplevel
+        from webapp.controllers.media import store_uploads
+
+        media = store_uploads(images, user)
+        if not media:
+            return media
+        self.updated_at = timezone.now()
+        Sailboat.objects.filter(pk=self.pk).update(updated_at=self.updated_at)
+        highest_order = (
+            SailboatImage.objects.filter(sailboat=self).aggregate(models.Max("order"))[
+                "order__max"
+            ]
+            or 0
+        )
+        SailboatImage.objects.bulk_create(
+            SailboatImage(sailboat=self, image=image, order=highest_order + index)
+            for index, image in enumerate(media, start=1)
+        )
+        # the update and bulk insert skip the signals the cards are cached on
+        transaction.on_commit(lambda: bump_cache_version(CATALOG_CACHE))
+        return media
+
+    def build_search_document(self) -> str:
+        """the text searched for this model: make, name and designers"""
+        parts = [self.make.name, self.name]
+        if self.pk:
+            # from the prefetch cache when `refresh_search_documents` has one
+            parts.extend(designer.name for designer in self.designers.all())
+        return " ".join(part for part in parts if part)
+
+    @classmethod
+    def refresh_search_documents(cls, sailboats: models.QuerySet):
+        """rebuild the search documents of `sailboats` and their vessels in
+        bulk, for when a make or designer they mention changes. Bulk writes
+        skip the signals, so the catalog caches are bumped here"""
+        sailboats = list(sailboats.select_related("make").prefetch_related("designers"))
+        if not sailboats:
+            return
+        for sailboat in sailboats:
+            sailboat.search_document = sailboat.build_search_document()
+        cls.objects.bulk_update(sailboats, ["search_document"], batch_size=500)
+
+        by_id = {sailboat.pk: sailboat for sailboat in sailboats}
+        vessel_model = cls.vessels.rel.related_model
+        vessels = list(vessel_model.objects.filter(sailboat__in=sailboats))
+        for vessel in vessels:
+            vessel.sailboat = by_id[vessel.sailboat_id]
+            vessel.search_document = vessel.build_search_document()
+        vessel_model.objects.bulk_update(vessels, ["search_document"], batch_size=500)
+        transaction.on_commit(lambda: bump_cache_version(CATALOG_CACHE))
+
+    def refresh_vessel_search_documents(self):
+        """vessels embed the make, model and designers in their own search
+        document, so they need rebuilding when those change"""
+        vessels = list(self.vessels.all())
+        for vessel in vessels:
+            vessel.sailboat = self
+            vessel.search_document = vessel.build_search_document()
+        self.vessels.model.objects.bulk_update(
+            vessels, ["search_document"], batch_size=500
+        )
+
     def save(self, *args, **kwargs):
         self.name = self.name.lower()
         is_new = self.pk is None
+        previous_document = (
+            None
+            if is_new
+            else Sailboat.objects.filter(pk=self.pk)
+            .values_list("search_document", flat=True)
+            .first()
+        )
+        self.search_document = self.build_search_document()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "search_document"}
         super().save(*args, **kwargs)
         if is_new and self.created_by:
             assign_perm("can_manage_sailboats", self.created_by, self)
             assign_perm("can_view_sailboats", self.created_by, self)
+        if previous_document is not None and previous_document != self.search_document:
+            self.refresh_vessel_search_documents()
 
     @property
     def attributes(self):
@@ -168,3 +267,52 @@ class Sailboat(models.Model):
             )
 
         return sailboat
+
+
+@receiver(m2m_changed, sender=Sailboat.designers.through)
+def update_search_on_designers_changed(
+    sender, instance, action, reverse, pk_set, **kwargs
+):  # pylint: disable=unused-argument
+    """designers are part of the search document, but adding or removing
+    them doesn't save the sailboat"""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            instance.save(update_fields=["search_document"])
+        return
+    # from the designer side the affected sailboats are the ones in pk_set,
+    # or for a clear, the ones linked before the clear happened
+    if action == "pre_clear":
+        instance.search_sailboat_ids = list(
+            instance.sailboats.values_list("pk", flat=True)
+        )
+        return
+    if action == "post_clear":
+        pk_set = getattr(instance, "search_sailboat_ids", [])
+    elif action not in ("post_add", "post_remove"):
+        return
+    Sailboat.refresh_search_documents(Sailboat.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Make)
+@receiver(post_save, sender=Designer)
+def update_search_on_rename(
+    sender, instance, created, **kwargs
+):  # pylint: disable=unused-argument
+    """renaming a make or designer changes the search document of every
+    sailboat (and vessel) that mentions it. Saves that keep the name don't
+    touch them, an instance not loaded from the database counts as renamed"""
+    if created or getattr(instance, "loaded_name", None) == instance.name:
+        return
+    instance.loaded_name = instance.name
+    Sailboat.refresh_search_documents(instance.sailboats.all())
+
+
+@receiver([post_save, post_delete], sender=Make)
+@receiver([post_save, post_delete], sender=Designer)
+@receiver([post_save, post_delete], sender=Sailboat)
+@receiver([post_save, post_delete], sender=SailboatAttribute)
+@receiver(m2m_changed, sender=Sailboat.designers.through)
+def invalidate_catalog_cache(sender, **kwargs):  # pylint: disable=unused-argument
+    """facet counts and other catalog caches are keyed on the catalog version.
+    Queryset .update()/.delete() skip these signals and need to bump it too"""
+    bump_cache_version(CATALOG_CACHE)
@@ -1,11 +1,12 @@
 from django.contrib.auth.models import AbstractUser, Permission
 from django.db import models
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from django.contrib.contenttypes.models import ContentType
 from guardian.shortcuts import get_objects_for_user
 
 from webapp.models.sailboat import Sailboat
-from webapp.models.vessel import Vessel
+from webapp.models.vessel import Vessel, VesselGroupObjectPermission
 
 
 class User(AbstractUser):
@@ -76,62 +77,71 @@ class User(AbstractUser):
 
         if self.is_admin:
             return Vessel.objects.all()
-        return get_objects_for_user(self, "webapp.can_manage_vessel", Vessel)
+        return self._vessels_with_role("SKIPPER")
 
     def get_crewable_vessels(self):
         """Get all vessels that the user can crew (crew or skipper role)"""
         if self.is_admin:
             return Vessel.objects.all()
-        return get_objects_for_user(
-            self, ["webapp.can_crew_vessel", "webapp.can_manage_vessel"], Vessel
-        )
+        return self._vessels_with_role("CREW")
 
     def get_viewable_vessels(self):
         """Get all vessels that the user can view (any role + public vessels)"""
         if self.is_admin or self.is_moderator:
             return Vessel.objects.all()
 
-        # Get private vessels user has access to
-        private_vessels = get_objects_for_user(
-            self,
-            [
-                "webapp.can_view_vessel",
-                "webapp.can_crew_vessel",
-                "webapp.can_manage_vessel",
+        # Public vessels plus the ones the user has any role on
+        return Vessel.objects.filter(
+            models.Q(is_public=True) | self._has_vessel_role("VIEWER")
+        )
+
+    def _vessels_with_role(self, role):
+        """the vessels the user has `role` or more on, by the `VesselRole`
+        name"""
+        return Vessel.objects.filter(self._has_vessel_role(role))
+
+    def _has_vessel_role(self, role) -> models.Q:
+        """vessels the user has `role` or more on, through their membership or
+        a group's object permissions. Memberships only mirror permissions
+        granted to the user, so group grants are looked up like
+        `VesselRoleResolver` does. Both are indexed subqueries, a vessel
+        matched by both isn't repeated"""
+        # pylint: disable-next=import-outside-toplevel
+        from webapp.controllers.roles import ROLE_PERMISSIONS, VesselRole
+
+        role = VesselRole[role]
+        group_grants = VesselGroupObjectPermission.objects.filter(
+            group__user=self,
+            permission__codename__in=[
+                codename
+                for codename, granted in ROLE_PERMISSIONS.items()
+                if granted >= role
             ],
-            Vessel,
-        ).filter(is_public=False)
+        )
+        return models.Q(
+            pk__in=self.vessel_memberships.filter(role__gte=role).values("vessel_id")
+        ) | models.Q(pk__in=group_grants.values("content_object_id"))
 
-        # Combine with public vessels
-        public_vessels = Vessel.objects.filter(is_public=True)
+    @cached_property
+    def vessel_roles(self):
+        """this user's roles on vessels, resolved once per vessel while the
+        instance lives (for `request.user`, the request)"""
+        # pylint: disable-next=import-outside-toplevel
+        from webapp.controllers.roles import VesselRoleResolver
 
-        return private_vessels.union(public_vessels)
+        return VesselRoleResolver(self)
 
     def can_manage_vessel(self, vessel):
         """Check if user can manage a specific vessel (skipper role)"""
-        if self.is_admin:
-            return True
-        return self.has_perm("webapp.can_manage_vessel", vessel)
+        return self.vessel_roles.can_manage(vessel)
 
     def can_crew_vessel(self, vessel):
         """Check if user can crew a specific vessel (crew or skipper role)"""
-        if self.is_admin:
-            return True
-        return self.has_perm("webapp.can_crew_vessel", vessel) or self.has_perm(
-            "webapp.can_manage_vessel", vessel
-        )
+        return self.vessel_roles.can_crew(vessel)
 
     def can_view_vessel(self, vessel):
         """Check if user can view a specific vessel (any role or public)"""
-        if self.is_admin or self.is_moderator:
-            return True
-        if vessel.is_public:
-            return True
-        return (
-            self.has_perm("webapp.can_view_vessel", vessel)
-            or self.has_perm("webapp.can_crew_vessel", vessel)
-            or self.has_perm("webapp.can_manage_vessel", vessel)
-        )
+        return self.vessel_roles.can_view(vessel)
 
     def assign_role_permissions(self):
         """Assign appropriate permissions based on user role"""
@@ -1,10 +1,13 @@
-from typing import TYPE_CHECKING
-from django.db import models
+from typing import TYPE_CHECKING, Iterable, List, Optional, Union
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from guardian.models import UserObjectPermissionBase, GroupObjectPermissionBase
-from guardian.shortcuts import assign_perm
+from webapp.cache import CATALOG_CACHE, bump_cache_version
 from webapp.models.sailboat import Sailboat
 from webapp.models.media import Media
 from webapp.models.attribute import Attribute
@@ -12,7 +15,6 @@ from webapp.models.sailboat_attribute import SailboatAttribute
 from webapp.models.moderation import Moderation
 from webapp.schemas.attributes import AttributeAssignment
 
-
 if TYPE_CHECKING:
     from webapp.models.user import User  # noqa: F401
     from django.core.files.uploadedfile import UploadedFile
@@ -22,6 +24,16 @@ class VesselAttribute(models.Model):
     vessel = models.ForeignKey("Vessel", on_delete=models.CASCADE)
     attribute = models.ForeignKey("Attribute", on_delete=models.CASCADE)
     value = models.CharField(max_length=255)
+    value_float = models.FloatField(
+        null=True,
+        blank=True,
+        help_text=_("The value cast to a float, for FLOAT attributes"),
+    )
+    value_integer = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text=_("The value cast to an integer, for INTEGER attributes"),
+    )
 
     class Meta:
         verbose_name = _("vessel attribute")
@@ -29,11 +41,55 @@ class VesselAttribute(models.Model):
         unique_together = [["vessel", "attribute"]]
         indexes = [
             models.Index(fields=["vessel", "attribute"]),
+            models.Index(fields=["attribute", "value"]),
+            models.Index(fields=["attribute", "value_float"]),
+            models.Index(fields=["attribute", "value_integer"]),
         ]
 
     def __str__(self):
         return f"{self.vessel} - {self.attribute.name}"
 
+    @staticmethod
+    def typed_value_field(attribute: Attribute) -> str:
+        """the column holding values of this attribute in their native type,
+        so range filters and sorts can use the (attribute, value_*) indexes"""
+        match attribute.data_type:
+            case Attribute.DataType.FLOAT:
+                return "value_float"
+            case Attribute.DataType.INTEGER:
+                return "value_integer"
+            case _:
+                return "value"
+
+    @staticmethod
+    def cast_value(attribute: Attribute, value):
+        """cast a raw value to the attribute data type, raises ValueError"""
+        match attribute.data_type:
+            case Attribute.DataType.FLOAT:
+                return float(value)
+            case Attribute.DataType.INTEGER:
+                return int(float(value))
+            case _:
+                return str(value)
+
+    def set_typed_value(self):
+        """fill the typed value columns from `value`. Bulk writes skip `save()`
+        so they need to call this themselves"""
+        self.value_float = None
+        self.value_integer = None
+        field = self.typed_value_field(self.attribute)
+        if field == "value":
+            return
+        try:
+            setattr(self, field, self.cast_value(self.attribute, self.value))
+        except (TypeError, ValueError):
+            # keep the raw string, the row just won't match range filters
+            pass
+
+    def save(self, *args, **kwargs):
+        self.set_typed_value()
+        super().save(*args, **kwargs)
+
     def clean(self):
         super().clean()
         match self.attribute.data_type:
@@ -58,43 +114,17 @@ class VesselAttribute(models.Model):
             raise ValidationError(
                 {"value": _("Value must be in the allowed options list")}
             )
-
-        current_sailboat_attribute = SailboatAttribute.objects.filter(
-            sailboat=self.sailboat,
-            attribute=self.attribute,
-        ).first()
-        # if the sailboat already has this attribute
-        # and the attribute does not accept contributions,
-        # then we need to make sure the value is in the list of allowed value
+        # attributes that don't accept contributions are limited to the values
+        # the sailboat already lists, once it lists any
         if not self.attribute.accepts_contributions:
-            if (
-                current_sailboat_attribute
-                and self.value not in current_sailboat_attribute.values
-            ):
+            sailboat_attribute = SailboatAttribute.objects.filter(
+                sailboat=self.vessel.sailboat,
+                attribute=self.attribute,
+            ).first()
+            if sailboat_attribute and self.value not in sailboat_attribute.values:
                 raise ValidationError(
                     {"value": _("Value is not allowed for this sailboat")}
                 )
-        # add the value to the sailboat attribute or create a new one
-        if current_sailboat_attribute:
-            current_sailboat_attribute.values.append(self.value)
-            current_sailboat_attribute.save()
-            verb = Moderation.Verb.UPDATE
-        else:
-            SailboatAttribute.objects.create(
-                sailboat=self.sailboat,
-                attribute=self.attribute,
-                values=[self.value],
-            )
-            verb = Moderation.Verb.CREATE
-        Moderation.objects.create(
-            object_id=self.id,
-            data={
-                "attribute": self.attribute.id,
-                "value": self.value,
-            },
-            verb=verb,
-            triggered_by=self,
-        )
 
 
 class VesselImage(models.Model):
@@ -165,6 +195,20 @@ class Vessel(models.Model):
         related_name="created_vessels",
         help_text=_("User who created this vessel"),
     )
+    search_document = models.TextField(
+        blank=True,
+        default="",
+        editable=False,
+        help_text=_(
+            "Name, HIN, USCG number, home port and sailboat, kept current on save "
+            "for search"
+        ),
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        help_text=_("Maintained from the search document by a database trigger"),
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -213,40 +257,201 @@ class Vessel(models.Model):
         """Check if the vessel has any images"""
         return self.images.exists()
 
-    def add_image(self, image: "UploadedFile"):
-        """add an image to the vessel"""
-        media = Media.objects.create(file=image)
-        VesselImage.objects.create(
-            vessel=self, image=media, order=self.images.count() + 1
+    def add_image(
+        self, image: Union["UploadedFile", Media], user: Optional["User"] = None
+    ):
+        """add an uploaded file, or an already stored `Media`, to the vessel"""
+        self.add_images([image], user=user)
+
+    @transaction.atomic
+    def add_images(
+        self,
+        images: Iterable[Union["UploadedFile", Media]],
+        user: Optional["User"] = None,
+    ) -> List[Media]:
+        """add uploaded files and/or already stored `Media` after the vessel's
+        current images. Uploads are stored concurrently (see
+        `store_uploads`), then the images are ordered and inserted in one
+        statement and the vessel is touched once"""
+        # pylint: disable-next=import-outside-toplevel
+        from webapp.controllers.media import store_uploads
+
+        media = store_uploads(images, user)
+        if not media:
+            return media
+        # touching the vessel first locks its row, so concurrent adds can't
+        # pick the same order values
+        self.updated_at = timezone.now()
+        Vessel.objects.filter(pk=self.pk).update(updated_at=self.updated_at)
+        highest_order = (
+            VesselImage.objects.filter(vessel=self).aggregate(models.Max("order"))[
+                "order__max"
+            ]
+            or 0
+        )
+        VesselImage.objects.bulk_create(
+            VesselImage(vessel=self, image=image, order=highest_order + index)
+            for index, image in enumerate(media, start=1)
         )
-        self.save()
+        return media
 
     def create_or_update_attribute(
-        self, attribute_assignment: AttributeAssignment
+        self, attribute_assignment: AttributeAssignment, user: Optional["User"] = None
     ) -> VesselAttribute:
-        """create or update an attribute for the vessel, and create a moderation request
-        for the parent sailboat if the data is new"""
-        attribute = Attribute.objects.get(name=attribute_assignment.name)
-        if existing_attribute := VesselAttribute.objects.filter(
-            vessel=self,
-            attribute=attribute,
-        ).first():
-            existing_attribute.value = attribute_assignment.value
-            existing_attribute.save()
-            return existing_attribute
-        return VesselAttribute.objects.create(
-            vessel=self, attribute=attribute, value=attribute_assignment.value
+        """create or update a single attribute, see `set_attributes`"""
+        self.set_attributes([attribute_assignment], user=user)
+        return VesselAttribute.objects.select_related("attribute").get(
+            vessel=self, attribute__name=attribute_assignment.name.lower()
+        )
+
+    @transaction.atomic
+    def set_attributes(
+        self,
+        assignments: Iterable[AttributeAssignment],
+        user: Optional["User"] = None,
+        replace: bool = False,
+    ) -> None:
+        """create, update and (with `replace`, or for blank values) delete
+        attributes of the vessel in bulk. Values the sailboat doesn't list yet are
+        contributed to its `SailboatAttribute`s with a moderation request each.
+        A fixed constant number of queries however many attributes are set.
+        Raises ValueError for unknown attribute names"""
+        values = {
+            assignment.name.lower(): str(assignment.value).strip()
+            for assignment in assignments
+        }
+        attributes = {
+            attribute.name: attribute
+            for attribute in Attribute.objects.filter(name__in=values)
+        }
+        if unknown := values.keys() - attributes.keys():
+            raise ValueError(f"Unknown attribute(s): {', '.join(sorted(unknown))}")
+
+        current = {
+            vessel_attribute.attribute_id: vessel_attribute
+            for vessel_attribute in self.vesselattribute_set.all()
+        }
+        to_create, to_update, changed = [], [], []
+        deleted_ids = set(current) if replace else set()
+        for name, value in values.items():
+            attribute = attributes[name]
+            vessel_attribute = current.get(attribute.id)
+            if not value:
+                if vessel_attribute:
+                    deleted_ids.add(attribute.id)
+                continue
+            deleted_ids.discard(attribute.id)
+            if vessel_attribute is None:
+                vessel_attribute = VesselAttribute(
+                    vessel=self, attribute=attribute, value=value
+                )
+                to_create.append(vessel_attribute)
+            elif vessel_attribute.value != value:
+                vessel_attribute.value = value
+                to_update.append(vessel_attribute)
+            else:
+                continue
+            vessel_attribute.attribute = attribute
+            vessel_attribute.set_typed_value()
+            changed.append(vessel_attribute)
+
+        if deleted_ids:
+            self.vesselattribute_set.filter(attribute_id__in=deleted_ids).delete()
+        VesselAttribute.objects.bulk_create(to_create)
+        VesselAttribute.objects.bulk_update(
+            to_update, ["value", "value_float", "value_integer"]
         )
+        if changed:
+            self._contribute_attributes(changed, user)
+
+    def _contribute_attributes(
+        self, vessel_attributes: List[VesselAttribute], user: Optional["User"]
+    ) -> None:
+        """add vessel attribute values the sailboat doesn't list yet to its
+        `SailboatAttribute`s, with a moderation request for each contribution.
+        Fixed attributes and values that don't fit the attribute are skipped"""
+        sailboat_attributes = {
+            sailboat_attribute.attribute_id: sailboat_attribute
+            for sailboat_attribute in SailboatAttribute.objects.filter(
+                sailboat_id=self.sailboat_id,
+                attribute_id__in=[va.attribute_id for va in vessel_attributes],
+            )
+        }
+        to_create, to_update, contributions = [], [], []
+        for vessel_attribute in vessel_attributes:
+            attribute = vessel_attribute.attribute
+            try:
+                value = VesselAttribute.cast_value(attribute, vessel_attribute.value)
+            except (TypeError, ValueError):
+                continue
+            if attribute.options and value not in attribute.options:
+                continue
+            sailboat_attribute = sailboat_attributes.get(attribute.id)
+            if sailboat_attribute is None:
+                sailboat_attribute = SailboatAttribute(
+                    sailboat_id=self.sailboat_id, attribute=attribute, values=[value]
+                )
+                sailboat_attributes[attribute.id] = sailboat_attribute
+                to_create.append(sailboat_attribute)
+                verb = Moderation.Verb.CREATE
+            elif value in sailboat_attribute.values:
+                continue
+            elif not attribute.accepts_contributions:
+                continue
+            else:
+                sailboat_attribute.values = [*sailboat_attribute.values, value]
+                if sailboat_attribute not in to_update:
+                    to_update.append(sailboat_attribute)
+                verb = Moderation.Verb.UPDATE
+            contributions.append((sailboat_attribute, vessel_attribute, value, verb))
+        if not contributions:
+            return
+
+        SailboatAttribute.objects.bulk_create(to_create)
+        SailboatAttribute.objects.bulk_update(to_update, ["values"])
+        content_type = ContentType.objects.get_for_model(SailboatAttribute)
+        triggered_by_content_type = ContentType.objects.get_for_model(VesselAttribute)
+        Moderation.objects.bulk_create(
+            Moderation(
+                content_type=content_type,
+                object_id=sailboat_attribute.id,
+                triggered_by_content_type=triggered_by_content_type,
+                triggered_by_object_id=vessel_attribute.id,
+                requested_by=user,
+                request_note=f"{value} was contributed by a vessel of this model",
+                verb=verb,
+                data={"attribute": vessel_attribute.attribute_id, "value": value},
+            )
+            for sailboat_attribute, vessel_attribute, value, verb in contributions
+        )
+        # bulk writes skip the signals that version the catalog caches
+        transaction.on_commit(lambda: bump_cache_version(CATALOG_CACHE))
+
+    def build_search_document(self) -> str:
+        """the text searched for this vessel, including its sailboat's document
+        so `catalina wanderer` finds the catalina named wanderer"""
+        parts = [
+            self.name,
+            self.hull_identification_number,
+            self.USCG_number,
+            self.home_port,
+            self.sailboat.search_document or self.sailboat.build_search_document(),
+        ]
+        return " ".join(part for part in parts if part)
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
+        self.search_document = self.build_search_document()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "search_document"}
         super().save(*args, **kwargs)
 
         # Assign permissions to creator for new vessels
         if is_new and self.created_by:
-            assign_perm("can_manage_vessel", self.created_by, self)
-            assign_perm("can_crew_vessel", self.created_by, self)
-            assign_perm("can_view_vessel", self.created_by, self)
+            # pylint: disable-next=import-outside-toplevel
+            from webapp.controllers.roles import VesselRole, grant_vessel_role
+
+            grant_vessel_role(self, self.created_by, VesselRole.SKIPPER)
 
 
 class VesselUserObjectPermission(UserObjectPermissionBase):
@@ -2,8 +2,6 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from guardian.shortcuts import assign_perm
-
 
 User = get_user_model()
 
@@ -85,15 +83,10 @@ class VesselAccessRequest(models.Model):
         self.save()
 
         # Assign the appropriate permissions
-        if self.requested_role == self.Role.VIEWER:
-            assign_perm("webapp.can_view_vessel", self.requester, self.vessel)
-        elif self.requested_role == self.Role.CREW:
-            assign_perm("webapp.can_view_vessel", self.requester, self.vessel)
-            assign_perm("webapp.can_crew_vessel", self.requester, self.vessel)
-        elif self.requested_role == self.Role.SKIPPER:
-            assign_perm("webapp.can_view_vessel", self.requester, self.vessel)
-            assign_perm("webapp.can_crew_vessel", self.requester, self.vessel)
-            assign_perm("webapp.can_manage_vessel", self.requester, self.vessel)
+        # pylint: disable-next=import-outside-toplevel
+        from webapp.controllers.roles import ROLE_NAMES, grant_vessel_role
+
+        grant_vessel_role(self.vessel, self.requester, ROLE_NAMES[self.requested_role])
 
     def deny(self, reviewer):
         """Deny the request"""
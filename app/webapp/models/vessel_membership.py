@@ -0,0 +1,57 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from webapp.models.vessel import Vessel
+from webapp.models.user import User
+
+
+class VesselMembership(models.Model):
+    """a user's role on a vessel, a copy of their guardian object permissions
+    so "vessels I can see", "my fleet" and rosters are one indexed lookup.
+    Kept in sync by `webapp.controllers.roles`, change roles through there.
+
+    Only permissions granted to the user are copied, not their groups'.
+    The `User` vessel listings look group grants up next to it, rosters
+    list the members of a vessel, not its groups"""
+
+    class Role(models.IntegerChoices):
+        # the `VesselRole` values, so roles compare the same in both places
+        VIEWER = 1, _("Viewer")
+        CREW = 2, _("Crew")
+        SKIPPER = 3, _("Skipper")
+
+    vessel = models.ForeignKey(
+        Vessel,
+        on_delete=models.CASCADE,
+        related_name="memberships",
+        help_text=_("The vessel the user has a role on"),
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="vessel_memberships",
+        help_text=_("The member"),
+    )
+    role = models.PositiveSmallIntegerField(
+        choices=Role.choices,
+        help_text=_("The highest role the user's permissions grant"),
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("vessel membership")
+        verbose_name_plural = _("vessel memberships")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["vessel", "user"], name="unique_vessel_membership"
+            )
+        ]
+        indexes = [
+            # a user's vessels at or above a role
+            models.Index(fields=["user", "role", "vessel"]),
+            # a vessel's roster, skippers first
+            models.Index(fields=["vessel", "role", "user"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user} on {self.vessel} ({self.get_role_display()})"
@@ -2,6 +2,7 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from webapp.models.vessel import Vessel
 from webapp.models.user import User
+from webapp.models.rendered_markdown import RenderedMarkdown
 
 
 class VesselNote(models.Model):
@@ -43,7 +44,9 @@ class VesselNote(models.Model):
         return self.user
 
 
-class NoteMessage(models.Model):
+class NoteMessage(RenderedMarkdown):
+    MARKDOWN_MESSAGES = True
+
     vessel_note = models.ForeignKey(
         VesselNote,
         on_delete=models.CASCADE,
@@ -0,0 +1,276 @@
+import base64
+import binascii
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Union
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, OrderBy, Q, QuerySet
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """one column of a keyset ordering. `nulls_last` is None for columns that
+    can't be null, which keeps the ORDER BY plain so a btree index can serve it
+    in either direction. Nullable columns must say where their nulls go so the
+    cursor comparisons agree with the database on every backend"""
+
+    name: str
+    descending: bool = False
+    nulls_last: Optional[bool] = None
+
+    @classmethod
+    def parse(cls, ordering: Union[str, OrderBy, F]) -> "SortKey":
+        """accepts `"-name"`, `F("name")` or `F("name").desc(nulls_last=True)`"""
+        if isinstance(ordering, str):
+            return cls(name=ordering.lstrip("-"), descending=ordering.startswith("-"))
+        if isinstance(ordering, F):
+            return cls(name=ordering.name)
+        if isinstance(ordering, OrderBy) and isinstance(ordering.expression, F):
+            nulls_last = None
+            if ordering.nulls_first or ordering.nulls_last:
+                nulls_last = bool(ordering.nulls_last)
+            return cls(
+                name=ordering.expression.name,
+                descending=ordering.descending,
+                nulls_last=nulls_last,
+            )
+        raise ValueError(f"Can't paginate on {ordering!r}, order by a field name")
+
+    def reversed(self) -> "SortKey":
+        nulls_last = None if self.nulls_last is None else not self.nulls_last
+        return SortKey(self.name, not self.descending, nulls_last)
+
+    def order_by(self) -> OrderBy:
+        nulls = {}
+        if self.nulls_last is not None:
+            nulls = {"nulls_last": True} if self.nulls_last else {"nulls_first": True}
+        expression = F(self.name)
+        return expression.desc(**nulls) if self.descending else expression.asc(**nulls)
+
+    def after(self, value) -> Q:
+        """rows sorting strictly after `value` on this key"""
+        if value is None:
+            # nothing sorts after a trailing null, everything non null sorts
+            # after a leading one
+            return (
+                Q(pk__in=[])
+                if self.nulls_last
+                else Q(**{f"{self.name}__isnull": False})
+            )
+        lookup = "lt" if self.descending else "gt"
+        strictly_after = Q(**{f"{self.name}__{lookup}": value})
+        if self.nulls_last:
+            strictly_after |= Q(**{f"{self.name}__isnull": True})
+        return strictly_after
+
+    def tie(self, value) -> Q:
+        if value is None:
+            return Q(**{f"{self.name}__isnull": True})
+        return Q(**{self.name: value})
+
+    def value_of(self, item) -> Any:
+        for attribute in self.name.split("__"):
+            if item is None:
+                return None
+            item = getattr(item, attribute)
+        return item
+
+
+def _after(keys: Sequence[SortKey], values: Sequence) -> Q:
+    """the keyset condition `(k1, k2, ...) > (v1, v2, ...)` in sort order,
+    written out so it works with mixed directions and nulls"""
+    key, value = keys[0], values[0]
+    if len(keys) == 1:
+        return key.after(value)
+    return key.after(value) | (key.tie(value) & _after(keys[1:], values[1:]))
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """datetimes at full precision, `DjangoJSONEncoder` cuts them to the
+    millisecond and a cursor has to compare equal to the row it came from"""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return {"dt": o.isoformat()}
+        return super().default(o)
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and value.keys() == {"dt"}:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: Sequence, backwards: bool = False) -> str:
+    payload = json.dumps(
+        {"v": list(values), "b": backwards},
+        cls=_CursorEncoder,
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """returns (values, backwards), raises ValueError for garbage"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return [_decode_value(value) for value in payload["v"]], bool(payload["b"])
+    except (binascii.Error, UnicodeDecodeError, TypeError, KeyError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def estimate_count(queryset: QuerySet) -> int:
+    """a cheap row count from the postgres planner statistics: pg_class for an
+    unfiltered table, the EXPLAIN row estimate otherwise. Falls back to an
+    exact COUNT(*) on other databases or when postgres has no statistics yet"""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        else:
+            sql, params = queryset.order_by().values("pk").query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            row = [plan[0]["Plan"]["Plan Rows"]]
+    # reltuples is -1 for a table that has never been analyzed
+    if not row or row[0] is None or row[0] < 0:
+        return queryset.count()
+    return int(row[0])
+
+
+@dataclass
+class KeysetPage:
+    """a page of results between two cursors. Iterates like a Django `Page`"""
+
+    object_list: List
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+    estimated_total: Optional[int] = None
+    per_page: int = field(default=0, repr=False)
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+class KeysetPaginator:
+    """cursor pagination: each page is a `WHERE (sort keys) > (last row)`
+    seek on the ordering index instead of `OFFSET n`, so deep pages cost the
+    same as the first one and there is no COUNT(*) per request.
+
+    `ordering` takes the same expressions as `order_by`, and must end on a
+    unique column (the pk is appended if it doesn't). Ordering on a relation
+    (`make__name`) needs the relation selected so cursors can read it."""
+
+    def __init__(
+        self,
+        queryset: QuerySet,
+        ordering: Sequence[Union[str, OrderBy, F]],
+        per_page: int,
+        estimate_total: bool = False,
+    ):
+        self.queryset = queryset
+        self.keys = [SortKey.parse(ordering_item) for ordering_item in ordering]
+        if not self.keys or self.keys[-1].name not in ("pk", "id"):
+            self.keys.append(SortKey("pk"))
+        self.per_page = per_page
+        self.estimate_total = estimate_total
+
+    def _field_for(self, name: str):
+        """the field a sort key's values are of, for a model field, one across
+        relations (`make__name`) or an annotation"""
+        if name in self.queryset.query.annotations:
+            return self.queryset.query.annotations[name].output_field
+        opts = self.queryset.model._meta
+        *relations, field_name = name.split("__")
+        for relation in relations:
+            opts = opts.get_field(relation).related_model._meta
+        return opts.pk if field_name == "pk" else opts.get_field(field_name)
+
+    def _cursor_values(self, values: List) -> List:
+        """the decoded cursor values as their fields' python values, raises
+        ValidationError, ValueError or TypeError for values of the wrong type"""
+        return [
+            None if value is None else self._field_for(key.name).to_python(value)
+            for key, value in zip(self.keys, values)
+        ]
+
+    def _cursor_for(self, item, backwards: bool) -> str:
+        return encode_cursor([key.value_of(item) for key in self.keys], backwards)
+
+    def get_page(self, cursor: Optional[str] = None) -> KeysetPage:
+        """the page after (or for a backwards cursor, before) `cursor`.
+        A missing or invalid cursor gives the first page"""
+        values, backwards = None, False
+        if cursor:
+            try:
+                values, backwards = decode_cursor(cursor)
+                if len(values) != len(self.keys):
+                    raise ValueError("Cursor doesn't match the ordering")
+                # a value the database can't compare would only fail once
+                # the rows are read
+                values = self._cursor_values(values)
+            except (ValidationError, ValueError, TypeError):
+                logger.info("Ignoring invalid pagination cursor %r", cursor)
+                values, backwards = None, False
+
+        keys = [key.reversed() for key in self.keys] if backwards else self.keys
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(_after(keys, values))
+        rows = list(
+            queryset.order_by(*[key.order_by() for key in keys])[: self.per_page + 1]
+        )
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return KeysetPage(
+            object_list=rows,
+            next_cursor=(
+                self._cursor_for(rows[-1], False) if rows and has_next else None
+            ),
+            previous_cursor=(
+                self._cursor_for(rows[0], True) if rows and has_previous else None
+            ),
+            estimated_total=(
+                estimate_count(self.queryset) if self.estimate_total else None
+            ),
+            per_page=self.per_page,
+        )
@@ -0,0 +1,18 @@
+from typing import Generic, List, Optional, TypeVar
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """a page of a cursor paginated listing. Pass `next_cursor` or
+    `previous_cursor` back as `cursor` to move between pages"""
+
+    items: List[T]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page")
+    previous_cursor: Optional[str] = Field(
+        None, description="Cursor for the previous page"
+    )
+    estimated_total: Optional[int] = Field(
+        None, description="Approximate number of matching rows, from planner statistics"
+    )
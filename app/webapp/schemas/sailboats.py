@@ -0,0 +1,153 @@
+from enum import Enum
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+from django.http import QueryDict
+
+ATTRIBUTE_FILTER_PREFIX = "attr_"
+
+
+def index_attribute_fields(
+    data: QueryDict, keep_empty: bool = False
+) -> Dict[str, List[str]]:
+    """one pass over the keys of a form, collecting `attr_<name>` and
+    `attr_<name>[...]` fields by form field name with blank values dropped.
+    With `keep_empty` fields that were posted without values are kept (as an
+    empty list) so they can be told apart from fields that weren't posted"""
+    attributes: Dict[str, List[str]] = {}
+    for key in data.keys():
+        if not key.startswith(ATTRIBUTE_FILTER_PREFIX):
+            continue
+        field_name = key.split("[", 1)[0]
+        values = [value for value in data.getlist(key) if value]
+        if values or keep_empty:
+            attributes.setdefault(field_name, []).extend(values)
+    return attributes
+
+
+def _as_year(value: Optional[str]) -> Optional[int]:
+    """a posted year, None for anything that isn't one"""
+    value = (value or "").strip()
+    return int(value) if value.isdigit() else None
+
+
+class SailboatOrdering(str, Enum):
+    name = "name"
+    name_desc = "-name"
+    year = "manufactured_start_year"
+    year_desc = "-manufactured_start_year"
+    relevance = "relevance"
+
+
+class SailboatListRequest(BaseModel):
+    """filtering for the sailboat catalog. Something like
+    `catalinas designed by frank butler, built after 1975, with a fin keel`"""
+
+    search: Optional[str] = Field(
+        None, description="Free text matched against make, model and designers"
+    )
+    name: Optional[str] = Field(None, description="Part of the model name")
+    make: Optional[str] = Field(None, description="The exact make name")
+    designer: Optional[str] = Field(None, description="The exact designer name")
+    year_start: Optional[int] = Field(
+        None, description="Only models still in production in or after this year"
+    )
+    year_end: Optional[int] = Field(
+        None, description="Only models that started production in or before this year"
+    )
+    attributes: Dict[str, List[str]] = Field(
+        default_factory=dict,
+        description="Attribute form field names (`attr_<snake_case_name>`) "
+        "mapped to the values to match, any of which may match",
+    )
+    order_by: SailboatOrdering = Field(
+        SailboatOrdering.name, description="The ordering of the results"
+    )
+
+    @classmethod
+    def from_query_dict(cls, data: QueryDict) -> "SailboatListRequest":
+        """build a request from the GET parameters of the catalog filter form,
+        silently dropping anything that can't be understood"""
+        attributes = index_attribute_fields(data)
+
+        search = (data.get("search") or "").strip() or None
+        order_by = data.get("order_by")
+        if order_by not in SailboatOrdering._value2member_map_:
+            order_by = SailboatOrdering.relevance if search else SailboatOrdering.name
+
+        return cls(
+            search=search,
+            name=(data.get("name") or "").strip() or None,
+            make=(data.get("make") or "").strip().lower() or None,
+            designer=(data.get("designer") or "").strip().lower() or None,
+            year_start=_as_year(data.get("year_start")),
+            year_end=_as_year(data.get("year_end")),
+            attributes=attributes,
+            order_by=order_by,
+        )
+
+
+class SailboatForm(BaseModel):
+    """the sailboat create/update form"""
+
+    name: str = Field(..., min_length=1, description="The model name")
+    make: str = Field(..., min_length=1, description="The make name")
+    manufactured_start_year: Optional[int] = None
+    manufactured_end_year: Optional[int] = None
+    designers: List[str] = Field(
+        default_factory=list, description="Designer names, lowercased"
+    )
+    attributes: Dict[str, List[str]] = Field(
+        default_factory=dict,
+        description="Values by attribute form field name. A field posted "
+        "without values clears the attribute, fields not posted are left alone",
+    )
+
+    @classmethod
+    def from_post(cls, data: QueryDict) -> "SailboatForm":
+        designers = [
+            name.strip().lower()
+            for name in (data.get("designers") or "").split(",")
+            if name.strip()
+        ]
+        return cls(
+            name=(data.get("name") or "").strip().lower(),
+            make=(data.get("make") or "").strip().lower(),
+            manufactured_start_year=_as_year(data.get("manufactured_start_year")),
+            manufactured_end_year=_as_year(data.get("manufactured_end_year")),
+            designers=list(dict.fromkeys(designers)),
+            attributes=index_attribute_fields(data, keep_empty=True),
+        )
+
+
+class FacetCount(BaseModel):
+    """a filter value and how many sailboats it would match"""
+
+    value: str
+    label: str
+    count: int
+
+
+class SailboatFacets(BaseModel):
+    """counts for the filter sidebar. Each facet is counted against every
+    filter except its own, so picking a make still shows the other makes"""
+
+    makes: List[FacetCount] = Field(default_factory=list)
+    designers: List[FacetCount] = Field(default_factory=list)
+    years: List[FacetCount] = Field(
+        default_factory=list,
+        description="Decades (`1970`) and how many models were in production during them",
+    )
+    attributes: Dict[str, Dict[str, int]] = Field(
+        default_factory=dict,
+        description="Option counts for OPTIONS attributes, by form field name",
+    )
+
+
+class SailboatSummary(BaseModel):
+    """a sailboat model as listed in the catalog"""
+
+    id: int
+    make: str
+    name: str
+    manufactured_start_year: Optional[int] = None
+    manufactured_end_year: Optional[int] = None
@@ -0,0 +1,59 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class UploadStartRequest(BaseModel):
+    """a file the browser wants to upload straight to the bucket"""
+
+    filename: str = Field(..., min_length=1, description="The name of the file")
+    content_type: Optional[str] = Field(
+        None,
+        description="The MIME type the file is sent as, it has to be the one "
+        "its extension implies. Leave out to be told in the session headers",
+    )
+    size: int = Field(..., ge=1, description="The size of the file in bytes")
+
+
+class UploadPartUrl(BaseModel):
+    part_number: int
+    url: str
+
+
+class UploadSession(BaseModel):
+    """where to PUT the file. Small files are one PUT to `url` with `headers`,
+    larger ones are PUT in `part_size` slices to each of `parts`"""
+
+    token: str = Field(..., description="Pass back to complete the upload")
+    url: Optional[str] = Field(None, description="The presigned PUT url")
+    headers: Dict[str, str] = Field(
+        default_factory=dict, description="Headers the PUT has to send"
+    )
+    part_size: Optional[int] = Field(None, description="Bytes per part")
+    parts: List[UploadPartUrl] = Field(
+        default_factory=list, description="Presigned PUT urls for each part"
+    )
+
+
+class CompletedPart(BaseModel):
+    part_number: int
+    etag: str = Field(..., description="The ETag header of the part's PUT")
+
+
+class UploadCompleteRequest(BaseModel):
+    token: str
+    parts: List[CompletedPart] = Field(
+        default_factory=list, description="For multipart uploads, every part"
+    )
+
+
+class UploadedMedia(BaseModel):
+    """a stored upload, attach it to a form by id"""
+
+    id: int
+    url: str
+    media_type: str
+    status: str
+
+
+class UploadError(BaseModel):
+    error: str
@@ -2,10 +2,11 @@ from enum import Enum
 import re
 from datetime import datetime
 from pydantic import BaseModel, Field, field_validator, ConfigDict
-from typing import List, Any, Optional
+from typing import List, Any, Optional, Union
 from webapp.schemas.attributes import AttributeAssignment
 from django.core.files.uploadedfile import UploadedFile
 from webapp.models.user import User
+from webapp.models.media import Media
 
 
 class VesselFilterOperator(str, Enum):
@@ -30,12 +31,23 @@ class VesselFilter(BaseModel):
 class VesselListRequest(BaseModel):
     filters: List[VesselFilter]
     order_by: List[str] = Field(default_factory=lambda: [])
-    page: int = Field(default=1, description="The page number to return")
+    page: int = Field(default=1, ge=1, description="The page number to return")
     page_size: int = Field(
         default=25, ge=1, le=100, description="The number of items per page"
     )
 
 
+class VesselSummary(BaseModel):
+    """a vessel as listed in the vessel index"""
+
+    id: int
+    name: str
+    make: str
+    sailboat: str
+    year_built: Optional[int] = None
+    home_port: Optional[str] = None
+
+
 class VesselCreateRequest(BaseModel):
     """create a new vessel"""
 
@@ -60,8 +72,10 @@ class VesselCreateRequest(BaseModel):
     attributes: List[AttributeAssignment] = Field(
         ..., description="The attributes to create the vessel with"
     )
-    images: List[UploadedFile] = Field(
-        ..., description="The images to create the vessel with"
+    images: List[Union[UploadedFile, Media]] = Field(
+        ...,
+        description="The images to create the vessel with, uploaded with the "
+        "form or already stored by a direct upload",
     )
 
     @field_validator("hull_identification_number")
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.sites",
     "django.contrib.humanize",
+    "django.contrib.postgres",
     "django_htmx",
     "guardian",
     "allauth",
@@ -66,6 +67,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "webapp.middleware.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -106,6 +108,71 @@ if IS_PRODUCTION:
     SECURE_CONTENT_TYPE_NOSNIFF = True
     X_FRAME_OPTIONS = "DENY"
 
+# shared between workers so cache invalidation reaches every process,
+# the table is created by `manage.py createcachetable` on startup
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "webapp_cache",
+        "TIMEOUT": 60 * 60,
+    }
+}
+
+# per request query counts, see webapp.middleware.QueryBudgetMiddleware.
+# ROUTES maps url names to the number of queries they are allowed
+QUERY_BUDGET = {
+    "SAMPLE_RATE": float(
+        os.environ.get("QUERY_BUDGET_SAMPLE_RATE", "0.05" if IS_PRODUCTION else "1")
+    ),
+    "DEFAULT": 50,
+    "ROUTES": {
+        "sailboats_index": 20,
+        "vessels_index": 20,
+        "vessel_detail": 20,
+    },
+    "DUPLICATE_THRESHOLD": 3,
+}
+
+# the vessel detail page shows the logbook this many entries at a time
+VESSEL_LOGBOOK_PAGE_SIZE = 20
+
+# uploads are stored as is and images are resized and get their derivatives
+# on a per-process thread pool, see webapp.controllers.media
+MEDIA_PROCESSING_ASYNC = True
+MEDIA_PROCESSING_WORKERS = int(os.environ.get("MEDIA_PROCESSING_WORKERS", "2"))
+# images pending this many seconds were dropped with a restarted worker's
+# queue, the next pool to start queues them again
+MEDIA_PROCESSING_STALE_AFTER = 10 * 60
+# the files of a multi-image post are written to storage this many at a time
+MEDIA_UPLOAD_WORKERS = int(os.environ.get("MEDIA_UPLOAD_WORKERS", "4"))
+MEDIA_IMAGE_MAX_SIZE = 1600
+# JPEGs are decoded at reduced resolution, other images are decoded at full
+# size so they are limited to this many pixels (about 160MB as RGBA)
+MEDIA_IMAGE_MAX_PIXELS = 40_000_000
+# media urls from a bucket with querystring auth are signed for this many
+# seconds and reused for half of it, see webapp.media_urls
+MEDIA_SIGNED_URL_TTL = 60 * 60
+MEDIA_SIGNED_URL_CACHE_SIZE = 10_000
+# images at sizes no derivative has are rendered on request, at most
+# MEDIA_TRANSFORM_CONCURRENCY at a time per process (waiting up to
+# MEDIA_TRANSFORM_WAIT seconds for a turn), and kept in the bucket and in a
+# local disk cache, see webapp.controllers.media_transforms
+MEDIA_TRANSFORM_MAX_SIZE = 2048
+MEDIA_TRANSFORM_CONCURRENCY = int(os.environ.get("MEDIA_TRANSFORM_CONCURRENCY", "2"))
+MEDIA_TRANSFORM_WAIT = 5
+MEDIA_TRANSFORM_CACHE_DIR = os.environ.get(
+    "MEDIA_TRANSFORM_CACHE_DIR", "/tmp/media-transforms"
+)
+MEDIA_TRANSFORM_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# uploads from the browser straight to the media bucket, files up to
+# PART_SIZE are one presigned PUT and larger ones a multipart upload
+DIRECT_UPLOADS = {
+    "MAX_SIZE": 100 * 1024 * 1024,
+    "PART_SIZE": 16 * 1024 * 1024,
+    "EXPIRES_IN": 60 * 60,
+}
+
 ROOT_URLCONF = "webapp.urls"
 
 TEMPLATES = [
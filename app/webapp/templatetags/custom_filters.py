@@ -1,7 +1,7 @@
 from django import template
 from django.utils.safestring import mark_safe
 import re
-import markdown
+from webapp import markup
 
 register = template.Library()
 
@@ -34,8 +34,12 @@ def is_list(value):
 
 @register.filter
 def get_attr(sailboat, attr_name):
-    """Get attribute values from a sailboat's attributes"""
-    attr = sailboat.attribute_values.get(attribute__snake_case_name=attr_name)
+    """Get attribute values from a sailboat's attributes, by attribute name.
+    Uses the `card_attributes` loaded by `get_sailboat_cards` when present so
+    a page of cards doesn't run a query per cell"""
+    if (card_attributes := getattr(sailboat, "card_attributes", None)) is not None:
+        return card_attributes.get(attr_name)
+    attr = sailboat.attribute_values.filter(attribute__name=attr_name).first()
     return getattr(attr, "values", None)
 
 
@@ -75,46 +79,23 @@ def markdown_no_headings(value):
         return ""
     # Remove markdown headings (lines starting with one or more #)
     no_headings = re.sub(r"^#+[ ].*$", "", value, flags=re.MULTILINE)
-    html = markdown.markdown(no_headings)
-    return mark_safe(html)
+    return mark_safe(markup.render_markdown(no_headings))
 
 
 @register.filter(is_safe=True)
 def render_markdown(value):
-    """Render markdown content to HTML."""
-    if not value:
-        return ""
-    html = markdown.markdown(value)
-    return mark_safe(html)
-
-
-@register.filter
-def filter_by_type(queryset, attachment_type):
-    """Filter attachments by type."""
-    return queryset.filter(attachment_type=attachment_type)
-
-
-@register.filter
-def exclude_type(queryset, attachment_type):
-    """Exclude attachments by type."""
-    return queryset.exclude(attachment_type=attachment_type)
+    """Render markdown content to sanitized HTML. Log entries and note
+    messages keep theirs rendered, use `rendered_content` for those."""
+    return mark_safe(markup.render_markdown(value))
 
 
 @register.filter
 def can_crew_vessel(vessel, user):
     """Check if user can crew vessel (add log entries)."""
-    return user.has_perm("can_crew_vessel", vessel) or user.has_perm(
-        "can_manage_vessel", vessel
-    )
+    return user.is_authenticated and user.can_crew_vessel(vessel)
 
 
 @register.filter
 def can_edit_entry(entry, user):
     """Check if user can edit a log entry."""
     return entry.can_edit(user)
-
-
-@register.filter
-def order_by(queryset, field):
-    """Order a queryset by a given field."""
-    return queryset.order_by(field)
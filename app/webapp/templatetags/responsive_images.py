@@ -1,4 +1,5 @@
 from django import template
+from webapp.controllers.media_transforms import transform_url
 
 register = template.Library()
 
@@ -19,9 +20,15 @@ def responsive_image(image, alt_text="", css_classes="", lazy=True, sizes="100vw
         css_classes: CSS classes to apply to the image
         lazy: Whether to enable lazy loading (default: True)
         sizes: Sizes attribute for responsive images (default: "100vw")
+
+    Images with derivatives get a WebP `<source>` and a JPEG `srcset`, so the
+    browser picks the smallest file that fills `sizes`.
     """
+    derivatives = getattr(image, "derivatives", None) or {}
     return {
         "image": image,
+        "webp_srcset": image.srcset("webp") if "webp" in derivatives else "",
+        "jpeg_srcset": image.srcset("jpeg") if "jpeg" in derivatives else "",
         "alt_text": alt_text,
         "css_classes": css_classes,
         "lazy": lazy,
@@ -45,3 +52,14 @@ def detail_image(image, alt_text="", css_classes="", lazy=True):
 def thumbnail_image(image, alt_text="", css_classes="", lazy=True):
     """Responsive image for small thumbnails."""
     return responsive_image(image, alt_text, css_classes, lazy, THUMBNAIL_SIZES)
+
+
+@register.simple_tag
+def transformed_image_url(image, width, height, fit="cover", extension="webp"):
+    """the url of the image at a size no derivative has, such as a square
+    crop, rendered on first request (see `views.media.media_transform`)"""
+    if not image or getattr(image, "media_type", "image") != "image":
+        return ""
+    if image.is_processing:
+        return image.url
+    return transform_url(image, int(width), int(height), fit, extension)
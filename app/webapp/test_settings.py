@@ -61,6 +61,19 @@ STORAGES = {
     },
 }
 
+MEDIA_TRANSFORM_CACHE_DIR = tempfile.mkdtemp()
+
 # Override S3 settings for testing
 STATIC_URL = "/static/"
 MEDIA_URL = "/media/"
+
+# Per-process cache, no cache table in the test database
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Process uploaded images inline, the tests run inside a transaction that never
+# commits so on_commit work would never start
+MEDIA_PROCESSING_ASYNC = False
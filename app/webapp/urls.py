@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.urls import path, include
 from webapp.api import api
 from webapp.views.terms_of_service import terms_of_service
+from webapp.views.attributes import attribute_schema
+from webapp.views.media import media_transform
 from webapp.views.vessel_note import (
     vessel_note_create,
     vessel_note_message_add_form,
@@ -15,6 +17,7 @@ from webapp.views.logbook import (
     log_entry_create,
     log_entry_edit,
     log_entry_delete,
+    vessel_logbook,
 )
 from webapp.views.vessel_access import (
     vessel_access_request,
@@ -42,7 +45,6 @@ from app.webapp.views.views import (
     vessel_delete,
 )
 
-
 urlpatterns = [
     path("", home, name="home"),
     path("sailboats/", sailboats_index, name="sailboats_index"),
@@ -50,6 +52,12 @@ urlpatterns = [
     path("sailboats/<int:pk>/", sailboat_detail, name="sailboat_detail"),
     path("sailboats/<int:pk>/update/", sailboat_update, name="sailboat_update"),
     path("sailboats/<int:pk>/delete/", sailboat_delete, name="sailboat_delete"),
+    path("attributes/schema.json", attribute_schema, name="attribute_schema"),
+    path(
+        "media/t/<int:pk>/<int:width>x<int:height>/<slug:fit>.<slug:extension>",
+        media_transform,
+        name="media_transform",
+    ),
     path("vessels/", vessels_index, name="vessels_index"),
     path("vessels/create/", vessel_create, name="vessel_create"),
     path("vessels/<int:pk>/", vessel_detail, name="vessel_detail"),
@@ -135,6 +143,11 @@ urlpatterns = [
         name="vessel_toggle_privacy",
     ),
     # Logbook management
+    path(
+        "vessels/<int:pk>/logbook/",
+        vessel_logbook,
+        name="vessel_logbook",
+    ),
     path(
         "vessels/<int:pk>/logbook/create/",
         log_entry_create,
@@ -0,0 +1,17 @@
+from django.http import HttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+from webapp.controllers.attributes import get_attribute_schema
+
+
+def _attribute_schema_etag(request):  # pylint: disable=unused-argument
+    return get_attribute_schema().etag
+
+
+@require_GET
+@cache_control(public=True, max_age=60)
+@condition(etag_func=_attribute_schema_etag)
+def attribute_schema(request):  # pylint: disable=unused-argument
+    """every attribute with its section, for the attribute editor. Clients
+    revalidate with If-None-Match and get a 304 until the schema changes"""
+    return HttpResponse(get_attribute_schema().json, content_type="application/json")
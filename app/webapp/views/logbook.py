@@ -1,14 +1,21 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
+from django.utils.http import urlencode
 from django.contrib import messages
 from django import forms
 from django.views.decorators.http import require_http_methods
 from django.forms import inlineformset_factory
 from django.utils import timezone
 
-from webapp.models.vessel import Vessel
 from webapp.models.logbook import LogEntry, LogEntryLocation, LogEntryAttachment
 from webapp.models.media import Media
-from webapp.decorators import vessel_crew_or_skipper_required
+from webapp.controllers.uploads import get_uploaded_media
+from webapp.controllers.vessel_detail import load_logbook_page
+from webapp.decorators import (
+    vessel_crew_or_skipper_required,
+    vessel_viewer_required,
+    get_request_vessel,
+)
 
 
 class LogEntryForm(forms.ModelForm):
@@ -152,15 +159,9 @@ class LogEntryAttachmentForm(forms.ModelForm):
 
         if self.cleaned_data.get("file"):
             # Create Media object for the uploaded file
-            media = Media(
-                uploaded_by=self.instance.log_entry.author,
-                original_filename=self.cleaned_data["file"].name,
-            )
-            media.save()
-            media.file.save(
-                self.cleaned_data["file"].name, self.cleaned_data["file"], save=True
+            attachment.media = Media.from_upload(
+                self.cleaned_data["file"], user=self.instance.log_entry.author
             )
-            attachment.media = media
 
         if commit:
             attachment.save()
@@ -203,21 +204,22 @@ AttachmentFormSet = inlineformset_factory(
 )
 
 
+def _posted_attachment_media(request, index):
+    """the media for attachment `index`, uploaded with the form or straight
+    to storage beforehand and posted by id"""
+    if uploaded_file := request.FILES.get(f"attachments-{index}-file"):
+        return Media.from_upload(uploaded_file, user=request.user)
+    if media_id := request.POST.get(f"attachments-{index}-uploaded_media"):
+        return next(iter(get_uploaded_media(request.user, [media_id])), None)
+    return None
+
+
 def _process_attachment_uploads(request, attachments, log_entry):
     """Helper to process attachment file uploads"""
     for i, attachment in enumerate(attachments):
         attachment.log_entry = log_entry
 
-        file_field_name = f"attachments-{i}-file"
-        if file_field_name in request.FILES:
-            uploaded_file = request.FILES[file_field_name]
-
-            media = Media(
-                uploaded_by=request.user,
-                original_filename=uploaded_file.name,
-            )
-            media.save()
-            media.file.save(uploaded_file.name, uploaded_file, save=True)
+        if media := _posted_attachment_media(request, i):
             attachment.media = media
 
             if media.media_type == "image" and attachment.attachment_type == "other":
@@ -231,19 +233,10 @@ def _process_attachment_uploads_edit(request, attachments, log_entry):
     for i, attachment in enumerate(attachments):
         attachment.log_entry = log_entry
 
-        file_field_name = f"attachments-{i}-file"
-        if file_field_name in request.FILES:
-            uploaded_file = request.FILES[file_field_name]
-
-            if attachment.media:
+        if media := _posted_attachment_media(request, i):
+            if attachment.media_id:
                 attachment.media.delete()
 
-            media = Media(
-                uploaded_by=request.user,
-                original_filename=uploaded_file.name,
-            )
-            media.save()
-            media.file.save(uploaded_file.name, uploaded_file, save=True)
             attachment.media = media
 
             if media.media_type == "image" and attachment.attachment_type == "other":
@@ -265,7 +258,7 @@ def _handle_formset_deletions(location_formset, attachment_formset):
 
 @vessel_crew_or_skipper_required
 def log_entry_create(request, pk):
-    vessel = get_object_or_404(Vessel, pk=pk)
+    vessel = get_request_vessel(request, pk)
 
     if request.method == "POST":
         form = LogEntryForm(request.POST)
@@ -316,7 +309,7 @@ def log_entry_create(request, pk):
 
 @vessel_crew_or_skipper_required
 def log_entry_edit(request, pk, entry_pk):
-    vessel = get_object_or_404(Vessel, pk=pk)
+    vessel = get_request_vessel(request, pk)
     log_entry = get_object_or_404(LogEntry, pk=entry_pk, vessel=vessel)
 
     # Check if user can edit this entry
@@ -374,7 +367,7 @@ def log_entry_edit(request, pk, entry_pk):
 @vessel_crew_or_skipper_required
 @require_http_methods(["POST"])
 def log_entry_delete(request, pk, entry_pk):
-    vessel = get_object_or_404(Vessel, pk=pk)
+    vessel = get_request_vessel(request, pk)
     log_entry = get_object_or_404(LogEntry, pk=entry_pk, vessel=vessel)
 
     # Check if user can delete this entry
@@ -390,3 +383,23 @@ def log_entry_delete(request, pk, entry_pk):
     log_entry.delete()
     messages.success(request, "Log entry deleted successfully!")
     return redirect("vessel_detail", pk=vessel.pk)
+
+
+@vessel_viewer_required
+@require_http_methods(["GET"])
+def vessel_logbook(request, pk):
+    """a page of the logbook timeline as an htmx fragment, loaded when the
+    previous page is scrolled to the end"""
+    vessel = get_request_vessel(request, pk)
+    cursor = request.GET.get("cursor")
+
+    # Without htmx the link opens the vessel page at that point of the logbook
+    if not request.headers.get("HX-Request"):
+        url = reverse("vessel_detail", args=[vessel.pk])
+        return redirect(f"{url}?{urlencode({'cursor': cursor})}" if cursor else url)
+
+    context = {
+        "vessel": vessel,
+        "page_obj": load_logbook_page(vessel, request.user, cursor),
+    }
+    return render(request, "webapp/components/logbook_page.html", context)
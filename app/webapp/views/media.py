@@ -0,0 +1,36 @@
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+from webapp.controllers.media_transforms import (
+    TRANSFORM_FORMATS,
+    TransformBusy,
+    is_valid_transform,
+    open_transform,
+)
+from webapp.models.media import Media
+
+
+@require_GET
+def media_transform(request, pk, width, height, fit, extension):
+    """an image resized (and for `cover`, cropped) to a size no derivative
+    has. Only signed urls (see `transform_url`) are served, the rest are not
+    found. The result never changes, so it is cached for good"""
+    if not is_valid_transform(
+        pk, width, height, fit, extension, request.GET.get("s", "")
+    ):
+        raise Http404("No such image")
+    media = get_object_or_404(
+        Media.objects.only("file", "width", "height"),
+        pk=pk,
+        media_type="image",
+        status=Media.Status.READY,
+    )
+    try:
+        file = open_transform(media, width, height, fit, extension)
+    except TransformBusy:
+        response = HttpResponse("Busy, try again shortly", status=503)
+        response["Retry-After"] = "1"
+        return response
+    response = FileResponse(file, content_type=TRANSFORM_FORMATS[extension][1])
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
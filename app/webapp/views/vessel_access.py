@@ -6,12 +6,19 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.urls import reverse
 from django.views.decorators.http import require_http_methods
-from guardian.shortcuts import assign_perm, remove_perm, get_users_with_perms
 
 from webapp.models.vessel import Vessel
 from webapp.models.vessel_access_request import VesselAccessRequest
+from webapp.models.vessel_membership import VesselMembership
 from webapp.models.user import User
-from webapp.decorators import vessel_skipper_required
+from webapp.decorators import vessel_skipper_required, get_request_vessel
+from webapp.controllers.roles import (
+    ROLE_NAMES,
+    ROLE_PERMISSIONS,
+    VesselRole,
+    revoke_vessel_permission,
+    set_vessel_role,
+)
 
 
 class VesselAccessRequestForm(forms.ModelForm):
@@ -89,30 +96,28 @@ def vessel_access_request(request, pk):
 @vessel_skipper_required
 def vessel_manage_roles(request, pk):
     """Manage roles for a vessel - only skippers can access this"""
-    vessel = get_object_or_404(Vessel, pk=pk)
+    vessel = get_request_vessel(request, pk)
 
     # Get all access requests for this vessel
     pending_requests = VesselAccessRequest.objects.filter(
         vessel=vessel, status=VesselAccessRequest.Status.PENDING
     ).order_by("-created_at")
 
-    # Get current users with permissions
-    vessel_users = []
-
-    # Get all users who have any permission on this specific vessel
-    users_with_perms = get_users_with_perms(vessel, attach_perms=True)
-
-    for user, perms in users_with_perms.items():
-        permissions = []
-        if "can_manage_vessel" in perms:
-            permissions.append("Skipper")
-        if "can_crew_vessel" in perms:
-            permissions.append("Crew")
-        if "can_view_vessel" in perms:
-            permissions.append("Viewer")
-
-        if permissions:
-            vessel_users.append({"user": user, "permissions": permissions})
+    # Current members, highest role first, each listed with the roles theirs includes
+    memberships = vessel.memberships.select_related("user").order_by(
+        "-role", "user__username"
+    )
+    vessel_users = [
+        {
+            "user": membership.user,
+            "permissions": [
+                role.label
+                for role in reversed(VesselMembership.Role)
+                if role <= membership.role
+            ],
+        }
+        for membership in memberships
+    ]
 
     context = {
         "vessel": vessel,
@@ -127,7 +132,7 @@ def vessel_manage_roles(request, pk):
 @require_http_methods(["POST"])
 def vessel_access_approve(request, pk, request_id):
     """Approve an access request"""
-    vessel = get_object_or_404(Vessel, pk=pk)
+    vessel = get_request_vessel(request, pk)
     access_request = get_object_or_404(
         VesselAccessRequest, pk=request_id, vessel=vessel
     )
@@ -150,7 +155,7 @@ def vessel_access_approve(request, pk, request_id):
 @require_http_methods(["POST"])
 def vessel_access_deny(request, pk, request_id):
     """Deny an access request"""
-    vessel = get_object_or_404(Vessel, pk=pk)
+    vessel = get_request_vessel(request, pk)
     access_request = get_object_or_404(
         VesselAccessRequest, pk=request_id, vessel=vessel
     )
@@ -173,7 +178,7 @@ def vessel_access_deny(request, pk, request_id):
 @require_http_methods(["POST"])
 def vessel_remove_user(request, pk, user_id):
     """Remove a user's access to a vessel"""
-    vessel = get_object_or_404(Vessel, pk=pk)
+    vessel = get_request_vessel(request, pk)
     user = get_object_or_404(User, pk=user_id)
 
     # Don't allow removing the vessel creator
@@ -182,9 +187,7 @@ def vessel_remove_user(request, pk, user_id):
         return redirect("vessel_manage_roles", pk=vessel.pk)
 
     # Remove all permissions
-    remove_perm("webapp.can_manage_vessel", user, vessel)
-    remove_perm("webapp.can_crew_vessel", user, vessel)
-    remove_perm("webapp.can_view_vessel", user, vessel)
+    set_vessel_role(vessel, user, VesselRole.NONE)
 
     messages.success(
         request, f"Removed access for {user.get_full_name() or user.username}."
@@ -196,10 +199,10 @@ def vessel_remove_user(request, pk, user_id):
 @require_http_methods(["POST"])
 def vessel_add_user(request, pk):
     """Add a user to a vessel with specified permissions"""
-    vessel = get_object_or_404(Vessel, pk=pk)
+    vessel = get_request_vessel(request, pk)
 
     email = request.POST.get("email", "").strip().lower()
-    role = request.POST.get("role", "viewer")
+    role = ROLE_NAMES.get(request.POST.get("role", "viewer"))
 
     if not email:
         messages.error(request, "Please provide an email address.")
@@ -220,22 +223,12 @@ def vessel_add_user(request, pk):
         return redirect("vessel_manage_roles", pk=vessel.pk)
 
     # Assign permissions based on role
-    if role == "viewer":
-        assign_perm("webapp.can_view_vessel", user, vessel)
-        role_name = "Viewer"
-    elif role == "crew":
-        assign_perm("webapp.can_view_vessel", user, vessel)
-        assign_perm("webapp.can_crew_vessel", user, vessel)
-        role_name = "Crew"
-    elif role == "skipper":
-        assign_perm("webapp.can_view_vessel", user, vessel)
-        assign_perm("webapp.can_crew_vessel", user, vessel)
-        assign_perm("webapp.can_manage_vessel", user, vessel)
-        role_name = "Skipper"
-    else:
+    if role is None:
         messages.error(request, "Invalid role specified.")
         return redirect("vessel_manage_roles", pk=vessel.pk)
+    set_vessel_role(vessel, user, role)
 
+    role_name = VesselMembership.Role(role).label
     messages.success(
         request, f"Added {user.get_full_name() or user.username} as {role_name}."
     )
@@ -246,7 +239,7 @@ def vessel_add_user(request, pk):
 @require_http_methods(["POST"])
 def vessel_change_user_role(request, pk, user_id):
     """Change a user's role on a vessel"""
-    vessel = get_object_or_404(Vessel, pk=pk)
+    vessel = get_request_vessel(request, pk)
     user = get_object_or_404(User, pk=user_id)
 
     # Don't allow changing the vessel creator's permissions
@@ -254,30 +247,15 @@ def vessel_change_user_role(request, pk, user_id):
         messages.error(request, "Cannot change vessel creator's permissions.")
         return redirect("vessel_manage_roles", pk=vessel.pk)
 
-    new_role = request.POST.get("role")
-
-    # Remove all existing permissions first
-    remove_perm("webapp.can_manage_vessel", user, vessel)
-    remove_perm("webapp.can_crew_vessel", user, vessel)
-    remove_perm("webapp.can_view_vessel", user, vessel)
-
-    # Assign new permissions based on role
-    if new_role == "viewer":
-        assign_perm("webapp.can_view_vessel", user, vessel)
-        role_name = "Viewer"
-    elif new_role == "crew":
-        assign_perm("webapp.can_view_vessel", user, vessel)
-        assign_perm("webapp.can_crew_vessel", user, vessel)
-        role_name = "Crew"
-    elif new_role == "skipper":
-        assign_perm("webapp.can_view_vessel", user, vessel)
-        assign_perm("webapp.can_crew_vessel", user, vessel)
-        assign_perm("webapp.can_manage_vessel", user, vessel)
-        role_name = "Skipper"
-    else:
+    new_role = ROLE_NAMES.get(request.POST.get("role"))
+    if new_role is None:
         messages.error(request, "Invalid role specified.")
         return redirect("vessel_manage_roles", pk=vessel.pk)
 
+    # Replace the existing permissions with the new role's
+    set_vessel_role(vessel, user, new_role)
+    role_name = VesselMembership.Role(new_role).label
+
     messages.success(
         request,
         f"Changed {user.get_full_name() or user.username}'s role to {role_name}.",
@@ -289,7 +267,7 @@ def vessel_change_user_role(request, pk, user_id):
 @require_http_methods(["POST"])
 def vessel_revoke_permission(request, pk, user_id):
     """Revoke a specific permission from a user"""
-    vessel = get_object_or_404(Vessel, pk=pk)
+    vessel = get_request_vessel(request, pk)
     user = get_object_or_404(User, pk=user_id)
 
     # Don't allow revoking the vessel creator's permissions
@@ -299,23 +277,16 @@ def vessel_revoke_permission(request, pk, user_id):
 
     permission = request.POST.get("permission")
 
-    if permission == "can_manage_vessel":
-        remove_perm("webapp.can_manage_vessel", user, vessel)
-        messages.success(
-            request,
-            f"Revoked skipper permissions from {user.get_full_name() or user.username}.",
-        )
-    elif permission == "can_crew_vessel":
-        remove_perm("webapp.can_crew_vessel", user, vessel)
+    if permission in ROLE_PERMISSIONS:
+        revoke_vessel_permission(vessel, user, permission)
+        kind = {
+            "can_manage_vessel": "skipper",
+            "can_crew_vessel": "crew",
+            "can_view_vessel": "view",
+        }[permission]
         messages.success(
             request,
-            f"Revoked crew permissions from {user.get_full_name() or user.username}.",
-        )
-    elif permission == "can_view_vessel":
-        remove_perm("webapp.can_view_vessel", user, vessel)
-        messages.success(
-            request,
-            f"Revoked view permissions from {user.get_full_name() or user.username}.",
+            f"Revoked {kind} permissions from {user.get_full_name() or user.username}.",
         )
     else:
         messages.error(request, "Invalid permission specified.")
@@ -327,7 +298,7 @@ def vessel_revoke_permission(request, pk, user_id):
 @require_http_methods(["POST", "GET"])
 def vessel_confirm_delete(request, pk):
     """Confirm and delete a vessel with additional safety checks"""
-    vessel = get_object_or_404(Vessel, pk=pk)
+    vessel = get_request_vessel(request, pk)
 
     # Only vessel creator can delete (even other skippers cannot)
     if request.user != vessel.created_by:
@@ -357,7 +328,7 @@ def vessel_confirm_delete(request, pk):
     # GET request - show confirmation page
     context = {
         "vessel": vessel,
-        "user_count": len(get_users_with_perms(vessel)),
+        "user_count": vessel.memberships.count(),
         "notes_count": vessel.vesselnote_set.count(),
     }
     return render(request, "webapp/vessels/confirm_delete.html", context)
@@ -367,7 +338,7 @@ def vessel_confirm_delete(request, pk):
 @require_http_methods(["POST"])
 def vessel_toggle_privacy(request, pk):
     """Toggle vessel privacy (public/private)"""
-    vessel = get_object_or_404(Vessel, pk=pk)
+    vessel = get_request_vessel(request, pk)
 
     vessel.is_public = not vessel.is_public
     vessel.save()
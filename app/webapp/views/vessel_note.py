@@ -10,8 +10,7 @@ from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 
 from webapp.models.vessel_note import VesselNote, NoteMessage
-from webapp.models.vessel import Vessel
-from webapp.decorators import vessel_crew_or_skipper_required
+from webapp.decorators import vessel_crew_or_skipper_required, get_request_vessel
 
 
 class VesselNoteCreateForm(forms.Form):
@@ -23,7 +22,7 @@ class VesselNoteCreateForm(forms.Form):
 
 @vessel_crew_or_skipper_required
 def vessel_note_create(request, pk):
-    vessel = get_object_or_404(Vessel, pk=pk)
+    vessel = get_request_vessel(request, pk)
     if request.method == "POST":
         form = VesselNoteCreateForm(request.POST)
         if form.is_valid():
@@ -6,6 +6,9 @@ uv run python app/manage.py showmigrations && \
 uv run python app/manage.py migrate webapp && \
 uv run python app/manage.py showmigrations && \
 uv run python app/manage.py migrate && \
+uv run python app/manage.py createcachetable && \
+# images the previous container's workers never finished processing
+uv run python app/manage.py process_media && \
 uv run python app/manage.py showmigrations && \
 uv run python app/manage.py collectstatic --noinput && \
 uv run python app/manage.py runserver 0.0.0.0:8000
\ No newline at end of file
@@ -6,5 +6,8 @@ uv run python app/manage.py showmigrations && \
 uv run python app/manage.py migrate webapp && \
 uv run python app/manage.py showmigrations && \
 uv run python app/manage.py migrate && \
+uv run python app/manage.py createcachetable && \
+# images the previous container's workers never finished processing
+uv run python app/manage.py process_media && \
 uv run python app/manage.py showmigrations && \
 uv run gunicorn app.webapp.wsgi:application --bind 0.0.0.0:8000
\ No newline at end of file
@@ -1,14 +1,22 @@
 import { Crepe } from "@milkdown/crepe";
 import "@milkdown/crepe/theme/common/style.css";
 import "@milkdown/crepe/theme/frame.css";
+import { directUpload, enableDirectUploads } from "./uploads.js";
 
 // Get CSRF token for API calls
 function getCsrfToken() {
     return document.querySelector('[name=csrfmiddlewaretoken]').value;
 }
 
-// Upload handler for images
+// Upload handler for images, straight to storage when it can be
 async function uploadImage(file) {
+    try {
+        const media = await directUpload(file);
+        return media.url;
+    } catch (error) {
+        console.warn('Direct upload unavailable, uploading through the app:', error);
+    }
+
     const formData = new FormData();
     formData.append('file', file);
     
@@ -34,6 +42,8 @@ async function uploadImage(file) {
     }
 }
 
+enableDirectUploads();
+
 window.initMilkdownCrepe = async function(domId, defaultValue = "") {
     const crepe = new Crepe({
         root: document.getElementById(domId),
@@ -0,0 +1,96 @@
+// Direct uploads: files go from the browser straight to the bucket with
+// presigned urls from /api/uploads, so they don't tie up an app worker.
+// Forms opt in with `data-direct-upload="<field name>"` on a file input, the
+// stored media ids are posted in that field instead of the files.
+
+function getCsrfToken() {
+    const input = document.querySelector('[name=csrfmiddlewaretoken]');
+    return input ? input.value : '';
+}
+
+async function postJson(url, body) {
+    const response = await fetch(url, {
+        method: 'POST',
+        body: JSON.stringify(body),
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCsrfToken(),
+        },
+    });
+    const result = await response.json();
+    if (!response.ok) {
+        throw new Error(result.error || `Upload failed (${response.status})`);
+    }
+    return result;
+}
+
+async function put(url, body, headers = {}) {
+    const response = await fetch(url, { method: 'PUT', body, headers });
+    if (!response.ok) {
+        throw new Error(`Upload to storage failed (${response.status})`);
+    }
+    return response;
+}
+
+// uploads a File, resolves to the stored media `{id, url, media_type, status}`
+export async function directUpload(file) {
+    const session = await postJson('/api/uploads', {
+        filename: file.name,
+        content_type: file.type || 'application/octet-stream',
+        size: file.size,
+    });
+
+    const parts = [];
+    if (session.url) {
+        await put(session.url, file, session.headers);
+    } else {
+        for (const part of session.parts) {
+            const start = (part.part_number - 1) * session.part_size;
+            const response = await put(part.url, file.slice(start, start + session.part_size));
+            parts.push({ part_number: part.part_number, etag: response.headers.get('ETag') });
+        }
+    }
+    return postJson('/api/uploads/complete', { token: session.token, parts });
+}
+
+async function uploadFormFiles(form) {
+    const inputs = form.querySelectorAll('input[type=file][data-direct-upload]');
+    const added = [];
+    try {
+        for (const input of inputs) {
+            for (const file of input.files) {
+                const media = await directUpload(file);
+                const hidden = document.createElement('input');
+                hidden.type = 'hidden';
+                hidden.name = input.dataset.directUpload;
+                hidden.value = media.id;
+                form.appendChild(hidden);
+                added.push(hidden);
+            }
+        }
+        // the files are stored, don't post them again
+        inputs.forEach((input) => { input.disabled = true; });
+    } catch (error) {
+        // fall back to posting the files with the form
+        console.warn('Direct upload unavailable, posting files with the form:', error);
+        added.forEach((hidden) => hidden.remove());
+    }
+}
+
+export function enableDirectUploads() {
+    document.addEventListener('submit', async (event) => {
+        const form = event.target;
+        if (form.dataset.directUploadsDone || !form.querySelector('input[type=file][data-direct-upload]')) {
+            return;
+        }
+        const hasFiles = [...form.querySelectorAll('input[type=file][data-direct-upload]')]
+            .some((input) => input.files.length);
+        if (!hasFiles) {
+            return;
+        }
+        event.preventDefault();
+        await uploadFormFiles(form);
+        form.dataset.directUploadsDone = 'true';
+        form.submit();
+    });
+}
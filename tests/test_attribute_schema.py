@@ -0,0 +1,41 @@
+from pytest import mark as m
+from django.test import TestCase
+from webapp.models import Attribute, AttributeSection
+from webapp.controllers.attributes import get_attribute_schema
+
+
+@m.describe("Attribute schema registry")
+class TestAttributeSchema(TestCase):
+    def setUp(self):
+        self.section = AttributeSection.objects.create(name="hull", icon="sailing")
+        self.keel = Attribute.objects.create(
+            name="Keel", description="keel", input_type="options", section=self.section
+        )
+
+    @m.it("Should build the schema once and serve it from memory")
+    def test_cached(self):
+        schema = get_attribute_schema()
+        assert schema.by_name["keel"] == self.keel
+        assert schema.by_form_field["attr_keel"] == self.keel
+        with self.assertNumQueries(0):
+            assert get_attribute_schema() is schema
+
+    @m.it("Should rebuild after an attribute or section changes")
+    def test_invalidated(self):
+        schema = get_attribute_schema()
+        self.section.icon = "anchor"
+        self.section.save()
+        rebuilt = get_attribute_schema()
+        assert rebuilt is not schema
+        assert b'"section__icon":"anchor"' in rebuilt.json
+        assert rebuilt.etag != schema.etag
+
+    @m.it("Should serve the schema JSON with an ETag")
+    def test_endpoint(self):
+        response = self.client.get("/attributes/schema.json")
+        assert response.status_code == 200
+        assert response.json()[0]["name"] == "keel"
+        response = self.client.get(
+            "/attributes/schema.json", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        assert response.status_code == 304
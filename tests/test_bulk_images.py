@@ -0,0 +1,108 @@
+import threading
+import time
+from io import BytesIO
+from unittest import mock
+from pytest import mark as m
+from PIL import Image as PilImage
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from webapp.controllers.media import store_uploads
+from webapp.models import Make, Media, Sailboat, User, Vessel
+
+
+def photo(color, name="photo.jpg"):
+    buffer = BytesIO()
+    PilImage.new("RGB", (200, 150), color).save(buffer, "JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@m.describe("Bulk image attach")
+class TestBulkImages(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="skipper")
+        self.sailboat = Sailboat.objects.create(
+            name="30", make=Make.objects.create(name="catalina")
+        )
+        self.vessel = Vessel.objects.create(
+            sailboat=self.sailboat,
+            name="wind",
+            hull_identification_number="ABC1",
+            created_by=self.user,
+        )
+
+    @m.it("Should write the uploads to storage concurrently")
+    def test_concurrent(self):
+        save = FileSystemStorage._save
+        lock = threading.Lock()
+        running = []
+        most = []
+
+        def slow_save(storage, name, content):
+            with lock:
+                running.append(name)
+                most.append(len(running))
+            time.sleep(0.1)
+            with lock:
+                running.remove(name)
+            return save(storage, name, content)
+
+        with mock.patch.object(FileSystemStorage, "_save", slow_save):
+            media = store_uploads(
+                [photo((index * 40, 0, 0), f"{index}.jpg") for index in range(4)],
+                self.user,
+            )
+        assert max(most) > 1
+        assert [item.original_filename for item in media] == [
+            "0.jpg",
+            "1.jpg",
+            "2.jpg",
+            "3.jpg",
+        ]
+        for item in media:
+            item.refresh_from_db()
+            assert item.status == Media.Status.READY
+            assert item.uploaded_by == self.user
+            assert item.derivatives
+
+    @m.it("Should append images to a vessel in a constant number of queries")
+    def test_vessel(self):
+        self.vessel.add_image(photo((1, 2, 3)))
+        stored = Media.objects.get()
+        uploads = [photo((index, 0, 0), f"{index}.jpg") for index in range(5)]
+        before = self.vessel.updated_at
+
+        with mock.patch("webapp.controllers.media.schedule_processing"):
+            with self.assertNumQueries(7):
+                media = self.vessel.add_images([stored, *uploads], user=self.user)
+        assert media[0] == stored
+        assert list(
+            self.vessel.images.through.objects.filter(vessel=self.vessel).values_list(
+                "order", flat=True
+            )
+        ) == list(range(1, 8))
+        assert self.vessel.images_all == [stored, stored, *media[1:]]
+        self.vessel.refresh_from_db()
+        assert self.vessel.updated_at > before
+
+    @m.it("Should refuse a batch with an unaccepted file before storing any")
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.vessel.add_images(
+                [photo((1, 1, 1)), SimpleUploadedFile("virus.exe", b"MZ")]
+            )
+        assert not Media.objects.exists()
+
+    @m.it("Should append sailboat images after the existing ones")
+    def test_sailboat(self):
+        self.sailboat.add_images([photo((5, 5, 5))])
+        self.sailboat.add_images([photo((6, 6, 6)), photo((5, 5, 5))])
+        orders = list(
+            self.sailboat.images.through.objects.filter(
+                sailboat=self.sailboat
+            ).values_list("order", "image__sha256")
+        )
+        assert [order for order, _ in orders] == [1, 2, 3]
+        # the repeat of a processed photo shares its file
+        assert orders[0][1] == orders[2][1]
+        assert self.sailboat.images.count() == 3
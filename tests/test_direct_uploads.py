@@ -0,0 +1,117 @@
+import json
+from io import BytesIO
+from pytest import mark as m
+from PIL import Image as PilImage
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase
+from webapp.controllers.uploads import get_uploaded_media, upload_token
+from webapp.models import Make, Media, Sailboat, User, Vessel
+from webapp.models.vessel import VesselImage
+
+
+def photo_bytes():
+    buffer = BytesIO()
+    PilImage.new("RGB", (400, 300), (0, 120, 200)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@m.describe("Direct uploads to storage")
+class TestDirectUploads(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="crew")
+        self.client.force_login(self.user)
+
+    def post(self, url, body):
+        return self.client.post(url, json.dumps(body), content_type="application/json")
+
+    def uploaded(self, data, filename="photo.jpg"):
+        """what the browser leaves in the bucket before completing"""
+        name = Media.new_file_name(filename)
+        default_storage.save(name, ContentFile(data))
+        return upload_token(self.user, name, filename, len(data))
+
+    @m.it("Should refuse to presign without S3 storage and for anonymous users")
+    def test_start(self):
+        body = {"filename": "photo.jpg", "content_type": "image/jpeg", "size": 10}
+        response = self.post("/api/uploads", body)
+        assert response.status_code == 400
+        assert "S3" in response.json()["error"]
+
+        self.client.logout()
+        assert self.post("/api/uploads", body).status_code == 401
+
+    @m.it("Should reject file types and sizes the forms wouldn't take")
+    def test_start_validation(self):
+        response = self.post(
+            "/api/uploads", {"filename": "run.exe", "content_type": "", "size": 10}
+        )
+        assert response.json() == {"error": "Invalid file type"}
+        response = self.post(
+            "/api/uploads", {"filename": "a.jpg", "size": 200 * 1024 * 1024}
+        )
+        assert "at most" in response.json()["error"]
+        response = self.post(
+            "/api/uploads",
+            {"filename": "a.jpg", "content_type": "text/html", "size": 10},
+        )
+        assert response.json() == {"error": "a.jpg should be sent as image/jpeg"}
+
+    @m.it("Should create and process the media once the upload completes")
+    def test_complete(self):
+        token = self.uploaded(photo_bytes())
+        response = self.post("/api/uploads/complete", {"token": token})
+        assert response.status_code == 200
+        media = Media.objects.get(pk=response.json()["id"])
+        assert media.status == Media.Status.READY
+        assert media.original_filename == "photo.jpg"
+        assert media.uploaded_by == self.user
+        assert len(media.sha256) == 64
+        assert "400" in media.derivatives["webp"]
+
+        again = self.post("/api/uploads/complete", {"token": token})
+        assert again.json()["id"] == media.pk
+
+    @m.it("Should refuse other users' tokens and files that don't match")
+    def test_complete_validation(self):
+        token = self.uploaded(photo_bytes())
+        self.client.force_login(User.objects.create(username="stowaway"))
+        assert self.post("/api/uploads/complete", {"token": token}).status_code == 400
+
+        self.client.force_login(self.user)
+        name = Media.new_file_name("photo.jpg")
+        default_storage.save(name, ContentFile(b"short"))
+        token = upload_token(self.user, name, "photo.jpg", 1000)
+        response = self.post("/api/uploads/complete", {"token": token})
+        assert response.json() == {"error": "The uploaded file doesn't match its size"}
+        assert not default_storage.exists(name)
+        assert not Media.objects.exists()
+
+    @m.it("Should only let forms attach the user's own uploads")
+    def test_get_uploaded_media(self):
+        token = self.uploaded(photo_bytes())
+        mine = self.post("/api/uploads/complete", {"token": token}).json()["id"]
+        theirs = Media.objects.create(
+            file=ContentFile(photo_bytes(), name="theirs.jpg"),
+            uploaded_by=User.objects.create(username="stowaway"),
+        )
+        assert get_uploaded_media(self.user, [str(theirs.pk), "x", str(mine)]) == [
+            Media.objects.get(pk=mine)
+        ]
+
+    @m.it("Should ignore uploads something already uses")
+    def test_get_uploaded_media_attached(self):
+        token = self.uploaded(photo_bytes())
+        media = Media.objects.get(
+            pk=self.post("/api/uploads/complete", {"token": token}).json()["id"]
+        )
+        vessel = Vessel.objects.create(
+            sailboat=Sailboat.objects.create(
+                name="30", make=Make.objects.create(name="catalina")
+            ),
+            name="vessel",
+            hull_identification_number="HIN1",
+            created_by=self.user,
+        )
+        VesselImage.objects.create(vessel=vessel, image=media, order=1)
+        assert get_uploaded_media(self.user, [str(media.pk)]) == []
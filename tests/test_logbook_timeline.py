@@ -0,0 +1,97 @@
+import re
+from datetime import datetime, timedelta, timezone
+from pytest import mark as m
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from webapp.models import (
+    LogEntry,
+    LogEntryAttachment,
+    LogEntryLocation,
+    Make,
+    Media,
+    Sailboat,
+    User,
+    Vessel,
+)
+
+HTMX = {"HTTP_HX_REQUEST": "true"}
+
+
+@override_settings(VESSEL_LOGBOOK_PAGE_SIZE=3)
+@m.describe("Logbook timeline")
+class TestLogbookTimeline(TestCase):
+    def setUp(self):
+        self.skipper = User.objects.create(username="skipper")
+        self.vessel = Vessel.objects.create(
+            sailboat=Sailboat.objects.create(
+                name="30", make=Make.objects.create(name="catalina")
+            ),
+            name="private",
+            hull_identification_number="HIN1",
+            created_by=self.skipper,
+            is_public=False,
+        )
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for number in range(8):
+            entry = LogEntry.objects.create(
+                vessel=self.vessel,
+                author=self.skipper,
+                title=f"day {number}",
+                log_timestamp=start + timedelta(days=number),
+            )
+            for order in range(2):
+                LogEntryLocation.objects.create(
+                    log_entry=entry, latitude="41.5", longitude="-71.3", order=order
+                )
+            LogEntryAttachment.objects.create(
+                log_entry=entry,
+                media=Media.objects.create(
+                    file=f"uploads/{number}.jpg", media_type="image"
+                ),
+                attachment_type="image",
+            )
+        self.client.force_login(self.skipper)
+
+    def next_url(self, html):
+        match = re.search(r'hx-get="([^"]+)"', html)
+        return match and match[1].replace("&amp;", "&")
+
+    def titles(self, html):
+        return re.findall(r">(day \d)</h3>", html)
+
+    @m.it("Should render the first page with the vessel and scroll in the rest")
+    def test_scroll(self):
+        html = self.client.get(f"/vessels/{self.vessel.pk}/").content.decode()
+        titles = self.titles(html)
+        assert titles == ["day 7", "day 6", "day 5"]
+        assert "(8 entries)" in html
+
+        url = self.next_url(html)
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, **HTMX)
+            # session, user, vessel, role and the three logbook queries
+            assert len(queries) == 7
+            html = response.content.decode()
+            assert "<html" not in html
+            titles += self.titles(html)
+            url = self.next_url(html)
+        assert titles == [f"day {number}" for number in reversed(range(8))]
+
+    @m.it("Should send browsers without htmx to the vessel page")
+    def test_without_htmx(self):
+        html = self.client.get(f"/vessels/{self.vessel.pk}/").content.decode()
+        url = self.next_url(html)
+        response = self.client.get(url)
+        assert response.status_code == 302
+        assert response["Location"].startswith(f"/vessels/{self.vessel.pk}/?cursor=")
+        html = self.client.get(response["Location"]).content.decode()
+        assert self.titles(html) == ["day 4", "day 3", "day 2"]
+        assert "Newer entries" in html
+
+    @m.it("Should keep the logbook of private vessels private")
+    def test_private(self):
+        self.client.force_login(User.objects.create(username="stranger"))
+        response = self.client.get(f"/vessels/{self.vessel.pk}/logbook/", **HTMX)
+        assert response.status_code == 302
@@ -0,0 +1,121 @@
+from datetime import datetime, timezone
+from io import StringIO
+from pytest import mark as m
+from django.core.management import call_command
+from django.test import TestCase
+from webapp.markup import MARKDOWN_RENDERER_VERSION, render_markdown
+from webapp.models import LogEntry, Make, Sailboat, User, Vessel, VesselNote
+from webapp.models.vessel_note import NoteMessage
+
+
+@m.describe("Rendered markdown")
+class TestMarkdownCache(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="skipper")
+        self.vessel = Vessel.objects.create(
+            sailboat=Sailboat.objects.create(
+                name="30", make=Make.objects.create(name="catalina")
+            ),
+            name="vessel",
+            hull_identification_number="HIN1",
+            created_by=self.user,
+        )
+        self.note = VesselNote.objects.create(vessel=self.vessel, user=self.user)
+
+    def create_entry(self, content):
+        return LogEntry.objects.create(
+            vessel=self.vessel,
+            author=self.user,
+            content=content,
+            log_timestamp=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        )
+
+    @m.it("Should escape html and drop unsafe links")
+    def test_sanitized(self):
+        html = render_markdown(
+            '<script>alert(1)</script> <img src=x onerror="alert(1)"> '
+            "[safe](https://example.org) [bad](javascript:alert(1)) "
+            "[sneaky](java\tscript:alert(1))"
+        )
+        assert "<script" not in html and "<img" not in html
+        assert "&lt;script&gt;" in html
+        assert '<a href="https://example.org">safe</a>' in html
+        assert "<a>bad</a>" in html and "<a>sneaky</a>" in html
+
+    @m.it("Should drop unsafe links hidden behind html entities")
+    def test_entities(self):
+        for url in (
+            "&#106;avascript:alert(1)",
+            "&#x6A;avascript:alert(1)",
+            "javascript&colon;alert(1)",
+            "&amp;#106;avascript:alert(1)",
+            "&#x09;javascript:alert(1)",
+        ):
+            assert render_markdown(f"[x]({url})") == "<p><a>x</a></p>", url
+        assert (
+            render_markdown("[x](https://example.org/?a=1&amp;b=2)")
+            == '<p><a href="https://example.org/?a=1&amp;b=2">x</a></p>'
+        )
+
+    @m.it("Should render messages the way they are written")
+    def test_messages(self):
+        message = NoteMessage.objects.create(
+            vessel_note=self.note, user=self.user, content="# not a heading\nnext"
+        )
+        assert message.content_html == "<p># not a heading<br />\nnext</p>"
+
+    @m.it("Should store the html and render it again only when the content changes")
+    def test_stored(self):
+        entry = self.create_entry("Sailed *far*")
+        assert entry.content_html == "<p>Sailed <em>far</em></p>"
+        assert entry.content_html_version == MARKDOWN_RENDERER_VERSION
+
+        LogEntry.objects.filter(pk=entry.pk).update(content_html="kept")
+        entry = LogEntry.objects.get(pk=entry.pk)
+        entry.title = "day one"
+        entry.save()
+        assert entry.rendered_content == "kept"
+
+        entry.content = "Sailed **further**"
+        entry.save(update_fields=["content"])
+        entry = LogEntry.objects.get(pk=entry.pk)
+        assert entry.rendered_content == "<p>Sailed <strong>further</strong></p>"
+
+    @m.it("Should render out of date rows in bulk, in worker processes")
+    def test_command(self):
+        entries = [self.create_entry(f"entry *{number}*") for number in range(5)]
+        message = NoteMessage.objects.create(
+            vessel_note=self.note, user=self.user, content="hello\nthere"
+        )
+        LogEntry.objects.update(content_html="", content_html_version=0)
+        NoteMessage.objects.update(content_html="", content_html_version=0)
+
+        # out of date rows render on the fly until the command catches up
+        stale = LogEntry.objects.get(pk=entries[0].pk)
+        assert stale.rendered_content == "<p>entry <em>0</em></p>"
+
+        out = StringIO()
+        call_command("render_markdown", workers=2, batch_size=2, stdout=out)
+        assert "Rendered 5 log entries" in out.getvalue()
+        assert "Rendered 1 note messages" in out.getvalue()
+        assert list(
+            LogEntry.objects.order_by("pk").values_list("content_html", flat=True)
+        ) == [f"<p>entry <em>{number}</em></p>" for number in range(5)]
+        message.refresh_from_db()
+        assert message.content_html == "<p>hello<br />\nthere</p>"
+
+        out = StringIO()
+        call_command("render_markdown", workers=1, stdout=out)
+        assert "Rendered 0 log entries" in out.getvalue()
+
+    @m.it("Should show note messages rendered on the vessel page")
+    def test_page(self):
+        NoteMessage.objects.create(
+            vessel_note=self.note, user=self.user, content="fair *winds*"
+        )
+        self.client.force_login(self.user)
+        html = self.client.get(f"/vessels/{self.vessel.pk}/").content.decode()
+        assert '<span class="rendered-markdown"><p>fair <em>winds</em></p></span>' in (
+            html
+        )
+        assert "marked.min.js" not in html
@@ -0,0 +1,51 @@
+from io import BytesIO
+from pytest import mark as m
+from PIL import Image as PilImage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from webapp.models import Media
+
+
+def photo_bytes(color):
+    buffer = BytesIO()
+    PilImage.new("RGB", (400, 300), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@m.describe("Media deduplication")
+class TestMediaDedupe(TestCase):
+    def upload(self, data, name="photo.jpg"):
+        return Media.from_upload(SimpleUploadedFile(name, data, "image/jpeg"))
+
+    @m.it("Should reuse the stored files of an identical processed upload")
+    def test_reuse(self):
+        data = photo_bytes((10, 20, 30))
+        first = self.upload(data)
+        stored = first.file.storage.listdir("")[1]
+
+        with self.assertNumQueries(2):
+            second = self.upload(data, name="IMG_0001.JPG")
+        assert second.pk != first.pk
+        assert second.sha256 == first.sha256
+        assert second.file.name == first.file.name
+        assert second.derivatives == first.derivatives
+        assert second.status == Media.Status.READY
+        assert second.original_filename == "IMG_0001.JPG"
+        assert first.file.storage.listdir("")[1] == stored
+
+    @m.it("Should store different files separately")
+    def test_different(self):
+        first = self.upload(photo_bytes((10, 20, 30)))
+        second = self.upload(photo_bytes((200, 20, 30)))
+        assert second.file.name != first.file.name
+        assert second.sha256 != first.sha256
+
+    @override_settings(MEDIA_PROCESSING_ASYNC=True)
+    @m.it("Should not reuse uploads that are still being processed")
+    def test_pending(self):
+        data = photo_bytes((10, 20, 30))
+        with self.captureOnCommitCallbacks():
+            first = self.upload(data)
+            second = self.upload(data)
+        assert second.file.name != first.file.name
+        assert second.status == Media.Status.PENDING
@@ -0,0 +1,66 @@
+from io import BytesIO, StringIO
+from pytest import mark as m
+from PIL import Image as PilImage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase
+from webapp.models import Media
+
+
+def image_upload(width, height, name="photo.jpg", image_format="JPEG"):
+    buffer = BytesIO()
+    PilImage.new("RGB", (width, height), (20, 80, 160)).save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@m.describe("Image derivatives")
+class TestMediaDerivatives(TestCase):
+    def render(self, media):
+        return Template("{% load responsive_images %}{% card_image image %}").render(
+            Context({"image": media})
+        )
+
+    @m.it("Should store a WebP and JPEG ladder up to the image width")
+    def test_ladder(self):
+        media = Media.objects.create(file=image_upload(800, 600))
+        assert set(media.derivatives) == {"webp", "jpeg"}
+        assert list(media.derivatives["webp"]) == ["800", "640", "320", "160"]
+        with media.file.storage.open(media.derivatives["webp"]["320"]) as file:
+            resized = PilImage.open(file)
+            assert resized.format == "WEBP"
+            assert resized.size == (320, 240)
+
+    @m.it("Should flatten transparent images for the JPEG fallback")
+    def test_png(self):
+        buffer = BytesIO()
+        PilImage.new("RGBA", (200, 100), (0, 0, 0, 0)).save(buffer, "PNG")
+        media = Media.objects.create(
+            file=SimpleUploadedFile("logo.png", buffer.getvalue(), "image/png")
+        )
+        with media.file.storage.open(media.derivatives["jpeg"]["200"]) as file:
+            assert PilImage.open(file).getpixel((0, 0)) == (255, 255, 255)
+
+    @m.it("Should render a WebP source and JPEG srcset")
+    def test_srcset(self):
+        media = Media.objects.create(file=image_upload(800, 600))
+        rendered = self.render(media)
+        assert '<source type="image/webp"' in rendered
+        assert f"{media.public_url(media.derivatives['webp']['160'])} 160w" in rendered
+        assert f"{media.public_url(media.derivatives['jpeg']['800'])} 800w" in rendered
+
+    @m.it("Should keep the plain image for files it can't decode")
+    def test_unreadable(self):
+        media = Media.objects.create(
+            file=SimpleUploadedFile("broken.jpg", b"not an image", "image/jpeg")
+        )
+        assert media.derivatives == {}
+        assert "<picture" not in self.render(media)
+
+    @m.it("Should backfill missing derivatives")
+    def test_command(self):
+        media = Media.objects.create(file=image_upload(300, 300))
+        Media.objects.filter(pk=media.pk).update(derivatives={})
+        call_command("process_media", stdout=StringIO())
+        media.refresh_from_db()
+        assert list(media.derivatives["jpeg"]) == ["300", "160"]
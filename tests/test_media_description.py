@@ -0,0 +1,83 @@
+from io import BytesIO, StringIO
+from pytest import mark as m
+from PIL import Image as PilImage
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from webapp import imaging
+from webapp.models import Media
+
+
+def image_bytes(width, height, color=(20, 60, 160), orientation=None):
+    image = PilImage.new("RGB", (width, height), color)
+    # a white stripe, so the dominant color has to outvote something
+    image.paste((255, 255, 255), (0, 0, width // 4, height))
+    exif = image.getexif()
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+@m.describe("Image description")
+class TestMediaDescription(TestCase):
+    @m.it("Should store the size, dominant color and a tiny placeholder")
+    def test_described(self):
+        media = Media.from_upload(SimpleUploadedFile("boat.jpg", image_bytes(800, 600)))
+        assert (media.width, media.height) == (800, 600)
+        red, green, blue = (int(media.dominant_color[i : i + 2], 16) for i in (1, 3, 5))
+        assert blue > 120 and red < 60
+        assert media.placeholder.startswith("data:image/webp;base64,")
+        assert len(media.placeholder) <= imaging.PLACEHOLDER_MAX_BYTES
+
+        rendered = Template(
+            "{% load responsive_images %}{% card_image image alt_text='boat' %}"
+        ).render(Context({"image": media}))
+        assert 'width="800"' in rendered and 'height="600"' in rendered
+        assert media.dominant_color in rendered
+        assert media.placeholder in rendered
+
+    @override_settings(MEDIA_IMAGE_MAX_SIZE=500)
+    @m.it("Should record the upright size of the stored image")
+    def test_resized_and_rotated(self):
+        # stored 1000x800 but shown a quarter turn
+        media = Media.from_upload(
+            SimpleUploadedFile("boat.jpg", image_bytes(1000, 800, orientation=6))
+        )
+        assert (media.width, media.height) == (400, 500)
+
+        small = Media.from_upload(
+            SimpleUploadedFile("small.jpg", image_bytes(300, 200, orientation=8))
+        )
+        assert (small.width, small.height) == (200, 300)
+
+    @m.it("Should copy the description to repeat uploads")
+    def test_dedupe(self):
+        data = image_bytes(400, 300)
+        first = Media.from_upload(SimpleUploadedFile("a.jpg", data))
+        second = Media.from_upload(SimpleUploadedFile("b.jpg", data))
+        assert (second.width, second.placeholder) == (first.width, first.placeholder)
+
+    @m.it("Should backfill images processed before they were described")
+    def test_backfill(self):
+        old = Media.objects.create(
+            file=ContentFile(image_bytes(640, 480), name="old.jpg")
+        )
+        Media.objects.filter(pk=old.pk).update(
+            width=None, height=None, dominant_color="", placeholder=""
+        )
+        shared = Media.objects.create(file=Media.objects.get(pk=old.pk).file.name)
+        document = Media.from_upload(SimpleUploadedFile("notes.txt", b"notes"))
+
+        out = StringIO()
+        call_command("describe_media", stdout=out)
+        assert "Described 2 images" in out.getvalue()
+        for media in (old, shared):
+            media.refresh_from_db()
+            assert (media.width, media.height) == (640, 480)
+            assert media.placeholder
+        document.refresh_from_db()
+        assert document.width is None
@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO, StringIO
+from pytest import mark as m
+from PIL import Image as PilImage
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from webapp.controllers.media_gc import collect_media_garbage, live_media_names
+from webapp.models import Media
+
+
+def photo(color):
+    buffer = BytesIO()
+    PilImage.new("RGB", (400, 300), color).save(buffer, "JPEG")
+    return SimpleUploadedFile("photo.jpg", buffer.getvalue(), "image/jpeg")
+
+
+def derivative_names(media):
+    return {
+        name for by_width in media.derivatives.values() for name in by_width.values()
+    }
+
+
+@m.describe("Media garbage collection")
+class TestMediaGarbageCollection(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        storages = override_settings(
+            STORAGES={
+                "default": {
+                    "BACKEND": "django.core.files.storage.FileSystemStorage",
+                    "OPTIONS": {"location": self.location},
+                },
+                "staticfiles": {
+                    "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+                },
+            }
+        )
+        storages.enable()
+        self.addCleanup(storages.disable)
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        cache.clear()
+
+        self.kept = Media.from_upload(photo((10, 10, 10)))
+        deleted = Media.from_upload(photo((200, 10, 10)))
+        self.deleted_names = {deleted.file.name} | derivative_names(deleted)
+        deleted.delete()
+        self.stray = default_storage.save("image-stray.jpg", ContentFile(b"x"))
+        self.age(*self.deleted_names, self.stray, *live_media_names())
+        # an upload in progress, not recorded yet
+        self.recent = default_storage.save("image-recent.jpg", ContentFile(b"x"))
+
+    def age(self, *names):
+        day_ago = time.time() - 2 * 24 * 60 * 60
+        for name in names:
+            os.utime(default_storage.path(name), (day_ago, day_ago))
+
+    def stored(self):
+        return set(default_storage.listdir("")[1])
+
+    @m.it("Should delete only old files no media refers to")
+    def test_collect(self):
+        live = live_media_names()
+        assert self.kept.file.name in live
+        assert len(live) == 1 + len(derivative_names(self.kept))
+
+        dry = collect_media_garbage(dry_run=True)
+        assert dry.orphaned == len(self.deleted_names) + 1
+        assert dry.deleted == 0
+        assert self.deleted_names <= self.stored()
+
+        result = collect_media_garbage(batch_size=3)
+        assert result.complete
+        assert result.deleted == len(self.deleted_names) + 1
+        assert self.stored() == live | {self.recent}
+
+    @m.it("Should keep a file a new row refers to")
+    def test_recheck(self):
+        Media.objects.create(file=self.stray)
+        collect_media_garbage()
+        assert self.stray in self.stored()
+
+    @m.it("Should stop at the limit and resume from the checkpoint")
+    def test_resume(self):
+        out = StringIO()
+        call_command("collect_media_garbage", max_deletes=2, stdout=out)
+        assert "deleted 2 of 2 orphaned" in out.getvalue()
+        assert "--resume" in out.getvalue()
+        checkpoint = cache.get("media_gc:checkpoint")
+        assert checkpoint
+
+        out = StringIO()
+        call_command("collect_media_garbage", resume=True, stdout=out)
+        assert f"Resuming after {checkpoint}" in out.getvalue()
+        assert self.stored() == live_media_names() | {self.recent}
+        assert cache.get("media_gc:checkpoint") is None
+
+    @m.it("Should only count the orphans in a dry run")
+    def test_dry_run_command(self):
+        out = StringIO()
+        call_command("collect_media_garbage", dry_run=True, stdout=out)
+        assert f"{len(self.deleted_names) + 1} orphaned" in out.getvalue()
+        assert self.stray in self.stored()
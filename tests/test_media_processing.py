@@ -0,0 +1,109 @@
+from datetime import timedelta
+from io import BytesIO
+from pytest import mark as m
+from PIL import Image as PilImage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from webapp import imaging
+from webapp.controllers.media import process_media, requeue_stale_media
+from webapp.models import Media, User
+
+
+def image_upload(width, height, name="photo.jpg"):
+    buffer = BytesIO()
+    PilImage.new("RGB", (width, height), (200, 40, 40)).save(buffer, "JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@m.describe("Background media processing")
+class TestMediaProcessing(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="crew")
+
+    @override_settings(MEDIA_PROCESSING_ASYNC=True)
+    @m.it("Should store the upload and process it after the commit")
+    def test_async(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            media = Media.from_upload(image_upload(400, 300), user=self.user)
+        assert len(callbacks) == 1
+        assert media.status == Media.Status.PENDING
+        assert media.original_filename == "photo.jpg"
+        assert media.uploaded_by == self.user
+        rendered = Template(
+            "{% load responsive_images %}{% card_image image alt_text='boat' %}"
+        ).render(Context({"image": media}))
+        assert 'aria-busy="true"' in rendered
+        assert "<img" not in rendered
+
+        assert process_media(media.pk)
+        # already claimed, so scheduling it twice processes it once
+        assert not process_media(media.pk)
+        media.refresh_from_db()
+        assert media.status == Media.Status.READY
+        assert "400" in media.derivatives["webp"]
+
+    @override_settings(MEDIA_PROCESSING_ASYNC=True)
+    @m.it("Should queue images a dropped queue left behind again")
+    def test_requeue_stale(self):
+        with self.captureOnCommitCallbacks():
+            pending, dropped, in_flight, recent = (
+                Media.from_upload(image_upload(40, 30)) for _ in range(4)
+            )
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Media.objects.exclude(pk=recent.pk).update(created_at=hour_ago)
+        # claimed an hour ago and never finished, and claimed just now after
+        # waiting in the queue for an hour
+        Media.objects.filter(pk=dropped.pk).update(
+            status=Media.Status.PROCESSING, processing_started_at=hour_ago
+        )
+        Media.objects.filter(pk=in_flight.pk).update(
+            status=Media.Status.PROCESSING, processing_started_at=timezone.now()
+        )
+
+        assert requeue_stale_media() == [pending.pk, dropped.pk]
+        dropped.refresh_from_db()
+        assert dropped.status == Media.Status.PENDING
+        in_flight.refresh_from_db()
+        assert in_flight.status == Media.Status.PROCESSING
+        assert process_media(dropped.pk)
+        dropped.refresh_from_db()
+        assert dropped.processing_started_at > hour_ago
+
+    @override_settings(MEDIA_IMAGE_MAX_SIZE=500)
+    @m.it("Should shrink the stored original to the maximum size")
+    def test_max_size(self):
+        media = Media.from_upload(image_upload(1000, 800))
+        with media.file.open("rb") as file:
+            assert PilImage.open(file).size == (500, 400)
+        assert list(media.derivatives["jpeg"]) == ["500", "320", "160"]
+
+    @m.it("Should mark unreadable images failed and store other files as is")
+    def test_failed_and_documents(self):
+        broken = Media.from_upload(SimpleUploadedFile("broken.png", b"nope"))
+        assert broken.status == Media.Status.FAILED
+
+        manual = Media.from_upload(SimpleUploadedFile("Manual.PDF", b"%PDF-1.4"))
+        assert manual.media_type == "document"
+        assert manual.status == Media.Status.READY
+        assert manual.original_filename == "Manual.PDF"
+
+        with self.assertRaises(ValueError):
+            Media.from_upload(SimpleUploadedFile("script.exe", b"MZ"))
+
+    @m.it("Should decode large JPEGs at reduced resolution")
+    def test_reduced_decode(self):
+        upload = image_upload(4000, 3000)
+        decoded = imaging.decode(upload, max_size=500)
+        assert decoded.source_size == (4000, 3000)
+        assert decoded.image.size == (500, 375)
+
+    @m.it("Should refuse images it would have to decode past the pixel limit")
+    def test_pixel_limit(self):
+        buffer = BytesIO()
+        PilImage.new("RGB", (300, 300)).save(buffer, "PNG")
+        with self.assertRaises(PilImage.DecompressionBombError):
+            imaging.decode(buffer, max_size=100, max_pixels=200 * 200)
+        buffer.seek(0)
+        assert imaging.decode(buffer, max_size=100).image.size == (100, 100)
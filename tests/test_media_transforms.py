@@ -0,0 +1,145 @@
+import os
+import tempfile
+from io import BytesIO
+from unittest import mock
+from pytest import mark as m
+from PIL import Image as PilImage
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from webapp import imaging
+from webapp.controllers import media_transforms
+from webapp.controllers.media_gc import is_live
+from webapp.controllers.media_transforms import (
+    DiskLru,
+    transform_storage_name,
+    transform_url,
+)
+from webapp.models import Media
+
+
+def photo(width=800, height=400):
+    buffer = BytesIO()
+    PilImage.new("RGB", (width, height), (30, 90, 150)).save(buffer, "JPEG")
+    return SimpleUploadedFile("photo.jpg", buffer.getvalue(), "image/jpeg")
+
+
+@override_settings(MEDIA_TRANSFORM_CACHE_DIR=tempfile.mkdtemp())
+@m.describe("Image transforms")
+class TestMediaTransforms(TestCase):
+    def setUp(self):
+        self.media = Media.from_upload(photo())
+
+    def get(self, url):
+        response = self.client.get(url)
+        if response.status_code == 200:
+            response.data = b"".join(response.streaming_content)
+        return response
+
+    @m.it("Should crop to the size on first request and cache it for good")
+    def test_transform(self):
+        url = transform_url(self.media, 100, 100)
+        assert url.startswith(f"/media/t/{self.media.pk}/100x100/cover.webp?s=")
+
+        response = self.get(url)
+        assert response.status_code == 200
+        assert response["Content-Type"] == "image/webp"
+        assert "immutable" in response["Cache-Control"]
+        assert PilImage.open(BytesIO(response.data)).size == (100, 100)
+        name = transform_storage_name(self.media, 100, 100, "cover", "webp")
+        assert default_storage.exists(name)
+
+        with mock.patch.object(imaging, "decode") as decode:
+            assert self.get(url).data == response.data
+        decode.assert_not_called()
+
+    @m.it("Should fit inside the box and never scale up")
+    def test_contain(self):
+        response = self.get(transform_url(self.media, 200, 200, "contain", "jpg"))
+        assert response["Content-Type"] == "image/jpeg"
+        assert PilImage.open(BytesIO(response.data)).size == (200, 100)
+
+        response = self.get(transform_url(self.media, 1600, 1600, "cover"))
+        assert PilImage.open(BytesIO(response.data)).size == (400, 400)
+
+    @m.it("Should refuse unsigned and tampered parameters")
+    def test_signed(self):
+        url = transform_url(self.media, 100, 100)
+        assert self.get(url.split("?")[0]).status_code == 404
+        assert self.get(url.replace("100x100", "101x100")).status_code == 404
+        assert self.get(url.replace("cover", "contain")).status_code == 404
+        with override_settings(MEDIA_TRANSFORM_MAX_SIZE=50):
+            assert self.get(url).status_code == 404
+
+    @m.it("Should serve from the bucket when the disk cache lost it")
+    def test_bucket(self):
+        url = transform_url(self.media, 64, 64)
+        first = self.get(url).data
+        with override_settings(MEDIA_TRANSFORM_CACHE_DIR=tempfile.mkdtemp()):
+            with mock.patch.object(imaging, "decode") as decode:
+                assert self.get(url).data == first
+            decode.assert_not_called()
+
+    @m.it("Should fetch the transform again when it's evicted before it's read")
+    def test_evicted(self):
+        url = transform_url(self.media, 48, 48)
+        first = self.get(url).data
+        with mock.patch.object(DiskLru, "get", return_value="/nonexistent/gone"):
+            response = self.get(url)
+        assert response.status_code == 200
+        assert response.data == first
+
+    @override_settings(MEDIA_TRANSFORM_CONCURRENCY=1, MEDIA_TRANSFORM_WAIT=0.01)
+    @m.it("Should answer busy when every render slot is taken")
+    def test_busy(self):
+        slots = media_transforms._slots()  # pylint: disable=protected-access
+        slots.acquire()
+        try:
+            response = self.client.get(transform_url(self.media, 90, 90))
+        finally:
+            slots.release()
+        assert response.status_code == 503
+        assert response["Retry-After"] == "1"
+        assert self.client.get(transform_url(self.media, 90, 90)).status_code == 200
+
+    @m.it("Should link square crops from templates")
+    def test_template(self):
+        rendered = Template(
+            "{% load responsive_images %}{% transformed_image_url image 96 96 %}"
+        ).render(Context({"image": self.media}))
+        assert rendered == transform_url(self.media, 96, 96)
+
+    @m.it("Should keep transforms of live originals from garbage collection")
+    def test_gc(self):
+        name = transform_storage_name(self.media, 96, 96, "cover", "webp")
+        root = os.path.splitext(self.media.file.name)[0]
+        assert is_live(name, set(), {root})
+        assert not is_live(name, set(), {"image-gone"})
+
+
+@m.describe("Disk LRU")
+class TestDiskLru(TestCase):
+    @m.it("Should drop the least recently read files over the size limit")
+    def test_eviction(self):
+        lru = DiskLru(tempfile.mkdtemp(), max_bytes=300)
+        for index, key in enumerate("abc"):
+            path = lru.put(key, b"x" * 100)
+            os.utime(path, (index, index))
+        assert lru.get("a")
+        lru.put("d", b"x" * 100)
+        assert lru.get("a") and lru.get("d")
+        assert not lru.get("b")
+
+    @m.it("Should hold the size limit across the workers sharing a directory")
+    def test_shared(self):
+        directory = tempfile.mkdtemp()
+        workers = [DiskLru(directory, max_bytes=300) for _ in range(2)]
+        for index in range(6):
+            workers[index % 2].put(str(index), b"x" * 100)
+            total = sum(
+                os.path.getsize(os.path.join(root, name))
+                for root, _, names in os.walk(directory)
+                for name in names
+            )
+            assert total <= 300
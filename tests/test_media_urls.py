@@ -0,0 +1,95 @@
+from pytest import mark as m
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase, override_settings
+from webapp.media_urls import MediaUrlResolver, media_url_resolver, resolve_media_urls
+from webapp.models import Media
+
+
+class CountingStorage(FileSystemStorage):
+    """counts url calls, and signs them like a private bucket would"""
+
+    querystring_auth = False
+    querystring_expire = 3600
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    def url(self, name, expire=None):
+        self.calls += 1
+        url = super().url(name)
+        return f"{url}?expires={expire}&n={self.calls}" if expire else url
+
+
+@m.describe("Media urls")
+class TestMediaUrls(TestCase):
+    @m.it("Should build public urls from a prefix resolved once")
+    def test_public(self):
+        storage = CountingStorage(base_url="https://media.example.org/media/")
+        resolver = MediaUrlResolver(storage)
+        assert (
+            resolver.url("image-1.jpg") == "https://media.example.org/media/image-1.jpg"
+        )
+        assert resolver.url("a b.jpg") == "https://media.example.org/media/a%20b.jpg"
+        assert resolver.urls(["x.webp", "y.webp", "x.webp"]) == {
+            "x.webp": "https://media.example.org/media/x.webp",
+            "y.webp": "https://media.example.org/media/y.webp",
+        }
+        assert resolver.url("") == ""
+        assert storage.calls == 1
+
+    @override_settings(
+        AWS_S3_ENDPOINT_URL="http://minio:9000",
+        AWS_S3_CLIENT_ENDPOINT_URL="http://minio.localhost",
+    )
+    @m.it("Should point urls at the endpoint browsers reach")
+    def test_client_endpoint(self):
+        resolver = MediaUrlResolver(CountingStorage(base_url="http://minio:9000/m/"))
+        assert resolver.url("f.jpg") == "http://minio.localhost/m/f.jpg"
+
+    @override_settings(MEDIA_SIGNED_URL_TTL=600, MEDIA_SIGNED_URL_CACHE_SIZE=2)
+    @m.it("Should reuse signed urls and keep only the most recent")
+    def test_signed(self):
+        storage = CountingStorage(base_url="/media/")
+        storage.querystring_auth = True
+        resolver = MediaUrlResolver(storage)
+        first = resolver.url("a.jpg")
+        assert first.startswith("/media/a.jpg?expires=600")
+        assert resolver.url("a.jpg") == first
+        assert storage.calls == 1
+
+        resolver.url("b.jpg")
+        resolver.url("c.jpg")
+        # a.jpg was the least recently used, so it is signed again
+        assert resolver.url("a.jpg") != first
+        assert storage.calls == 4
+        # public urls can still be asked for
+        assert resolver.url("a.jpg", signed=False) == "/media/a.jpg"
+
+    @m.it("Should resolve the urls of many media in one call")
+    def test_media(self):
+        media = [
+            Media.objects.create(file=ContentFile(b"notes", name=f"notes-{i}.txt"))
+            for i in range(3)
+        ]
+        urls = resolve_media_urls(media)
+        assert urls == {item.pk: item.url for item in media}
+        assert urls[media[0].pk] == f"/media/{media[0].file.name}"
+
+    @m.it("Should forget the prefix when the storage settings change")
+    def test_reset(self):
+        assert media_url_resolver.url("x.txt") == "/media/x.txt"
+        with override_settings(
+            STORAGES={
+                "default": {
+                    "BACKEND": "django.core.files.storage.FileSystemStorage",
+                    "OPTIONS": {"base_url": "https://cdn.example.org/"},
+                },
+                "staticfiles": {
+                    "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+                },
+            }
+        ):
+            assert media_url_resolver.url("x.txt") == "https://cdn.example.org/x.txt"
+        assert media_url_resolver.url("x.txt") == "/media/x.txt"
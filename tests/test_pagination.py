@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+from pytest import mark as m
+from django.db.models import F
+from django.db.models.functions import Length
+from django.test import TestCase
+from webapp.models import Make, Sailboat
+from webapp.pagination import KeysetPaginator, encode_cursor
+
+
+@m.describe("Keyset pagination")
+class TestKeysetPagination(TestCase):
+    def setUp(self):
+        make = Make.objects.create(name="catalina")
+        years = [1975, None, 1969, 1975, None, 1980, 1975]
+        for index, year in enumerate(years):
+            Sailboat.objects.create(
+                name=f"boat {index}", make=make, manufactured_start_year=year
+            )
+        self.ordering = (F("manufactured_start_year").desc(nulls_last=True), "name")
+        self.expected = list(
+            Sailboat.objects.order_by(
+                F("manufactured_start_year").desc(nulls_last=True), "name", "pk"
+            )
+        )
+
+    def paginator(self):
+        return KeysetPaginator(
+            Sailboat.objects.all(), self.ordering, per_page=3, estimate_total=True
+        )
+
+    @m.it("Should walk every row once forwards and backwards, nulls included")
+    def test_walk(self):
+        paginator = self.paginator()
+        pages = [paginator.get_page()]
+        while pages[-1].has_next:
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        assert [boat for page in pages for boat in page] == self.expected
+        assert [len(page) for page in pages] == [3, 3, 1]
+        assert not pages[0].has_previous
+        assert pages[0].estimated_total == 7
+
+        previous = paginator.get_page(pages[-1].previous_cursor)
+        assert list(previous) == list(pages[1])
+        first = paginator.get_page(previous.previous_cursor)
+        assert list(first) == list(pages[0])
+        assert not first.has_previous and first.has_next
+
+    @m.it("Should page on timestamps at full precision both ways")
+    def test_timestamps(self):
+        start = datetime(2026, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc)
+        # a few microseconds apart, several to the millisecond
+        for offset, boat in enumerate(Sailboat.objects.order_by("pk")):
+            Sailboat.objects.filter(pk=boat.pk).update(
+                created_at=start + timedelta(microseconds=offset * 300)
+            )
+        for ordering in ("created_at", "-created_at"):
+            expected = list(Sailboat.objects.order_by(ordering, "pk"))
+            paginator = KeysetPaginator(Sailboat.objects.all(), [ordering], per_page=3)
+            pages = [paginator.get_page()]
+            # bounded, a cursor that repeats its row would never get to the end
+            while pages[-1].has_next and len(pages) <= len(expected):
+                pages.append(paginator.get_page(pages[-1].next_cursor))
+            assert [boat for page in pages for boat in page] == expected, ordering
+
+            while pages[-1].has_previous:
+                previous = paginator.get_page(pages[-1].previous_cursor)
+                assert list(previous) == list(pages[-2]), ordering
+                pages.pop()
+
+    @m.it("Should treat a garbage cursor as the first page")
+    def test_garbage_cursor(self):
+        assert list(self.paginator().get_page("not-a-cursor")) == self.expected[:3]
+
+    @m.it("Should treat a cursor with values of the wrong type as the first page")
+    def test_wrong_type_cursor(self):
+        paginator = KeysetPaginator(Sailboat.objects.all(), ["-created_at"], per_page=3)
+        expected = list(Sailboat.objects.order_by("-created_at", "-pk")[:3])
+        for values in (["not-a-date", "x"], [{"dt": "nope"}, 1], [[1], 1]):
+            page = paginator.get_page(encode_cursor(values, backwards=True))
+            assert list(page) == expected, values
+            assert not page.has_previous
+        # sort keys across a relation and on an annotation are checked too
+        paginator = KeysetPaginator(
+            Sailboat.objects.select_related("make"), ["make__name"], per_page=3
+        )
+        second = paginator.get_page(paginator.get_page().next_cursor)
+        assert list(second) == list(Sailboat.objects.order_by("pk")[3:6])
+        assert list(paginator.get_page(encode_cursor(["catalina", "x"]))) == list(
+            Sailboat.objects.order_by("pk")[:3]
+        )
+        paginator = KeysetPaginator(
+            Sailboat.objects.annotate(name_length=Length("name")),
+            ["name_length"],
+            per_page=3,
+        )
+        assert len(paginator.get_page(encode_cursor(["long", 1]))) == 3
+
+    @m.it("Should expose cursor pages on the JSON API")
+    def test_api(self):
+        response = self.client.get("/api/sailboats?order_by=-manufactured_start_year")
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["name"] for item in data["items"]] == [
+            boat.name
+            for boat in Sailboat.objects.order_by(
+                F("manufactured_start_year").desc(nulls_last=True), "-pk"
+            )
+        ]
+        assert data["next_cursor"] is None
+        assert data["estimated_total"] == 7
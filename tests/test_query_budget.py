@@ -0,0 +1,50 @@
+from pytest import mark as m
+from django.db import connection
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from webapp.middleware import QueryRecorder, fingerprint
+from webapp.models import Make, Sailboat
+
+
+@m.describe("Query budget middleware")
+class TestQueryBudget(TestCase):
+    def setUp(self):
+        for number in range(4):
+            Sailboat.objects.create(
+                name=str(number), make=Make.objects.create(name=f"make {number}")
+            )
+
+    @m.it("Should give statements that differ only in values one fingerprint")
+    def test_fingerprint(self):
+        assert fingerprint(
+            "SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"
+        ) == fingerprint("SELECT * FROM t WHERE id IN (%s, %s) AND name = 'y' LIMIT 5")
+
+    @m.it("Should report repeated statements with the template line running them")
+    def test_duplicates(self):
+        recorder = QueryRecorder()
+        template = Template(
+            "{% for sailboat in sailboats %}\n{{ sailboat.make.name }}{% endfor %}"
+        )
+        with connection.execute_wrapper(recorder):
+            template.render(Context({"sailboats": Sailboat.objects.all()}))
+        assert recorder.count == 5
+        [duplicate] = recorder.duplicates(3)
+        assert duplicate["count"] == 4
+        assert duplicate["origin"].endswith(":2")
+
+    @override_settings(
+        QUERY_BUDGET={"SAMPLE_RATE": 1.0, "ROUTES": {"sailboats_index": 0}}
+    )
+    @m.it("Should add Server-Timing and warn when a route is over budget")
+    def test_middleware(self):
+        with self.assertLogs("webapp.middleware", level="WARNING") as logs:
+            response = self.client.get("/sailboats/")
+        assert "db;dur=" in response["Server-Timing"]
+        assert '"route":"sailboats_index"' in logs.output[0]
+
+    @override_settings(QUERY_BUDGET={"SAMPLE_RATE": 0.0})
+    @m.it("Should leave unsampled requests alone")
+    def test_unsampled(self):
+        response = self.client.get("/sailboats/")
+        assert "Server-Timing" not in response
@@ -0,0 +1,59 @@
+from pytest import mark as m
+from django.test import TestCase
+from webapp.models import (
+    Attribute,
+    AttributeSection,
+    Designer,
+    Make,
+    Sailboat,
+    SailboatAttribute,
+)
+from webapp.controllers.sailboats import get_sailboat_cards
+from webapp.templatetags.custom_filters import get_attr
+
+
+@m.describe("Sailboat catalog cards")
+class TestSailboatCards(TestCase):
+    def setUp(self):
+        section = AttributeSection.objects.create(name="hull", icon="sailing")
+        self.keel = Attribute.objects.create(
+            name="keel type", description="keel", input_type="string", section=section
+        )
+        self.rig = Attribute.objects.create(
+            name="Rig", description="rig", input_type="string", section=section
+        )
+        make = Make.objects.create(name="catalina")
+        butler = Designer.objects.create(name="frank butler")
+        for index in range(12):
+            sailboat = Sailboat.objects.create(name=str(20 + index), make=make)
+            sailboat.designers.add(butler)
+            SailboatAttribute.objects.create(
+                sailboat=sailboat, attribute=self.keel, values=["fin", "wing"]
+            )
+            if index % 2:
+                SailboatAttribute.objects.create(
+                    sailboat=sailboat, attribute=self.rig, values=["sloop"]
+                )
+
+    @m.it("Should load a page of cards in a constant number of queries")
+    def test_constant_queries(self):
+        sailboats = list(Sailboat.objects.select_related("make").order_by("pk"))
+        with self.assertNumQueries(3):
+            cards = get_sailboat_cards(sailboats, attributes=[self.keel, self.rig])
+            for card in cards:
+                assert [d.name for d in card.designers.all()] == ["frank butler"]
+                assert get_attr(card, "keel type") == ["fin", "wing"]
+        assert cards[0].card_attributes == {"keel type": ["fin", "wing"]}
+        assert cards[1].card_attributes == {
+            "keel type": ["fin", "wing"],
+            "rig": ["sloop"],
+        }
+        assert cards[0].card_image is None
+
+    @m.it("Should render the catalog without per card queries")
+    def test_index(self):
+        self.client.get("/sailboats/")  # warm the facet cache
+        with self.assertNumQueries(4):
+            response = self.client.get("/sailboats/")
+        assert response.status_code == 200
+        assert response.content.count(b"frank butler") >= 12
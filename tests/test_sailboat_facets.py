@@ -0,0 +1,51 @@
+from pytest import mark as m
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase
+from webapp.models import Designer, Make, Sailboat
+from webapp.controllers.sailboats import get_sailboat_facets
+from webapp.schemas.sailboats import SailboatListRequest
+
+
+def facets(query_string=""):
+    return get_sailboat_facets(
+        SailboatListRequest.from_query_dict(QueryDict(query_string))
+    )
+
+
+def counts(facet_counts):
+    return {facet.label: facet.count for facet in facet_counts}
+
+
+@m.describe("Sailboat catalog facets")
+class TestSailboatFacets(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalina = Make.objects.create(name="catalina")
+        pearson = Make.objects.create(name="pearson")
+        butler = Designer.objects.create(name="frank butler")
+        Sailboat.objects.create(
+            name="22",
+            make=catalina,
+            manufactured_start_year=1969,
+            manufactured_end_year=1975,
+        ).designers.add(butler)
+        Sailboat.objects.create(
+            name="30", make=catalina, manufactured_start_year=1975
+        ).designers.add(butler)
+        Sailboat.objects.create(name="26", make=pearson, manufactured_start_year=1970)
+
+    @m.it("Should count each facet without its own filter")
+    def test_counts(self):
+        result = facets("make=catalina")
+        assert counts(result.makes) == {"catalina": 2, "pearson": 1}
+        assert counts(result.designers) == {"frank butler": 2}
+        assert counts(result.years) == {"1960s": 1, "1970s": 2}
+
+    @m.it("Should serve repeated requests from the cache until the catalog changes")
+    def test_cache(self):
+        facets()
+        with self.assertNumQueries(0):
+            assert counts(facets().makes) == {"catalina": 2, "pearson": 1}
+        Sailboat.objects.create(name="34", make=Make.objects.get(name="pearson"))
+        assert counts(facets().makes) == {"catalina": 2, "pearson": 2}
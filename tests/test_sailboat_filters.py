@@ -0,0 +1,147 @@
+from pytest import mark as m
+from django.db.models import Exists
+from django.http import QueryDict
+from django.test import TestCase, skipUnlessDBFeature
+from webapp.models import Attribute, AttributeSection, Make, Designer, Sailboat
+from webapp.models.sailboat_attribute import SailboatAttribute
+from webapp.controllers.sailboats import (
+    _attribute_value_candidates,
+    get_sailboats,
+)
+from webapp.schemas.sailboats import SailboatListRequest, SailboatOrdering
+
+
+@m.describe("Sailboat catalog filters")
+class TestSailboatFilters(TestCase):
+    def setUp(self):
+        catalina = Make.objects.create(name="catalina")
+        pearson = Make.objects.create(name="pearson")
+        butler = Designer.objects.create(name="frank butler")
+
+        self.catalina_22 = Sailboat.objects.create(
+            name="22",
+            make=catalina,
+            manufactured_start_year=1969,
+            manufactured_end_year=2004,
+        )
+        self.catalina_30 = Sailboat.objects.create(
+            name="30",
+            make=catalina,
+            manufactured_start_year=1975,
+            manufactured_end_year=2008,
+        )
+        self.pearson_26 = Sailboat.objects.create(
+            name="26",
+            make=pearson,
+            manufactured_start_year=1970,
+        )
+        self.catalina_22.designers.add(butler)
+        self.catalina_30.designers.add(butler)
+
+        section = AttributeSection.objects.create(name="hull", icon="ship")
+        self.keel = Attribute.objects.create(
+            name="keel_type",
+            description="Keel type",
+            input_type=Attribute.InputType.STRING,
+            section=section,
+        )
+        self.loa = Attribute.objects.create(
+            name="loa",
+            description="Length overall",
+            input_type=Attribute.InputType.FLOAT,
+            data_type=Attribute.DataType.FLOAT,
+            section=section,
+        )
+        # form posts store strings, vessel contributions the typed value
+        for sailboat, keel, loa in [
+            (self.catalina_22, ["fin", "swing"], ["22"]),
+            (self.catalina_30, ["fin"], [30.0]),
+            (self.pearson_26, ["wing"], [26.5]),
+        ]:
+            SailboatAttribute.objects.create(
+                sailboat=sailboat, attribute=self.keel, values=keel
+            )
+            SailboatAttribute.objects.create(
+                sailboat=sailboat, attribute=self.loa, values=loa
+            )
+
+    def query(self, query_string):
+        return list(
+            get_sailboats(SailboatListRequest.from_query_dict(QueryDict(query_string)))
+        )
+
+    @m.it("Should parse repeated and array-style attribute parameters")
+    def test_parse_attributes(self):
+        request = SailboatListRequest.from_query_dict(
+            QueryDict("attr_keel_type[]=fin&attr_keel_type[]=wing&attr_rig=&name=%2022")
+        )
+        assert request.attributes == {"attr_keel_type": ["fin", "wing"]}
+        assert request.name == "22"
+
+    @m.it("Should fall back to name ordering and ignore bad years")
+    def test_parse_garbage(self):
+        request = SailboatListRequest.from_query_dict(
+            QueryDict("order_by=password&year_start=abc")
+        )
+        assert request.order_by == SailboatOrdering.name
+        assert request.year_start is None
+
+    @m.it("Should filter by make and designer")
+    def test_make_and_designer(self):
+        assert self.query("make=Catalina") == [self.catalina_22, self.catalina_30]
+        assert self.query("designer=frank butler&name=3") == [self.catalina_30]
+
+    @m.it("Should match production runs overlapping the year range")
+    def test_years(self):
+        assert self.query("year_start=2005") == [self.catalina_30]
+        assert self.query("year_end=1969") == [self.catalina_22]
+
+    @m.it("Should apply order_by")
+    def test_order_by(self):
+        assert self.query("order_by=-manufactured_start_year") == [
+            self.catalina_30,
+            self.pearson_26,
+            self.catalina_22,
+        ]
+
+    @m.it("Should look attribute values up as stored by forms and contributions")
+    def test_value_candidates(self):
+        assert _attribute_value_candidates(self.loa, "30") == ["30", 30.0]
+        assert _attribute_value_candidates(self.loa, "long") == ["long"]
+        assert _attribute_value_candidates(self.keel, "30") == ["30"]
+        self.loa.data_type = Attribute.DataType.INTEGER
+        assert _attribute_value_candidates(self.loa, "30") == ["30", 30]
+        assert _attribute_value_candidates(self.loa, "30.5") == ["30.5"]
+
+    @m.it("Should match any value of an attribute and every attribute given")
+    def test_attribute_filter_shape(self):
+        # compiled without running, sqlite can't answer `contains` on json
+        query = get_sailboats(
+            SailboatListRequest.from_query_dict(
+                QueryDict("attr_keel_type=fin&attr_keel_type=wing&attr_loa=30")
+            )
+        ).query
+        assert query.where.connector == "AND"
+        # each attribute is an `EXISTS(...)` of its own, holding the OR of
+        # `values @> [candidate]` for every value asked for
+        matches = {}
+        for condition in query.where.children:
+            exists = condition.lhs
+            assert isinstance(exists, Exists)
+            where = exists.query.where.children[0]
+            matches[tuple(lookup.rhs[0] for lookup in where.children)] = where.connector
+        assert matches == {("fin", "wing"): "OR", ("30", 30.0): "OR"}
+
+    @skipUnlessDBFeature("supports_json_field_contains")
+    @m.it("Should filter by attribute values")
+    def test_attributes(self):
+        assert self.query("attr_keel_type=fin") == [self.catalina_22, self.catalina_30]
+        assert self.query("attr_keel_type=wing&attr_keel_type=swing") == [
+            self.catalina_22,
+            self.pearson_26,
+        ]
+        assert self.query("attr_keel_type=fin&attr_loa=30") == [self.catalina_30]
+        assert self.query("attr_loa=22&attr_loa=26.5") == [
+            self.catalina_22,
+            self.pearson_26,
+        ]
@@ -0,0 +1,84 @@
+from pytest import mark as m
+from django.http import QueryDict
+from django.test import TestCase
+from webapp.models import (
+    Attribute,
+    AttributeSection,
+    Designer,
+    Make,
+    Sailboat,
+    SailboatAttribute,
+)
+from webapp.controllers.attributes import get_attribute_schema
+from webapp.controllers.sailboats import save_sailboat
+from webapp.schemas.sailboats import SailboatForm
+
+
+@m.describe("Sailboat form write path")
+class TestSailboatForm(TestCase):
+    def setUp(self):
+        section = AttributeSection.objects.create(name="hull", icon="sailing")
+        self.attributes = [
+            Attribute.objects.create(
+                name=f"spec {index}",
+                description="spec",
+                input_type="string",
+                section=section,
+            )
+            for index in range(80)
+        ]
+        self.sailboat = Sailboat.objects.create(
+            name="30", make=Make.objects.create(name="catalina")
+        )
+        self.sailboat.designers.add(Designer.objects.create(name="frank butler"))
+        for attribute in self.attributes[:40]:
+            SailboatAttribute.objects.create(
+                sailboat=self.sailboat, attribute=attribute, values=["old"]
+            )
+
+    def post(self, **fields):
+        data = QueryDict(mutable=True)
+        data.update({"name": "30", "make": "Catalina"})
+        for key, values in fields.items():
+            data.setlist(key, values if isinstance(values, list) else [values])
+        return SailboatForm.from_post(data)
+
+    @m.it("Should index the posted attribute fields in one pass")
+    def test_parse(self):
+        form = self.post(
+            **{
+                "attr_spec 1[]": ["a", "", "b"],
+                "attr_spec 2": "",
+                "designers": "A, b,a",
+            }
+        )
+        assert form.attributes == {"attr_spec 1": ["a", "b"], "attr_spec 2": []}
+        assert form.designers == ["a", "b"]
+        assert form.make == "catalina"
+
+    @m.it("Should only write the attributes and designers that changed")
+    def test_diff(self):
+        fields = {f"attr_spec {index}[]": ["old"] for index in range(80)}
+        fields.update({f"attr_spec {index}[]": ["new"] for index in range(60, 80)})
+        fields["attr_spec 0[]"] = ["changed"]
+        fields["attr_spec 1[]"] = [""]
+        fields["designers"] = "frank butler, bill lapworth"
+        form = self.post(**fields)
+        get_attribute_schema()  # warm, it is shared between requests
+        with self.assertNumQueries(20):
+            save_sailboat(form, self.sailboat)
+
+        values = dict(
+            SailboatAttribute.objects.filter(sailboat=self.sailboat).values_list(
+                "attribute__name", "values"
+            )
+        )
+        assert len(values) == 79
+        assert values["spec 0"] == ["changed"]
+        assert "spec 1" not in values
+        assert values["spec 45"] == ["old"]
+        assert values["spec 70"] == ["new"]
+        assert sorted(d.name for d in self.sailboat.designers.all()) == [
+            "bill lapworth",
+            "frank butler",
+        ]
@@ -0,0 +1,70 @@
+from pytest import mark as m
+from django.http import QueryDict
+from django.test import TestCase
+from webapp.models import Designer, Make, Sailboat, User, Vessel
+from webapp.controllers.sailboats import get_sailboats
+from webapp.controllers.search import search
+from webapp.schemas.sailboats import SailboatListRequest, SailboatOrdering
+
+
+@m.describe("Vessel and sailboat search documents")
+class TestSearch(TestCase):
+    def setUp(self):
+        self.make = Make.objects.create(name="catalina")
+        self.sailboat = Sailboat.objects.create(name="30", make=self.make)
+        self.vessel = Vessel.objects.create(
+            sailboat=self.sailboat,
+            name="Wanderer",
+            hull_identification_number="CTYM1234D404",
+            home_port="Rockland",
+            created_by=User.objects.create(username="skipper"),
+        )
+
+    @m.it("Should build the search document on save")
+    def test_document(self):
+        assert self.vessel.search_document == (
+            "Wanderer CTYM1234D404 Rockland catalina 30"
+        )
+
+    @m.it("Should keep vessel documents current when the sailboat changes")
+    def test_maintained(self):
+        self.sailboat.designers.add(Designer.objects.create(name="frank butler"))
+        self.make.name = "Catalina Yachts"
+        self.make.save()
+        self.vessel.refresh_from_db()
+        assert self.vessel.search_document == (
+            "Wanderer CTYM1234D404 Rockland catalina yachts 30 frank butler"
+        )
+
+    @m.it("Should leave the catalog alone when a make is reused, not renamed")
+    def test_reused_make(self):
+        for number in range(30):
+            Sailboat.objects.create(name=f"model {number}", make=self.make)
+        user = User.objects.get(username="skipper")
+        with self.assertNumQueries(1):
+            assert Make.get_or_create_moderated("catalina", user) == self.make
+        make = Make.objects.get(pk=self.make.pk)
+        with self.assertNumQueries(1):
+            make.save()
+
+        designer = Designer.objects.create(name="frank butler")
+        self.sailboat.designers.add(designer)
+        designer = Designer.objects.get(pk=designer.pk)
+        designer.name = "Butler"
+        # the sailboats, their designers, their update, the vessels and theirs
+        with self.assertNumQueries(6):
+            designer.save()
+        self.vessel.refresh_from_db()
+        assert self.vessel.search_document.endswith("catalina 30 butler")
+
+    @m.it("Should match every word of the search")
+    def test_search(self):
+        assert list(search(Vessel.objects.all(), "catalina wand")) == [self.vessel]
+        assert not search(Vessel.objects.all(), "catalina pearson").exists()
+        assert search(Vessel.objects.all(), "%%").count() == 1
+
+    @m.it("Should order sailboat searches by relevance by default")
+    def test_sailboat_search(self):
+        request = SailboatListRequest.from_query_dict(QueryDict("search=catalina"))
+        assert request.order_by == SailboatOrdering.relevance
+        assert list(get_sailboats(request)) == [self.sailboat]
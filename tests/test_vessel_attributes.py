@@ -0,0 +1,143 @@
+from pytest import mark as m
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from webapp.models import (
+    Attribute,
+    AttributeSection,
+    Make,
+    Moderation,
+    Sailboat,
+    SailboatAttribute,
+    User,
+    Vessel,
+)
+from webapp.models.vessel import VesselAttribute
+from webapp.schemas.attributes import AttributeAssignment
+
+
+@m.describe("Bulk vessel attribute writes")
+class TestVesselAttributes(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="skipper")
+        self.sailboat = Sailboat.objects.create(
+            name="30", make=Make.objects.create(name="catalina")
+        )
+        section = AttributeSection.objects.create(name="rig", icon="sail")
+        self.attributes = [
+            Attribute.objects.create(
+                name=f"measurement {number}",
+                description="A measurement",
+                input_type=Attribute.InputType.FLOAT,
+                data_type=Attribute.DataType.FLOAT,
+                section=section,
+            )
+            for number in range(30)
+        ]
+        self.keel = Attribute.objects.create(
+            name="keel",
+            description="Keel type",
+            input_type=Attribute.InputType.OPTIONS,
+            options=["fin", "wing"],
+            accepts_contributions=False,
+            section=section,
+        )
+        SailboatAttribute.objects.create(
+            sailboat=self.sailboat, attribute=self.keel, values=["fin"]
+        )
+        self.vessel = Vessel.objects.create(
+            sailboat=self.sailboat, name="wanderer", created_by=self.user
+        )
+        # warm the content type cache
+        ContentType.objects.get_for_models(SailboatAttribute, VesselAttribute)
+
+    def assign(self, **values):
+        return [
+            AttributeAssignment(name=name, value=value)
+            for name, value in values.items()
+        ]
+
+    @m.it("Should write any number of attributes in a fixed number of queries")
+    def test_query_count(self):
+        assignments = [
+            AttributeAssignment(name=attribute.name, value=str(number + 0.5))
+            for number, attribute in enumerate(self.attributes)
+        ]
+        # savepoint, attributes, current rows, bulk insert, sailboat attributes,
+        # their bulk insert, moderations, release
+        with self.assertNumQueries(8):
+            self.vessel.set_attributes(assignments, user=self.user)
+
+        assert self.vessel.vesselattribute_set.count() == 30
+        value = self.vessel.vesselattribute_set.get(attribute=self.attributes[3])
+        assert value.value_float == 3.5
+        assert SailboatAttribute.objects.get(
+            sailboat=self.sailboat, attribute=self.attributes[3]
+        ).values == [3.5]
+        assert (
+            Moderation.objects.filter(
+                verb=Moderation.Verb.CREATE, requested_by=self.user
+            ).count()
+            == 30
+        )
+
+    @m.it("Should only update, contribute and moderate changed values")
+    def test_update(self):
+        first, second = self.attributes[:2]
+        self.vessel.set_attributes(
+            [
+                AttributeAssignment(name=first.name, value="1"),
+                AttributeAssignment(name=second.name, value="2"),
+            ],
+            user=self.user,
+        )
+        Moderation.objects.all().delete()
+
+        self.vessel.set_attributes(
+            [
+                AttributeAssignment(name=first.name, value="1"),
+                AttributeAssignment(name=second.name, value="3"),
+            ],
+            user=self.user,
+        )
+        assert self.vessel.vesselattribute_set.get(attribute=second).value_float == 3
+        assert SailboatAttribute.objects.get(
+            sailboat=self.sailboat, attribute=second
+        ).values == [2.0, 3.0]
+        moderation = Moderation.objects.get()
+        assert moderation.verb == Moderation.Verb.UPDATE
+        assert moderation.data == {"attribute": second.id, "value": 3.0}
+        assert isinstance(moderation.triggered_by, VesselAttribute)
+
+    @m.it("Should not contribute values to fixed attributes")
+    def test_fixed_attribute(self):
+        self.vessel.set_attributes(self.assign(keel="wing"), user=self.user)
+        assert self.vessel.vesselattribute_set.get(attribute=self.keel).value == "wing"
+        assert SailboatAttribute.objects.get(
+            sailboat=self.sailboat, attribute=self.keel
+        ).values == ["fin"]
+        assert not Moderation.objects.exists()
+
+    @m.it("Should delete blank values, and everything not assigned on replace")
+    def test_delete(self):
+        first, second = self.attributes[:2]
+        self.vessel.set_attributes(
+            [
+                AttributeAssignment(name=first.name, value="1"),
+                AttributeAssignment(name=second.name, value="2"),
+            ]
+        )
+        self.vessel.set_attributes([AttributeAssignment(name=first.name, value="")])
+        assert list(
+            self.vessel.vesselattribute_set.values_list("attribute", flat=True)
+        ) == [second.id]
+
+        self.vessel.set_attributes(self.assign(keel="fin"), replace=True)
+        assert list(
+            self.vessel.vesselattribute_set.values_list("attribute", flat=True)
+        ) == [self.keel.id]
+
+    @m.it("Should reject unknown attribute names before writing anything")
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            self.vessel.set_attributes(self.assign(keel="fin", draft="4"))
+        assert not self.vessel.vesselattribute_set.exists()
@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta, timezone
+from pytest import mark as m
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from webapp.controllers.roles import VesselRole, set_vessel_role
+from webapp.controllers.vessel_detail import load_vessel_detail
+from webapp.models import (
+    LogEntry,
+    LogEntryAttachment,
+    LogEntryLocation,
+    Make,
+    Media,
+    Sailboat,
+    User,
+    Vessel,
+    VesselNote,
+)
+from webapp.models.vessel import VesselImage
+from webapp.models.vessel_note import NoteMessage
+
+
+@m.describe("Vessel detail loader")
+class TestVesselDetail(TestCase):
+    def setUp(self):
+        self.skipper = User.objects.create(username="skipper")
+        self.crew = User.objects.create(username="crew")
+        self.vessel = Vessel.objects.create(
+            sailboat=Sailboat.objects.create(
+                name="30", make=Make.objects.create(name="catalina")
+            ),
+            name="private",
+            hull_identification_number="HIN1",
+            created_by=self.skipper,
+            is_public=False,
+        )
+        set_vessel_role(self.vessel, self.crew, VesselRole.CREW)
+
+    def fresh(self, user):
+        return User.objects.get(pk=user.pk)
+
+    def vessel_for_page(self):
+        return Vessel.objects.select_related("sailboat__make").get(pk=self.vessel.pk)
+
+    def add_entries(self, count):
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for number in range(count):
+            entry = LogEntry.objects.create(
+                vessel=self.vessel,
+                author=self.crew if number % 2 else self.skipper,
+                title=f"day {number}",
+                content="Sailed *far*",
+                log_timestamp=start + timedelta(hours=number),
+            )
+            LogEntryLocation.objects.create(
+                log_entry=entry, latitude="41.5", longitude="-71.3", order=0
+            )
+            for attachment_type in ("image", "receipt"):
+                LogEntryAttachment.objects.create(
+                    log_entry=entry,
+                    media=Media.objects.create(
+                        file=f"uploads/{number}-{attachment_type}.jpg",
+                        media_type="image",
+                        original_filename=f"{attachment_type}.jpg",
+                    ),
+                    attachment_type=attachment_type,
+                )
+
+    def add_notes(self, count):
+        start = VesselNote.objects.exclude(user=self.crew).count()
+        for number in range(start, start + count):
+            author = User.objects.create(username=f"author {number}")
+            note = VesselNote.objects.create(vessel=self.vessel, user=author)
+            note.shared_with.add(self.crew)
+            NoteMessage.objects.create(vessel_note=note, user=author, content="hi")
+        VesselNote.objects.get_or_create(vessel=self.vessel, user=self.crew)
+
+    def queries_for_page(self, user):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/vessels/{self.vessel.pk}/")
+        assert response.status_code == 200
+        return response, len(queries)
+
+    @m.it("Should load the page in the same number of queries for any logbook")
+    def test_fixed_queries(self):
+        self.add_entries(2)
+        self.add_notes(1)
+        _, few = self.queries_for_page(self.crew)
+
+        self.add_entries(30)
+        self.add_notes(4)
+        for order in range(1, 4):
+            VesselImage.objects.create(
+                vessel=self.vessel,
+                image=Media.objects.create(
+                    file=f"uploads/vessel-{order}.jpg", media_type="image"
+                ),
+                order=order,
+            )
+        response, many = self.queries_for_page(self.crew)
+        assert many == few
+        assert response.context["detail"].logbook_count == 32
+        assert len(response.context["detail"].logbook) == 20
+
+    @m.it("Should assemble the page without querying in the template")
+    def test_loader(self):
+        self.add_entries(3)
+        self.add_notes(2)
+        crew = self.fresh(self.crew)
+        vessel = self.vessel_for_page()
+        with self.assertNumQueries(11):
+            detail = load_vessel_detail(vessel, crew)
+        assert detail.can_crew and not detail.can_manage
+        assert [note.user for note in detail.notes if note.user != crew] == [
+            User.objects.get(username="author 0"),
+            User.objects.get(username="author 1"),
+        ]
+        assert detail.user_note.user_id == crew.pk
+
+        [newest, *_] = detail.logbook
+        assert newest.entry.title == "day 2"
+        assert [a.attachment_type for a in newest.image_attachments] == ["image"]
+        assert [a.attachment_type for a in newest.other_attachments] == ["receipt"]
+        # crew edit their own entries only
+        assert [entry.can_edit for entry in detail.logbook] == [False, True, False]
+
+        with self.assertNumQueries(0):
+            html = render_to_string(
+                "webapp/components/logbook_display.html",
+                {
+                    "vessel": vessel,
+                    "page_obj": detail.logbook,
+                    "entry_count": detail.logbook_count,
+                    "user_can_crew": detail.can_crew,
+                },
+            )
+        assert "(3 entries)" in html
+        assert "<em>far</em>" in html
+
+    @override_settings(VESSEL_LOGBOOK_PAGE_SIZE=2)
+    @m.it("Should page through the logbook with cursors")
+    def test_logbook_pages(self):
+        self.add_entries(5)
+        crew = self.fresh(self.crew)
+        detail = load_vessel_detail(self.vessel_for_page(), crew)
+        titles = [entry.entry.title for entry in detail.logbook]
+        while detail.logbook.has_next:
+            detail = load_vessel_detail(
+                self.vessel_for_page(), crew, detail.logbook.next_cursor
+            )
+            titles += [entry.entry.title for entry in detail.logbook]
+        assert titles == [f"day {number}" for number in reversed(range(5))]
+
+    @m.it("Should only show the vessel to users who can't see it")
+    def test_obfuscated(self):
+        stranger = User.objects.create(username="stranger")
+        vessel = self.vessel_for_page()
+        with self.assertNumQueries(1):
+            detail = load_vessel_detail(vessel, stranger)
+        assert detail.is_obfuscated and not detail.logbook
+
+        self.vessel.is_public = True
+        self.vessel.save()
+        vessel = self.vessel_for_page()
+        with self.assertNumQueries(3):
+            detail = load_vessel_detail(vessel, AnonymousUser())
+        assert detail.can_view and detail.logbook is None
@@ -0,0 +1,91 @@
+from pytest import mark as m
+from django.test import TestCase
+from webapp.models import Attribute, AttributeSection, Make, Sailboat, User, Vessel
+from webapp.models.vessel import VesselAttribute
+from webapp.controllers.vessels import get_vessels
+from webapp.schemas.vessels import VesselListRequest
+
+
+@m.describe("Vessel list query compiler")
+class TestVesselFilters(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="skipper")
+        sailboat = Sailboat.objects.create(
+            name="30", make=Make.objects.create(name="catalina")
+        )
+        section = AttributeSection.objects.create(name="dimensions", icon="ruler")
+        self.loa = Attribute.objects.create(
+            name="LOA",
+            description="Length overall",
+            input_type=Attribute.InputType.FLOAT,
+            data_type=Attribute.DataType.FLOAT,
+            section=section,
+        )
+        self.rig = Attribute.objects.create(
+            name="Rig",
+            description="Rig type",
+            input_type=Attribute.InputType.STRING,
+            section=section,
+        )
+        self.vessels = {}
+        for name, year, loa, rig in [
+            ("wanderer", 1978, "29.5", "sloop"),
+            ("drifter", 1985, "30", "cutter"),
+            ("tempest", 1990, "35.25", "sloop"),
+        ]:
+            vessel = Vessel.objects.create(
+                sailboat=sailboat, name=name, year_built=year, created_by=user
+            )
+            VesselAttribute.objects.create(vessel=vessel, attribute=self.loa, value=loa)
+            VesselAttribute.objects.create(vessel=vessel, attribute=self.rig, value=rig)
+            self.vessels[name] = vessel
+
+    def names(self, **request):
+        return [vessel.name for vessel in get_vessels(VesselListRequest(**request))]
+
+    @m.it("Should store attribute values in their typed column")
+    def test_typed_values(self):
+        value = VesselAttribute.objects.get(
+            vessel=self.vessels["tempest"], attribute=self.loa
+        )
+        assert value.value_float == 35.25
+        assert value.value_integer is None
+
+    @m.it("Should compare numeric attributes numerically")
+    def test_range_filter(self):
+        # a string comparison would put "100" < "29.5"
+        assert self.names(
+            filters=[{"attribute": "loa", "value": "30", "operator": "gte"}],
+            order_by=["name"],
+        ) == ["drifter", "tempest"]
+        assert self.names(
+            filters=[{"attribute": "LOA", "value": 100, "operator": "lt"}],
+            order_by=["-LOA"],
+        ) == ["tempest", "drifter", "wanderer"]
+
+    @m.it("Should combine attribute and vessel field filters")
+    def test_combined_filters(self):
+        assert self.names(
+            filters=[
+                {"attribute": "rig", "value": "sloop", "operator": "eq"},
+                {"attribute": "year_built", "value": 1980, "operator": "gt"},
+            ]
+        ) == ["tempest"]
+        assert self.names(
+            filters=[{"attribute": "rig", "value": "sloop", "operator": "ne"}]
+        ) == ["drifter"]
+
+    @m.it("Should paginate the ordered results")
+    def test_pagination(self):
+        assert self.names(filters=[], order_by=["year_built"], page=2, page_size=2) == [
+            "tempest"
+        ]
+
+    @m.it("Should reject unknown attributes and uncastable values")
+    def test_invalid_filters(self):
+        with self.assertRaises(ValueError):
+            self.names(filters=[{"attribute": "draft", "value": 1, "operator": "eq"}])
+        with self.assertRaises(ValueError):
+            self.names(
+                filters=[{"attribute": "loa", "value": "long", "operator": "gt"}]
+            )
@@ -0,0 +1,159 @@
+from importlib import import_module
+from pytest import mark as m
+from django.apps import apps
+from django.contrib.auth.models import Group
+from django.test import TestCase
+from django.urls import reverse
+from guardian.shortcuts import assign_perm
+from webapp.controllers.roles import (
+    VesselRole,
+    revoke_vessel_permission,
+    set_vessel_role,
+)
+from webapp.models import (
+    Make,
+    Sailboat,
+    User,
+    Vessel,
+    VesselAccessRequest,
+    VesselMembership,
+)
+
+
+@m.describe("Vessel memberships")
+class TestVesselMembership(TestCase):
+    def setUp(self):
+        self.skipper = User.objects.create(username="skipper")
+        self.sailboat = Sailboat.objects.create(
+            name="30", make=Make.objects.create(name="catalina")
+        )
+        self.vessel = self.create_vessel("private", is_public=False)
+        self.member = User.objects.create(username="member", email="m@example.com")
+
+    def create_vessel(self, name, is_public):
+        return Vessel.objects.create(
+            sailboat=self.sailboat,
+            name=name,
+            hull_identification_number=f"HIN-{name}",
+            created_by=self.skipper,
+            is_public=is_public,
+        )
+
+    def role(self, user, vessel=None):
+        membership = VesselMembership.objects.filter(
+            vessel=vessel or self.vessel, user=user
+        ).first()
+        return membership and membership.role
+
+    @m.it("Should make the creator of a vessel its skipper")
+    def test_creator(self):
+        assert self.role(self.skipper) == VesselMembership.Role.SKIPPER
+        assert self.skipper.can_manage_vessel(self.vessel)
+
+    @m.it("Should keep the membership in line with the permissions")
+    def test_sync(self):
+        set_vessel_role(self.vessel, self.member, VesselRole.SKIPPER)
+        assert self.role(self.member) == VesselMembership.Role.SKIPPER
+        assert self.member.has_perm("webapp.can_view_vessel", self.vessel)
+
+        revoke_vessel_permission(self.vessel, self.member, "can_manage_vessel")
+        assert self.role(self.member) == VesselMembership.Role.CREW
+        assert not self.member.can_manage_vessel(self.vessel)
+
+        set_vessel_role(self.vessel, self.member, VesselRole.NONE)
+        assert self.role(self.member) is None
+        assert not self.member.can_view_vessel(self.vessel)
+
+    @m.it("Should grant the requested role when an access request is approved")
+    def test_approve(self):
+        access_request = VesselAccessRequest.objects.create(
+            vessel=self.vessel,
+            requester=self.member,
+            requested_role=VesselAccessRequest.Role.CREW,
+        )
+        access_request.approve(self.skipper)
+        assert self.role(self.member) == VesselMembership.Role.CREW
+
+    @m.it("Should change memberships from the role management views")
+    def test_views(self):
+        self.client.force_login(self.skipper)
+        self.client.post(
+            reverse("vessel_add_user", args=[self.vessel.pk]),
+            {"email": "m@example.com", "role": "crew"},
+        )
+        assert self.role(self.member) == VesselMembership.Role.CREW
+
+        self.client.post(
+            reverse("vessel_change_user_role", args=[self.vessel.pk, self.member.pk]),
+            {"role": "viewer"},
+        )
+        assert self.role(self.member) == VesselMembership.Role.VIEWER
+
+        response = self.client.get(
+            reverse("vessel_manage_roles", args=[self.vessel.pk])
+        )
+        roster = {
+            entry["user"].username: entry["permissions"]
+            for entry in response.context["vessel_users"]
+        }
+        assert roster == {
+            "skipper": ["Skipper", "Crew", "Viewer"],
+            "member": ["Viewer"],
+        }
+
+        self.client.post(
+            reverse("vessel_remove_user", args=[self.vessel.pk, self.member.pk])
+        )
+        assert self.role(self.member) is None
+
+    @m.it("Should list the vessels a user can see in one query")
+    def test_viewable(self):
+        public = self.create_vessel("public", is_public=True)
+        other = self.create_vessel("other", is_public=False)
+        set_vessel_role(self.vessel, self.member, VesselRole.VIEWER)
+        set_vessel_role(other, self.member, VesselRole.CREW)
+        # more members of the public vessel don't repeat it
+        set_vessel_role(public, self.member, VesselRole.VIEWER)
+
+        with self.assertNumQueries(1):
+            viewable = set(self.member.get_viewable_vessels())
+        assert viewable == {self.vessel, public, other}
+        assert set(self.member.get_crewable_vessels()) == {other}
+        assert not self.member.get_manageable_vessels().exists()
+        assert list(
+            self.member.get_viewable_vessels().filter(is_public=False).order_by("name")
+        ) == [other, self.vessel]
+
+    @m.it("Should list vessels granted to the user's groups like the role checks")
+    def test_group_grants(self):
+        public = self.create_vessel("public", is_public=True)
+        crewed = self.create_vessel("crewed", is_public=False)
+        group = Group.objects.create(name="club")
+        self.member.groups.add(group)
+        assign_perm("webapp.can_view_vessel", group, self.vessel)
+        assign_perm("webapp.can_crew_vessel", group, crewed)
+        assert self.role(self.member) is None
+
+        with self.assertNumQueries(1):
+            viewable = set(self.member.get_viewable_vessels())
+        assert viewable == {self.vessel, crewed, public}
+        assert list(self.member.get_crewable_vessels()) == [crewed]
+        assert self.member.can_crew_vessel(crewed)
+        assert not self.member.can_crew_vessel(self.vessel)
+        assert not self.member.get_manageable_vessels().exists()
+
+        # a membership and a group grant on the same vessel list it once
+        set_vessel_role(crewed, self.member, VesselRole.SKIPPER)
+        assert list(self.member.get_crewable_vessels()) == [crewed]
+        assert list(self.member.get_manageable_vessels()) == [crewed]
+
+    @m.it("Should backfill memberships from existing permissions")
+    def test_backfill(self):
+        migration = import_module("webapp.migrations.0028_vesselmembership")
+        assign_perm("webapp.can_view_vessel", self.member, self.vessel)
+        assign_perm("webapp.can_crew_vessel", self.member, self.vessel)
+        VesselMembership.objects.all().delete()
+
+        migration.backfill_memberships(apps, None)
+        assert self.role(self.member) == VesselMembership.Role.CREW
+        assert self.role(self.skipper) == VesselMembership.Role.SKIPPER
@@ -0,0 +1,108 @@
+from datetime import datetime, timezone
+from pytest import mark as m
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.template import Context, Template
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from guardian.shortcuts import assign_perm
+from webapp.controllers.roles import VesselRole
+from webapp.models import LogEntry, Make, Sailboat, User, Vessel
+
+
+@m.describe("Vessel roles")
+class TestVesselRoles(TestCase):
+    def setUp(self):
+        self.skipper = User.objects.create(username="skipper")
+        self.sailboat = Sailboat.objects.create(
+            name="30", make=Make.objects.create(name="catalina")
+        )
+        self.vessels = [
+            Vessel.objects.create(
+                sailboat=self.sailboat,
+                name=f"vessel {number}",
+                hull_identification_number=f"HIN{number}",
+                created_by=self.skipper,
+                is_public=False,
+            )
+            for number in range(3)
+        ]
+
+    def fresh(self, user):
+        """the user as a new request loads it"""
+        return User.objects.get(pk=user.pk)
+
+    @m.it("Should resolve every role from object and group permissions")
+    def test_roles(self):
+        crew = User.objects.create(username="crew")
+        assign_perm("webapp.can_view_vessel", crew, self.vessels[0])
+        assign_perm("webapp.can_crew_vessel", crew, self.vessels[1])
+        group = Group.objects.create(name="owners")
+        group.user_set.add(crew)
+        assign_perm("webapp.can_manage_vessel", group, self.vessels[2])
+
+        crew = self.fresh(crew)
+        with self.assertNumQueries(1):
+            roles = crew.vessel_roles.resolve(self.vessels)
+        assert roles == {
+            self.vessels[0].pk: VesselRole.VIEWER,
+            self.vessels[1].pk: VesselRole.CREW,
+            self.vessels[2].pk: VesselRole.SKIPPER,
+        }
+        assert self.fresh(self.skipper).vessel_roles.role(self.vessels[0]) == (
+            VesselRole.SKIPPER
+        )
+
+        admin = User.objects.create(username="admin", role=User.Role.ADMIN)
+        moderator = User.objects.create(username="mod", role=User.Role.MODERATOR)
+        with self.assertNumQueries(0):
+            assert admin.can_manage_vessel(self.vessels[0])
+            assert moderator.can_view_vessel(self.vessels[0])
+        assert not moderator.can_crew_vessel(self.vessels[0])
+
+    @m.it("Should answer repeated checks without more queries")
+    def test_memoized(self):
+        skipper = self.fresh(self.skipper)
+        vessel = self.vessels[0]
+        authors = [self.skipper, User.objects.create(username="author")]
+        entries = [
+            LogEntry.objects.create(
+                vessel=vessel,
+                author=authors[number % 2],
+                title=f"day {number}",
+                log_timestamp=datetime(2026, 1, number + 1, tzinfo=timezone.utc),
+            )
+            for number in range(10)
+        ]
+        template = Template(
+            "{% load custom_filters %}{% if vessel|can_crew_vessel:user %}crew{% endif %}"
+            "{% for entry in entries %}{% if entry|can_edit_entry:user %}e{% endif %}"
+            "{% endfor %}"
+        )
+        with self.assertNumQueries(1):
+            rendered = template.render(
+                Context({"vessel": vessel, "entries": entries, "user": skipper})
+            )
+            assert skipper.can_view_vessel(vessel) and skipper.can_manage_vessel(vessel)
+        assert rendered == "crew" + "e" * 10
+
+    @m.it("Should load the vessel once for the decorator and the view")
+    def test_decorated_view(self):
+        self.client.force_login(self.skipper)
+        vessel = self.vessels[0]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/vessels/{vessel.pk}/manage-roles/")
+        assert response.status_code == 200
+        vessel_loads = [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith('SELECT "webapp_vessel"."id"')
+            and 'FROM "webapp_vessel"' in query["sql"]
+        ]
+        assert len(vessel_loads) == 1
+
+        stranger = User.objects.create(username="stranger")
+        self.client.force_login(stranger)
+        response = self.client.get(f"/vessels/{vessel.pk}/manage-roles/")
+        assert response.status_code == 302
+        assert response["Location"] == f"/vessels/{vessel.pk}/"